@@ -0,0 +1,69 @@
+# benchmarks/bench_columnar.py
+#
+# Reading events from SQLite (numpy_engine.load_events) vs opening the
+# memory-mapped columnar cache, on a synthetic events table.
+# Run from the assessment folder:
+#     python -m benchmarks.bench_columnar --events 10000000 --accounts 1000000
+#
+# "first touch" reads every page of the mapped columns once (what the first
+# query pays on a cold page cache); later opens, in this or any other
+# process, find the pages already cached.
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_engines import build_events_db
+from steps.columnar_cache import COLUMNS, build_cache, open_cache
+from steps.numpy_engine import latest_status_rows, load_events
+from steps.step3_latest_collections_legal import REFERENCE_DATETIME, TARGET_QUEUES
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQLite load vs columnar cache open.")
+    parser.add_argument("--events", type=int, default=2_000_000)
+    parser.add_argument("--accounts", type=int, default=200_000)
+    parser.add_argument("--db", default=None, help="Reuse (or build once into) this database.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(args.db) if args.db else Path(tmp) / "events.db"
+        if not db_path.exists():
+            print(f"[bench] Building {args.events:,} events for {args.accounts:,} accounts...")
+            build_events_db(db_path, args.events, args.accounts)
+        cache_dir = Path(tmp) / "columns"
+
+        conn = sqlite3.connect(db_path)
+        try:
+            ev_sql, load_s = timed(lambda: load_events(conn))
+            _, build_s = timed(lambda: build_cache(conn, cache_dir))
+        finally:
+            conn.close()
+
+        ev, open_s = timed(lambda: open_cache(cache_dir))
+        _, touch_s = timed(lambda: [int(ev[c].sum()) for c in COLUMNS])
+        _, reopen_s = timed(lambda: open_cache(cache_dir))
+
+        rows_sql = latest_status_rows(ev_sql, REFERENCE_DATETIME, TARGET_QUEUES)
+        rows_cache, query_s = timed(lambda: latest_status_rows(ev, REFERENCE_DATETIME, TARGET_QUEUES))
+        assert rows_sql == rows_cache, "cache and SQLite rows differ"
+
+        size = sum(p.stat().st_size for p in cache_dir.iterdir())
+        print(f"[bench] load_events from SQLite: {load_s:.3f} s")
+        print(f"[bench] build cache:             {build_s:.3f} s ({size / 2**20:.0f} MiB)")
+        print(f"[bench] open cache:              {open_s * 1000:.2f} ms")
+        print(f"[bench] first touch of columns:  {touch_s:.3f} s")
+        print(f"[bench] reopen cache:            {reopen_s * 1000:.2f} ms")
+        print(f"[bench] step3 query on cache:    {query_s:.3f} s ({len(rows_cache)} rows, same as SQLite)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/bench_engines.py
+#
+# step3 on a synthetic events table: SQLite index seeks vs the NumPy engine.
+# Run from the assessment folder:
+#     python -m benchmarks.bench_engines --events 10000000 --accounts 1000000
+#
+# The NumPy time is split into loading the arrays (paid once) and answering
+# one reference datetime (paid per what-if question).
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from steps.events import create_events_indexes, create_events_table
+from steps.numpy_engine import latest_status_rows, load_events
+from steps.state import to_epoch
+from steps.step1_setup_db import create_lookup_tables
+from steps.step3_latest_collections_legal import (
+    REFERENCE_DATETIME,
+    TARGET_QUEUES,
+    latest_status_sql,
+)
+
+QUEUES = ["COLLECTIONS", "LEGAL", "PAYING", "OTHER", "TRACE", "INSOLVENCY"]
+STATUSES = [f"S{i}" for i in range(20)]
+
+INSERT_ROWS = 1_000_000
+
+
+def build_events_db(db_path, events, accounts, seed=0):
+    """Fills events/event_accounts with random changes spread over 2025."""
+    rng = np.random.default_rng(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = OFF;")
+    conn.execute("PRAGMA synchronous = OFF;")
+    create_events_table(conn)
+    create_lookup_tables(conn)
+    conn.executemany("INSERT INTO queues (queue_id, name) VALUES (?, ?);",
+                     enumerate(QUEUES, start=1))
+    conn.executemany("INSERT INTO statuses (status_id, name) VALUES (?, ?);",
+                     enumerate(STATUSES, start=1))
+
+    ts0 = to_epoch("2025-01-01")
+    year = 365 * 86400
+
+    for start in range(0, events, INSERT_ROWS):
+        n = min(INSERT_ROWS, events - start)
+        rows = zip(
+            rng.integers(1, accounts + 1, size=n).tolist(),
+            (ts0 + rng.integers(0, year, size=n)).tolist(),
+            rng.integers(1, len(QUEUES) + 1, size=n).tolist(),
+            rng.integers(1, len(STATUSES) + 1, size=n).tolist(),
+            range(start + 1, start + n + 1),
+        )
+        conn.executemany("""
+            INSERT INTO events (account, event_ts, queue_id, status_id, source, source_id)
+            VALUES (?, ?, ?, ?, 'DAILY', ?);
+        """, rows)
+        conn.commit()
+
+    conn.execute("INSERT INTO event_accounts (account) SELECT DISTINCT account FROM events;")
+    conn.commit()
+    create_events_indexes(conn)
+    conn.close()
+
+
+def sqlite_rows(conn):
+    sql, queue_params = latest_status_sql("event_accounts", TARGET_QUEUES)
+    return conn.execute(
+        f"{sql} ORDER BY e.account;",
+        {"ts": to_epoch(REFERENCE_DATETIME), **queue_params}
+    ).fetchall()
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the step3 SQLite and NumPy engines.")
+    parser.add_argument("--events", type=int, default=10_000_000)
+    parser.add_argument("--accounts", type=int, default=1_000_000)
+    parser.add_argument("--db", default=None, help="Reuse/keep the generated database here.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(args.db or Path(tmp) / "events.db")
+        if not db_path.exists():
+            print(f"[bench] Generating {args.events:,} events for {args.accounts:,} accounts...")
+            _, t_build = timed(build_events_db, db_path, args.events, args.accounts)
+            print(f"  built in {t_build:.1f} s")
+
+        conn = sqlite3.connect(db_path)
+        n_events = conn.execute("SELECT COUNT(*) FROM events;").fetchone()[0]
+        print(f"[bench] step3 as of {REFERENCE_DATETIME} over {n_events:,} events")
+
+        expected, t_sql = timed(sqlite_rows, conn)
+        ev, t_load = timed(load_events, conn)
+        rows, t_query = timed(latest_status_rows, ev, REFERENCE_DATETIME, TARGET_QUEUES)
+        conn.close()
+
+        assert rows == expected, "engines disagree"
+
+        print(f"  sqlite: {t_sql:.2f} s")
+        print(f"  numpy:  {t_load + t_query:.2f} s (load {t_load:.2f} s + query {t_query:.2f} s)")
+        print(f"  rows: {len(rows):,} (identical)")
+
+
+if __name__ == "__main__":
+    main()
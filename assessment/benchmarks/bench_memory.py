@@ -0,0 +1,95 @@
+# benchmarks/bench_memory.py
+#
+# Peak RSS of step1 with and without --streaming for a growing number of
+# daily files. Each run happens in a fresh subprocess on generated data.
+# Run from the assessment folder:
+#     python -m benchmarks.bench_memory --files 10 40 160 --rows 20000
+#
+# Streaming RSS levels off once SQLite's page cache (STREAMING_CACHE_KIB) is
+# full, while the concat path grows with the total number of rows.
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ASSESSMENT_DIR = Path(__file__).resolve().parents[1]
+
+QUEUES = ["COLLECTIONS", "LEGAL", "PAYING", "OTHER", "TRACE", "INSOLVENCY"]
+
+CHILD = """
+import resource
+from steps.step1_setup_db import run
+run(streaming={streaming}, chunksize={chunksize})
+print("PEAK_RSS_KB", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def write_daily_files(data_dir, files, rows, accounts=100_000, seed=0):
+    """Writes `files` daily_YYYYMMDD.csv files with `rows` rows each."""
+    rng = np.random.default_rng(seed)
+    day0 = np.datetime64("2024-01-01")
+
+    pd.DataFrame({
+        "account_id": np.arange(1, accounts + 1),
+        "name": "Bench Account",
+        "address": "1 Bench Street",
+    }).to_csv(data_dir / "accounts.csv", index=False)
+
+    for i in range(files):
+        day = day0 + np.timedelta64(i, "D")
+        seconds = rng.integers(0, 86400, size=rows).astype("timedelta64[s]")
+        stamps = pd.Series(day.astype("datetime64[s]") + seconds)
+        pd.DataFrame({
+            "account": rng.integers(1, accounts + 1, size=rows),
+            "queue": rng.choice(QUEUES, size=rows),
+            "status": rng.choice(["S1", "S2", "S3", "S4"], size=rows),
+            "changed_datetime": stamps.dt.strftime("%Y-%m-%d %H:%M:%S"),
+        }).to_csv(data_dir / f"daily_{str(day).replace('-', '')}.csv", index=False)
+
+
+def peak_rss_mb(data_dir, db_path, streaming, chunksize):
+    env = dict(
+        os.environ,
+        ASSESSMENT_DATA_DIR=str(data_dir),
+        ASSESSMENT_DB_PATH=str(db_path),
+    )
+    code = CHILD.format(streaming=streaming, chunksize=chunksize)
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ASSESSMENT_DIR, env=env, check=True, capture_output=True, text=True,
+    ).stdout
+
+    for line in out.splitlines():
+        if line.startswith("PEAK_RSS_KB"):
+            return int(line.split()[1]) / 1024
+    raise RuntimeError(f"[bench] no peak RSS reported:\n{out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS of step1 ingestion modes.")
+    parser.add_argument("--files", type=int, nargs="+", default=[10, 40, 160])
+    parser.add_argument("--rows", type=int, default=20_000, help="Rows per daily file.")
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    args = parser.parse_args()
+
+    print(f"{'files':>6} {'rows':>11} {'concat MB':>10} {'streaming MB':>13}")
+    for files in args.files:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp) / "data"
+            data_dir.mkdir()
+            write_daily_files(data_dir, files, args.rows)
+
+            concat = peak_rss_mb(data_dir, Path(tmp) / "concat.db", False, args.chunksize)
+            streaming = peak_rss_mb(data_dir, Path(tmp) / "streaming.db", True, args.chunksize)
+
+        print(f"{files:>6} {files * args.rows:>11,} {concat:>10.0f} {streaming:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_normalize.py
+#
+# Micro-benchmark for steps/normalize.py against the previous step1 code.
+# Run from the assessment folder:
+#     python -m benchmarks.bench_normalize --rows 2000000
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from steps.normalize import (
+    build_snapshot_dates,
+    clear_format_cache,
+    cached_datetime_format,
+    normalize_datetimes,
+    parse_datetimes_slow,
+    to_iso_strings,
+)
+
+
+def make_daily_column(rows, dayfirst_share=0.001, seed=0):
+    """ISO datetimes with a small share of DD/MM/YYYY values mixed in."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2024-11-26T00:00:00")
+    offsets = rng.integers(0, 365 * 24 * 3600, size=rows).astype("timedelta64[s]")
+    stamps = pd.Series(start + offsets)
+
+    text = to_iso_strings(stamps)
+    dayfirst = rng.random(rows) < dayfirst_share
+    text[dayfirst] = stamps[dayfirst].dt.strftime("%d/%m/%Y %H:%M:%S")
+    return text
+
+
+def make_monthly_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "year": 2025,
+        "month": rng.integers(1, 13, size=rows),
+        "day": np.full(rows, 5),
+    })
+
+
+def legacy_daily(raw):
+    parsed = parse_datetimes_slow(raw)
+    return parsed.dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def fast_daily(raw):
+    clear_format_cache()
+    fmt = cached_datetime_format("bench.csv", raw)
+    return normalize_datetimes(raw, fmt)
+
+
+def legacy_snapshot(df):
+    return df.apply(
+        lambda r: f"{int(r['year']):04d}-{int(r['month']):02d}-{int(r['day']):02d}",
+        axis=1
+    )
+
+
+def fast_snapshot(df):
+    return build_snapshot_dates(df["year"], df["month"], df["day"])
+
+
+def best_of(fn, arg, repeats):
+    timings = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark step1 datetime normalisation.")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--dayfirst-share",
+        type=float,
+        default=0.001,
+        help="Share of changed_datetime values written as DD/MM/YYYY HH:MM:SS.",
+    )
+    parser.add_argument(
+        "--snapshot-rows",
+        type=int,
+        default=None,
+        help="Rows for the snapshot_date comparison (the legacy apply is slow); defaults to --rows.",
+    )
+    args = parser.parse_args()
+    snapshot_rows = args.snapshot_rows or args.rows
+
+    print(f"[bench] changed_datetime: {args.rows:,} rows "
+          f"({args.dayfirst_share:.1%} DD/MM/YYYY)")
+    raw = make_daily_column(args.rows, dayfirst_share=args.dayfirst_share)
+    t_old, old = best_of(legacy_daily, raw, args.repeats)
+    t_new, new = best_of(fast_daily, raw, args.repeats)
+    assert old.tolist() == new.tolist(), "fast path output differs from legacy"
+    print(f"  legacy: {t_old:.3f} s  fast: {t_new:.3f} s  speedup: {t_old / t_new:.1f}x")
+
+    print(f"[bench] snapshot_date: {snapshot_rows:,} rows")
+    monthly = make_monthly_frame(snapshot_rows)
+    t_old, old = best_of(legacy_snapshot, monthly, 1)
+    t_new, new = best_of(fast_snapshot, monthly, args.repeats)
+    assert old.tolist() == list(new), "fast path output differs from legacy"
+    print(f"  legacy: {t_old:.3f} s  fast: {t_new:.3f} s  speedup: {t_old / t_new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
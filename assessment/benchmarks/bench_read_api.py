@@ -0,0 +1,212 @@
+# benchmarks/bench_read_api.py
+#
+# Load test of the read API (service/read_api.py): for each concurrency
+# level, that many client threads send requests back to back over
+# keep-alive connections for --duration seconds; reports throughput and
+# p50 / p99 latency per level.
+#
+# Requests mix the three endpoints (--mix, in percent): current state,
+# state as of a month start in 2025, and pages of final_latest_accounts.
+# --hot-percent of the requests go to a small hot set of accounts
+# (--hot-accounts), the rest to any account, so the LRU sees a realistic
+# mix of hits and misses.
+#
+# Without --url the API is started as a separate process on the configured
+# database (so clients and server do not share a GIL). Run from the
+# assessment folder:
+#     python -m benchmarks.bench_read_api --concurrency 1 4 16 64 --duration 5
+#     python -m benchmarks.bench_read_api --url http://127.0.0.1:8080 --cache-size 0
+
+import argparse
+import http.client
+import json
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from steps.config import DB_PATH
+
+AS_OF_DATES = [f"2025-{month:02d}-01" for month in range(1, 13)]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def start_server(pool_size, cache_size):
+    """Starts service.read_api on a free port; returns (process, base url)."""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "service.read_api", "--port", "0",
+         "--pool-size", str(pool_size), "--cache-size", str(cache_size)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    line = proc.stdout.readline()
+    match = re.search(r"http://[\d.]+:\d+", line)
+    if not match:
+        proc.kill()
+        raise RuntimeError(f"[load] Read API did not start: {line!r}")
+    return proc, match.group(0)
+
+
+def get_json(base_url, path):
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+    try:
+        conn.request("GET", path)
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+class Workload:
+    """Picks request paths: endpoint by --mix, account from the hot set or all."""
+
+    def __init__(self, accounts, queue_rows, hot_accounts, hot_percent, mix, page_size):
+        self.accounts = accounts
+        self.hot = accounts[:hot_accounts]
+        self.hot_percent = hot_percent
+        self.state_percent, self.as_of_percent, _ = mix
+        self.page_size = page_size
+        # queue -> number of pages it has in final_latest_accounts
+        self.pages = {q: max(1, -(-rows // page_size)) for q, rows in queue_rows.items()}
+
+    def path(self, rng):
+        roll = rng.uniform(0, 100)
+        if roll >= self.state_percent + self.as_of_percent:
+            queue = rng.choice(list(self.pages))
+            offset = rng.randrange(self.pages[queue]) * self.page_size
+            return f"/final_latest_accounts?queue={queue}&limit={self.page_size}&offset={offset}"
+
+        pool = self.hot if rng.uniform(0, 100) < self.hot_percent else self.accounts
+        account = rng.choice(pool)
+        if roll < self.state_percent:
+            return f"/accounts/{account}"
+        return f"/accounts/{account}/state?at={rng.choice(AS_OF_DATES)}"
+
+
+def run_level(base_url, workload, concurrency, duration, seed):
+    """Runs one level; returns (sorted latencies in seconds, errors, elapsed)."""
+    url = urlsplit(base_url)
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    start_gate = threading.Barrier(concurrency + 1)
+    deadline = [0.0]
+
+    def client(i):
+        rng = random.Random(seed * 1000 + i)
+        conn = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+        start_gate.wait()
+        while time.perf_counter() < deadline[0]:
+            path = workload.path(rng)
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors[i] += 1
+            except (OSError, http.client.HTTPException):
+                errors[i] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+                continue
+            latencies[i].append(time.perf_counter() - start)
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    deadline[0] = time.perf_counter() + duration
+    started = time.perf_counter()
+    start_gate.wait()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    return sorted(x for worker in latencies for x in worker), sum(errors), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and latency of the read API.")
+    parser.add_argument("--url", default=None, help="Target a running API instead of starting one.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per level.")
+    parser.add_argument("--mix", type=int, nargs=3, default=[75, 20, 5],
+                        metavar=("STATE", "AS_OF", "LIST"),
+                        help="Percent of requests per endpoint.")
+    parser.add_argument("--hot-accounts", type=int, default=1_000)
+    parser.add_argument("--hot-percent", type=float, default=80.0,
+                        help="Percent of account requests that go to the hot set.")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--cache-size", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Also write the results as JSON.")
+    args = parser.parse_args()
+    if sum(args.mix) != 100:
+        parser.error("--mix must add up to 100")
+
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    try:
+        accounts = [a for (a,) in conn.execute("SELECT account_id FROM accounts ORDER BY account_id;")]
+        queue_rows = dict(conn.execute("""
+            SELECT queue, COUNT(*) FROM final_latest_accounts
+            WHERE queue IS NOT NULL GROUP BY queue;
+        """).fetchall())
+    finally:
+        conn.close()
+    if not accounts:
+        raise SystemExit(f"[load] No accounts in {DB_PATH}")
+    random.Random(args.seed).shuffle(accounts)
+    workload = Workload(accounts, queue_rows or {"COLLECTIONS": 0}, args.hot_accounts,
+                        args.hot_percent, args.mix, args.page_size)
+
+    proc = None
+    base_url = args.url
+    if base_url is None:
+        proc, base_url = start_server(args.pool_size, args.cache_size)
+    print(f"[load] {base_url}, {len(accounts):,} accounts, mix {args.mix}, "
+          f"{args.hot_percent:g}% on {args.hot_accounts:,} hot accounts, {args.duration:g} s per level")
+
+    results = []
+    try:
+        for level in args.concurrency:
+            before = get_json(base_url, "/stats")["cache"]
+            latencies, errors, elapsed = run_level(base_url, workload, level, args.duration, args.seed)
+            after = get_json(base_url, "/stats")["cache"]
+
+            lookups = (after["hits"] - before["hits"]) + (after["misses"] - before["misses"])
+            result = {
+                "concurrency": level,
+                "requests": len(latencies),
+                "errors": errors,
+                "throughput_rps": len(latencies) / elapsed,
+                "p50_ms": percentile(latencies, 0.50) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+                "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+                "cache_hit_rate": (after["hits"] - before["hits"]) / lookups if lookups else 0.0,
+            }
+            results.append(result)
+            print(f"[load] concurrency {level:>3}: {result['throughput_rps']:>8,.0f} req/s, "
+                  f"p50 {result['p50_ms']:6.2f} ms, p99 {result['p99_ms']:7.2f} ms, "
+                  f"max {result['max_ms']:7.2f} ms, cache hits {result['cache_hit_rate']:.0%}, "
+                  f"errors {errors}", flush=True)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# benchmarks/generate_data.py
+#
+# Synthetic input data in the same layout as data/: accounts.csv,
+# daily_YYYYMMDD.csv and monthly_YYYYMM.csv.
+# Run from the assessment folder:
+#     python -m benchmarks.generate_data --accounts 100000 --out /tmp/bench_data
+#
+# Queues follow a Markov chain (an account in COLLECTIONS mostly moves to
+# PAYING or LEGAL, LEGAL to PAYING/INSOLVENCY/SETTLED, ...) and the status is
+# one of the statuses seen with that queue in the real files. Every day a
+# share of the accounts changes queue; on day MONTHLY_DAY of each month a
+# sample of accounts is written as a monthly snapshot of their state at
+# midnight.
+
+import argparse
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+QUEUES = ["COLLECTIONS", "LEGAL", "PAYING", "TRACE", "OTHER", "SETTLED", "INSOLVENCY"]
+
+STATUSES = {
+    "COLLECTIONS": ["CANCEL2", "CANCEL4", "TELSOLUTIONS1", "TELSOLUTIONS4",
+                    "PAY OVER", "PRIME", "PRIME_D", "CASSIST2"],
+    "LEGAL": ["LEG VERIF 1", "LEG VERIF 2", "LEG_TIT", "LEG_NOT", "HOLD FO"],
+    "PAYING": ["PAY PROP", "PAY CURR"],
+    "TRACE": ["GONEAWAY"],
+    "OTHER": ["ARCHIVED"],
+    "SETTLED": ["SETTLED"],
+    "INSOLVENCY": ["INS1", "INS2", "INS3", "INS4", "INSP"],
+}
+
+# Row: current queue, columns: next queue (same order as QUEUES)
+TRANSITIONS = np.array([
+    # COLL  LEGAL PAYING TRACE OTHER SETTL INSOL
+    [0.00, 0.30, 0.35, 0.15, 0.05, 0.10, 0.05],  # COLLECTIONS
+    [0.10, 0.00, 0.35, 0.05, 0.05, 0.25, 0.20],  # LEGAL
+    [0.45, 0.10, 0.00, 0.05, 0.05, 0.30, 0.05],  # PAYING
+    [0.40, 0.20, 0.15, 0.00, 0.20, 0.00, 0.05],  # TRACE
+    [0.40, 0.10, 0.20, 0.20, 0.00, 0.05, 0.05],  # OTHER
+    [0.30, 0.05, 0.40, 0.05, 0.20, 0.00, 0.00],  # SETTLED
+    [0.15, 0.25, 0.20, 0.05, 0.25, 0.10, 0.00],  # INSOLVENCY
+])
+
+# Queue of every account before the first day
+INITIAL_SHARE = np.array([0.25, 0.15, 0.25, 0.10, 0.10, 0.10, 0.05])
+
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael",
+               "Linda", "David", "Elizabeth", "Sean", "Aoife", "Ciara", "Niamh"]
+LAST_NAMES = ["Murphy", "Kelly", "Byrne", "Ryan", "Walsh", "Smith", "Wilson",
+              "Davis", "O'Brien", "Doyle", "McCarthy", "Lynch"]
+STREETS = ["Main Street", "Riverside Drive", "Pine Road", "Church Lane", "Harbour View"]
+TOWNS = ["Dublin", "Cork", "Galway", "Limerick", "Waterford", "Kilkenny"]
+
+MONTHLY_DAY = 5
+
+
+def write_accounts(out_dir, accounts, rng):
+    ids = np.arange(1, accounts + 1)
+    first = np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), accounts)]
+    last = np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), accounts)]
+    number = rng.integers(1, 300, accounts).astype(str).astype(object)
+    street = np.array(STREETS, dtype=object)[rng.integers(0, len(STREETS), accounts)]
+    town = np.array(TOWNS, dtype=object)[rng.integers(0, len(TOWNS), accounts)]
+
+    pd.DataFrame({
+        "account_id": ids,
+        "name": first + " " + last,
+        "address": number + " " + street + ", " + town,
+    }).to_csv(out_dir / "accounts.csv", index=False)
+
+
+def next_queues(current, rng):
+    """Draws the next queue code for every entry of `current` from TRANSITIONS."""
+    nxt = np.empty_like(current)
+    for q in range(len(QUEUES)):
+        members = current == q
+        if members.any():
+            nxt[members] = rng.choice(len(QUEUES), size=members.sum(), p=TRANSITIONS[q])
+    return nxt
+
+
+def pick_statuses(queue_codes, rng):
+    """Draws a status for each queue code among that queue's statuses."""
+    statuses = np.empty(len(queue_codes), dtype=object)
+    for q, name in enumerate(QUEUES):
+        members = queue_codes == q
+        if members.any():
+            options = np.array(STATUSES[name], dtype=object)
+            statuses[members] = options[rng.integers(0, len(options), members.sum())]
+    return statuses
+
+
+def write_monthly(out_dir, day, queue, status, share, rng):
+    picked = np.flatnonzero(rng.random(len(queue)) < share)
+    pd.DataFrame({
+        "account": picked + 1,
+        "queue": np.array(QUEUES, dtype=object)[queue[picked]],
+        "status": status[picked],
+        "month": f"{day.month:02d}",
+        "day": f"{day.day:02d}",
+    }).to_csv(out_dir / f"monthly_{day:%Y%m}.csv", index=False)
+
+
+def write_daily(out_dir, day, queue, status, change_rate, rng):
+    """Moves a random share of accounts to their next queue; returns the rows written."""
+    n = rng.binomial(len(queue), change_rate)
+    changed = np.sort(rng.choice(len(queue), size=n, replace=False))
+
+    queue[changed] = next_queues(queue[changed], rng)
+    status[changed] = pick_statuses(queue[changed], rng)
+
+    seconds = np.sort(rng.integers(0, 86400, size=n)).astype("timedelta64[s]")
+    stamps = np.datetime64(day.isoformat(), "s") + seconds
+    order = rng.permutation(n)  # shuffle accounts across the day
+
+    pd.DataFrame({
+        "account": changed[order] + 1,
+        "queue": np.array(QUEUES, dtype=object)[queue[changed[order]]],
+        "status": status[changed[order]],
+        "changed_datetime": np.char.replace(np.datetime_as_string(stamps, unit="s"), "T", " "),
+    }).to_csv(out_dir / f"daily_{day:%Y%m%d}.csv", index=False)
+    return n
+
+
+def generate(out_dir, accounts=10_000, days=365, start=date(2024, 11, 26),
+             change_rate=0.02, monthly_share=0.45, seed=0):
+    """
+    Writes accounts.csv plus one daily file per day and one monthly file per
+    month into out_dir. Returns a dict with the number of rows written.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    write_accounts(out_dir, accounts, rng)
+
+    queue = rng.choice(len(QUEUES), size=accounts, p=INITIAL_SHARE)
+    status = pick_statuses(queue, rng)
+
+    daily_rows = monthly_files = 0
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        if day.day == MONTHLY_DAY:
+            write_monthly(out_dir, day, queue, status, monthly_share, rng)
+            monthly_files += 1
+        daily_rows += write_daily(out_dir, day, queue, status, change_rate, rng)
+
+    return {
+        "accounts": accounts,
+        "daily_files": days,
+        "daily_rows": daily_rows,
+        "monthly_files": monthly_files,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic assessment input files.")
+    parser.add_argument("--out", required=True, help="Output folder (created if missing).")
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2024, 11, 26))
+    parser.add_argument("--change-rate", type=float, default=0.02,
+                        help="Share of accounts changing queue each day.")
+    parser.add_argument("--monthly-share", type=float, default=0.45,
+                        help="Share of accounts in each monthly snapshot.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stats = generate(
+        args.out, accounts=args.accounts, days=args.days, start=args.start,
+        change_rate=args.change_rate, monthly_share=args.monthly_share, seed=args.seed,
+    )
+    print(f"[generate] Wrote {stats['daily_rows']:,} daily rows in {stats['daily_files']} files, "
+          f"{stats['monthly_files']} monthly files, {stats['accounts']:,} accounts to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# benchmarks/suite.py
+#
+# Times every pipeline step separately on generated data and writes the
+# results as JSON, so runs on different commits can be compared.
+# Run from the assessment folder:
+#     python -m benchmarks.suite --accounts 100000 --output bench_100k.json
+#     python -m benchmarks.suite --accounts 100000 --compare bench_100k.json
+#
+# Each step gets `--warmup` untimed runs and `--repeats` timed runs; the
+# JSON holds min, median, p95 and mean per step. Step output is captured
+# (use --verbose to see it).
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.generate_data import generate
+
+ASSESSMENT_DIR = Path(__file__).resolve().parents[1]
+
+STEPS = ["step1", "step2", "step3", "step4", "step5"]
+
+STEP_MODULES = {
+    "step1": "steps.step1_setup_db",
+    "step2": "steps.step2_active_accounts",
+    "step3": "steps.step3_latest_collections_legal",
+    "step4": "steps.step4_final_table",
+    "step5": "steps.step5_performance",
+}
+
+
+def load_steps(data_dir, db_path):
+    """
+    Imports the step modules against data_dir/db_path (steps.config reads
+    ASSESSMENT_DATA_DIR / ASSESSMENT_DB_PATH at import time).
+    """
+    os.environ["ASSESSMENT_DATA_DIR"] = str(data_dir)
+    os.environ["ASSESSMENT_DB_PATH"] = str(db_path)
+    return {name: importlib.import_module(module).run for name, module in STEP_MODULES.items()}
+
+
+def summarize(times):
+    arr = np.array(times)
+    return {
+        "runs": len(times),
+        "min": float(arr.min()),
+        "median": float(np.median(arr)),
+        "p95": float(np.percentile(arr, 95)),
+        "mean": float(arr.mean()),
+        "times": [float(t) for t in times],
+    }
+
+
+def time_step(fn, warmup, repeats, verbose):
+    times = []
+    for i in range(warmup + repeats):
+        sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with sink:
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+        if i >= warmup:
+            times.append(elapsed)
+    return summarize(times)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ASSESSMENT_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def table_counts(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0]
+            for table in ["accounts", "daily_status", "monthly_status", "events",
+                          "latest_status_collections_legal"]
+        }
+    finally:
+        conn.close()
+
+
+def compare(results, baseline_path):
+    baseline = json.loads(Path(baseline_path).read_text())
+    print(f"[suite] Median vs {baseline_path} (commit {baseline.get('commit')}):")
+    for step, stats in results["steps"].items():
+        old = baseline.get("steps", {}).get(step)
+        if old is None:
+            continue
+        ratio = stats["median"] / old["median"] if old["median"] else float("inf")
+        print(f"  {step}: {old['median']:.3f} s -> {stats['median']:.3f} s ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline step on generated data.")
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--change-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=None,
+                        help="Use (or generate once into) this folder instead of a temp folder.")
+    parser.add_argument("--steps", nargs="+", choices=STEPS, default=STEPS)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default=None, help="Write the results to this JSON file.")
+    parser.add_argument("--compare", default=None, help="Print median ratios against this JSON file.")
+    parser.add_argument("--verbose", action="store_true", help="Show step output.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        data_dir = Path(args.data_dir) if args.data_dir else tmp / "data"
+        db_path = tmp / "bench.db"
+
+        if not (data_dir / "accounts.csv").exists():
+            print(f"[suite] Generating {args.accounts:,} accounts x {args.days} days into {data_dir}...")
+            generate(data_dir, accounts=args.accounts, days=args.days,
+                     change_rate=args.change_rate, seed=args.seed)
+
+        steps = load_steps(data_dir, db_path)
+
+        # step4 writes its CSV to the working directory
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            # Later steps need the tables of the earlier ones
+            with contextlib.redirect_stdout(io.StringIO()):
+                for name in STEPS[:max(STEPS.index(s) for s in args.steps)]:
+                    steps[name]()
+
+            results = {}
+            for name in STEPS:
+                if name not in args.steps:
+                    continue
+                stats = time_step(steps[name], args.warmup, args.repeats, args.verbose)
+                results[name] = stats
+                print(f"[suite] {name}: min {stats['min']:.3f} s, median {stats['median']:.3f} s, "
+                      f"p95 {stats['p95']:.3f} s")
+        finally:
+            os.chdir(cwd)
+
+        report = {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "scale": {
+                "accounts": args.accounts,
+                "days": args.days,
+                "change_rate": args.change_rate,
+                "seed": args.seed,
+                "data_dir": str(args.data_dir) if args.data_dir else None,
+            },
+            "rows": table_counts(db_path),
+            "warmup": args.warmup,
+            "repeats": args.repeats,
+            "steps": results,
+        }
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"[suite] Wrote {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,343 @@
+import argparse
+import time
+
+from steps.columnar_cache import CACHE_DIR, run as run_columnar_cache
+from steps.config import DATA_DIR, DB_PATH
+from steps.db import open_in_memory, save_to_disk
+from steps.instrumentation import PipelineMetrics
+from steps.occupancy import run as run_occupancy
+from steps.pipeline import Step, run_pipeline
+from steps.sharding import run_sharded
 from steps.step1_setup_db import run as run_step1
-from steps.step2_active_accounts import run as run_step2
-from steps.step3_latest_collections_legal import run as run_step3
-from steps.step4_final_table import run as run_step4
+from steps.step2_active_accounts import START_DATE, run as run_step2
+from steps.step3_latest_collections_legal import (
+    ENGINES,
+    REFERENCE_DATETIME,
+    TARGET_QUEUES,
+    run as run_step3,
+)
+from steps.step4_final_table import DEFAULT_OUTPUT, run as run_step4
 from steps.step5_performance import run as run_step5
 
 
-def main():
-    print("Starting orchestrator")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the assessment pipeline.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Step 1 only loads new or changed CSV files, and steps 3-4 only recompute "
+             "the accounts touched by the new events.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used to parse daily/monthly CSV files in step 1 (0 = all cores).",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Step 1 reads CSV files in chunks and writes each chunk immediately (bounded memory).",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=100_000,
+        help="Rows per chunk in --streaming mode.",
+    )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        help="Step 1 loads accounts, daily and monthly files concurrently into staging "
+             "databases and merges them into data.db.",
+    )
+    parser.add_argument(
+        "--columnar-cache",
+        action="store_true",
+        help="Refresh the memory-mapped columnar events cache after step 1 "
+             "(used by --engine numpy).",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=0,
+        help="Run steps 2-4 on N account shards in a process pool and merge the results "
+             "(always a full rebuild of steps 2-4).",
+    )
+    parser.add_argument(
+        "--output",
+        default=DEFAULT_OUTPUT,
+        help="Where step 4 exports final_latest_accounts: .csv, .csv.gz or .jsonl "
+             f"(default: {DEFAULT_OUTPUT}).",
+    )
+    parser.add_argument(
+        "--reference-datetime",
+        default=REFERENCE_DATETIME,
+        help="Step 3 'as of' time, 'YYYY-MM-DD HH:MM:SS' (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--queues",
+        nargs="+",
+        default=TARGET_QUEUES,
+        help="Step 3 target queues (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="sqlite",
+        help="How step 3 computes the latest states: SQL index seeks or in-memory NumPy arrays.",
+    )
+    parser.add_argument(
+        "--result-cache",
+        action="store_true",
+        help="Step 3 rebuilds read their rows through the query_cache table, so a "
+             "reference datetime / queue list already computed on the same data is not "
+             "queried again (SQL engine only).",
+    )
+    parser.add_argument(
+        "--occupancy",
+        action="store_true",
+        help="Also update the queue_occupancy_daily series after step 1.",
+    )
+    parser.add_argument(
+        "--advise-indexes",
+        action="store_true",
+        help="Step 5 also explains every pipeline query and recommends indexes.",
+    )
+    parser.add_argument(
+        "--apply-indexes",
+        action="store_true",
+        help="Like --advise-indexes, and creates the recommended indexes.",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        default=None,
+        help="Write per-step metrics (time, rows, memory, SQL statements) to this JSON file.",
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        default=None,
+        help="Write per-step metrics as a Prometheus textfile.",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default=None,
+        help="Dump a cProfile file per step (stepN.prof) into this folder.",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Also record each step's Python heap peak with tracemalloc (slower).",
+    )
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="Run every step on one in-memory copy of data.db and write it back "
+             "in a single backup at the end.",
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        default=None,
+        metavar="STEP",
+        help="Run just these steps (e.g. --only step4), using the existing tables of the others.",
+    )
+    parser.add_argument(
+        "--from-step",
+        default=None,
+        metavar="STEP",
+        help="Run this step and every step after it.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run every selected step even if its inputs have not changed.",
+    )
+    args = parser.parse_args(argv)
+    if args.only and args.from_step:
+        parser.error("--only and --from-step cannot be combined")
+    if args.in_memory and args.shards:
+        parser.error("--in-memory cannot be combined with --shards (shard workers read data.db)")
+    return args
+
+
+def input_files():
+    return (
+        [DATA_DIR / "accounts.csv"]
+        + sorted(DATA_DIR.glob("daily_*.csv"))
+        + sorted(DATA_DIR.glob("monthly_*.csv"))
+    )
+
+
+def build_steps(args, conn=None):
+    """
+    The pipeline as a DAG, in execution order (see steps/pipeline.py).
+    conn: connection every step runs on (in-memory mode), else each step
+    opens its own.
+    """
+    queues = [q.upper() for q in args.queues]
 
-    # Step 1: create tables and load raw data
-    run_step1()
+    steps = [
+        # Step 1: create tables and load raw data
+        Step(
+            "step1",
+            lambda: run_step1(
+                incremental=args.incremental,
+                workers=args.workers,
+                streaming=args.streaming,
+                chunksize=args.chunksize,
+                staged=args.staged,
+                conn=conn,
+            ),
+            files=input_files,
+            # --workers only changes how fast the same tables are built
+            params={
+                "incremental": args.incremental,
+                "streaming": args.streaming,
+                "chunksize": args.chunksize if args.streaming else None,
+                "staged": args.staged,
+            },
+            output_tables=[
+                "accounts", "queues", "statuses", "daily_status", "monthly_status",
+                "events", "event_accounts", "account_activity", "account_activity_monthly",
+            ],
+        ),
+    ]
 
-    # Step 2: identify active accounts from 2025-01-01 onwards
-    run_step2()
+    # Optional: memory-mapped columnar copy of events (rebuilt when the
+    # source files change)
+    if args.columnar_cache:
+        steps.append(Step(
+            "columnar_cache", lambda: run_columnar_cache(conn=conn),
+            upstream=["step1"],
+            output_files=[CACHE_DIR / "meta.json"],
+        ))
+
+    # Optional: daily queue occupancy series (extended incrementally)
+    if args.occupancy:
+        steps.append(Step(
+            "occupancy", lambda: run_occupancy(conn=conn),
+            upstream=["step1"],
+            output_tables=["queue_occupancy_daily"],
+        ))
+
+    if args.shards:
+        # Steps 2-4 on account shards, one process each, merged into data.db
+        steps += [
+            Step(
+                "step2-4",
+                lambda: run_sharded(
+                    args.shards,
+                    reference_datetime=args.reference_datetime,
+                    target_queues=args.queues,
+                    engine=args.engine,
+                    output=args.output,
+                ),
+                upstream=["step1"],
+                params={
+                    "start_date": START_DATE,
+                    "reference_datetime": args.reference_datetime,
+                    "queues": queues,
+                },
+                output_tables=[
+                    "active_accounts", "latest_status_collections_legal", "final_latest_accounts",
+                ],
+                output_files=[args.output],
+            ),
+            Step(
+                "step5",
+                lambda: run_step5(
+                    advise=args.advise_indexes, apply_indexes=args.apply_indexes,
+                    reference_datetime=args.reference_datetime, target_queues=args.queues,
+                ),
+                upstream=["step1", "step2-4"],
+                cacheable=False,
+            ),
+        ]
+        return steps
+
+    steps += [
+        # Step 2: identify active accounts from 2025-01-01 onwards
+        Step(
+            "step2", lambda: run_step2(conn=conn),
+            upstream=["step1"],
+            params={"start_date": START_DATE},
+            output_tables=["active_accounts"],
+        ),
+        # Step 3: compute latest changes for accounts that
+        # are in COLLECTIONS or LEGAL as of 2025-11-27 (by default)
+        Step(
+            "step3",
+            lambda: run_step3(
+                reference_datetime=args.reference_datetime,
+                target_queues=args.queues,
+                incremental=args.incremental,
+                engine=args.engine,
+                use_result_cache=args.result_cache,
+                conn=conn,
+            ),
+            upstream=["step1"],
+            params={"reference_datetime": args.reference_datetime, "queues": queues},
+            output_tables=["latest_status_collections_legal"],
+        ),
+        # Step 4: build final output table with account details
+        Step(
+            "step4",
+            lambda: run_step4(incremental=args.incremental, output=args.output, conn=conn),
+            upstream=["step1", "step3"],
+            output_tables=["final_latest_accounts"],
+            output_files=[args.output],
+        ),
+        # Step 5: measure and optimize query performance (a measurement,
+        # so it runs every time)
+        Step(
+            "step5",
+            lambda: run_step5(
+                advise=args.advise_indexes, apply_indexes=args.apply_indexes,
+                reference_datetime=args.reference_datetime, target_queues=args.queues,
+                conn=conn,
+            ),
+            upstream=["step1", "step3"],
+            cacheable=False,
+        ),
+    ]
+    return steps
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("Starting orchestrator")
+    metrics = PipelineMetrics(profile_dir=args.profile_dir, trace_memory=args.trace_memory)
 
-    # Step 3: compute latest changes for accounts that
-    # are in COLLECTIONS or LEGAL as of 2025-11-27
-    run_step3()
+    conn = None
+    if args.in_memory:
+        start = time.perf_counter()
+        conn = open_in_memory()
+        print(f"[orchestrator] Loaded {DB_PATH} into memory in {time.perf_counter() - start:.3f} s")
 
-    # Step 4: build final output table with account details
-    run_step4()
+    try:
+        run_pipeline(
+            build_steps(args, conn),
+            only=args.only,
+            from_step=args.from_step,
+            force=args.force,
+            metrics=metrics,
+            conn=conn,
+        )
+    finally:
+        if conn is not None:
+            # Also after a failure, like the per-step commits of a disk run
+            start = time.perf_counter()
+            save_to_disk(conn)
+            conn.close()
+            print(f"[orchestrator] Saved the in-memory database to {DB_PATH} "
+                  f"in {time.perf_counter() - start:.3f} s")
 
-    # Step 5: measure and optimize query performance
-    run_step5()
+    metrics.print_summary()
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
+    if args.metrics_prom:
+        metrics.write_prometheus(args.metrics_prom)
 
     print("Orchestration finished")
 
@@ -0,0 +1,310 @@
+# service/ingest_daemon.py
+#
+# Long-running ingestion service: watches DATA_DIR for new or changed
+# accounts.csv / daily_*.csv / monthly_*.csv files and ingests each one as
+# soon as it has landed, then updates only the affected accounts in
+# latest_status_collections_legal and final_latest_accounts (the
+# incremental paths of steps 1, 3 and 4), without a full pipeline run.
+#
+# Files are found by polling (works on any filesystem, including network
+# mounts without inotify). A file is ingested once its size and mtime have
+# not changed for --settle seconds, so half-copied files are not read.
+# When an ingest fails (e.g. "database is locked" while the orchestrator is
+# writing), its files are queued again after a backoff that doubles on each
+# failure, up to --max-backoff seconds.
+#
+# Run from the assessment folder:
+#     python -m service.ingest_daemon --interval 1 --settle 2 --metrics-prom ingest.prom
+#     python -m service.ingest_daemon --once      # ingest what is there and exit
+
+import argparse
+import asyncio
+import signal
+import time
+from pathlib import Path
+
+from steps.activity import update_account_activity
+from steps.bulk_load import bulk_load_session
+from steps.config import DATA_DIR, DB_PATH
+from steps.db import connect
+from steps.events import create_events_indexes, create_events_table, refresh_events
+from steps.instrumentation import write_atomic
+from steps.step1_setup_db import (
+    create_indexes,
+    create_tables,
+    load_accounts,
+    load_daily_status,
+    load_monthly_status,
+)
+from steps.step3_latest_collections_legal import (
+    REFERENCE_DATETIME,
+    TARGET_QUEUES,
+    update_latest_status_table,
+)
+from steps.step4_final_table import update_final_table
+
+WATCH_PATTERNS = ("accounts.csv", "daily_*.csv", "monthly_*.csv")
+
+PROMETHEUS_PREFIX = "assessment_ingest"
+
+
+def ingest_files(paths, reference_datetime=REFERENCE_DATETIME, target_queues=TARGET_QUEUES):
+    """
+    Loads the given files incrementally (the ingested_files manifest still
+    skips files whose content was already loaded), appends the new events
+    and updates the accounts they touch in steps 3 and 4. Runs in a worker
+    thread with its own connection. Returns (new events, files loaded); the
+    files the manifest skipped are the rest of `paths`.
+    """
+    accounts = [p for p in paths if p.name == "accounts.csv"]
+    daily = [p for p in paths if p.name.startswith("daily_")]
+    monthly = [p for p in paths if p.name.startswith("monthly_")]
+
+    conn = connect()
+    try:
+        create_tables(conn, drop_existing=False)
+        create_events_table(conn, drop_existing=False)
+        manifest = dict(conn.execute(
+            "SELECT file_name, content_hash FROM ingested_files;"
+        ).fetchall())
+
+        with bulk_load_session(conn):
+            create_indexes(conn)
+            if accounts:
+                load_accounts(conn, incremental=True)
+            if daily:
+                load_daily_status(conn, incremental=True, files=daily)
+            if monthly:
+                load_monthly_status(conn, incremental=True, files=monthly)
+            added = refresh_events(conn)
+            create_events_indexes(conn)
+
+        update_account_activity(conn)
+        update_latest_status_table(conn, reference_datetime, target_queues)
+        update_final_table(conn)
+
+        # A file was loaded when its manifest row is new or has new content
+        loaded = sum(
+            manifest.get(name) != content_hash
+            for name, content_hash in conn.execute(
+                f"SELECT file_name, content_hash FROM ingested_files "
+                f"WHERE file_name IN ({','.join('?' * len(paths))});",
+                [p.name for p in paths],
+            )
+        )
+        return added, loaded
+    finally:
+        conn.close()
+
+
+class IngestDaemon:
+    """
+    Two tasks around an asyncio.Queue: watch() polls DATA_DIR and queues
+    files once they have settled; ingest() drains the queue in batches and
+    runs ingest_files in a thread, so polling never waits for SQLite.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, interval=1.0, settle=2.0,
+                 reference_datetime=REFERENCE_DATETIME, target_queues=TARGET_QUEUES,
+                 metrics_path=None, backoff=1.0, max_backoff=60.0):
+        self.data_dir = Path(data_dir)
+        self.interval = interval
+        self.settle = settle
+        self.reference_datetime = reference_datetime
+        self.target_queues = target_queues
+        self.metrics_path = metrics_path
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # Files already there at start-up count as landed at start-up
+        self.started_at = time.time()
+
+        self.queue = asyncio.Queue()
+        self.stopping = asyncio.Event()
+        # name -> (size, mtime_ns) of the version last queued
+        self.queued = {}
+        # name -> ((size, mtime_ns), monotonic time it was first seen like that)
+        self.pending = {}
+        # name -> (consecutive failures, monotonic time before which it is not retried)
+        self.failures = {}
+
+        self.metrics = {
+            "queue_depth": 0,
+            "pending_files": 0,
+            "lag_seconds": 0.0,
+            "max_lag_seconds": 0.0,
+            "batch_seconds": 0.0,
+            "files_total": 0,
+            "files_skipped_total": 0,
+            "events_total": 0,
+            "batches_total": 0,
+            "errors_total": 0,
+            "last_success_timestamp": 0.0,
+        }
+
+    def candidates(self):
+        paths = set()
+        for pattern in WATCH_PATTERNS:
+            paths.update(self.data_dir.glob(pattern))
+        return sorted(paths)
+
+    def poll(self, settle):
+        """One scan of DATA_DIR; queues files unchanged for `settle` seconds."""
+        now = time.monotonic()
+        for path in self.candidates():
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            signature = (st.st_size, st.st_mtime_ns)
+            if self.queued.get(path.name) == signature:
+                continue
+            failed = self.failures.get(path.name)
+            if failed is not None and now < failed[1]:
+                continue
+
+            seen = self.pending.get(path.name)
+            if seen is None or seen[0] != signature:
+                self.pending[path.name] = (signature, now)
+                seen = self.pending[path.name]
+            if now - seen[1] >= settle:
+                del self.pending[path.name]
+                self.queued[path.name] = signature
+                self.queue.put_nowait((path, max(st.st_mtime, self.started_at)))
+        self.update_depth()
+
+    def update_depth(self):
+        self.metrics["queue_depth"] = self.queue.qsize()
+        self.metrics["pending_files"] = len(self.pending)
+
+    async def watch(self):
+        while not self.stopping.is_set():
+            self.poll(self.settle)
+            self.write_metrics()
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def ingest_batch(self):
+        """Ingests everything queued so far. Returns False when the queue was empty."""
+        batch = []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        if not batch:
+            return False
+
+        paths = [path for path, _ in batch]
+        names = ", ".join(p.name for p in paths[:5]) + (", ..." if len(paths) > 5 else "")
+        print(f"[daemon] Ingesting {len(paths)} file(s): {names}", flush=True)
+        start = time.perf_counter()
+        try:
+            added, loaded = await asyncio.to_thread(
+                ingest_files, paths, self.reference_datetime, self.target_queues
+            )
+        except Exception as exc:
+            delay = self.retry_later(paths)
+            self.metrics["errors_total"] += 1
+            print(f"[daemon] Ingest failed: {exc!r}, retrying in {delay:.1f} s", flush=True)
+        else:
+            # Time from the oldest file landing to its events being queryable
+            lag = time.time() - min(landed for _, landed in batch)
+            self.metrics["lag_seconds"] = lag
+            self.metrics["max_lag_seconds"] = max(self.metrics["max_lag_seconds"], lag)
+            # Files the manifest skipped (content already loaded) are not throughput
+            self.metrics["files_total"] += loaded
+            self.metrics["files_skipped_total"] += len(paths) - loaded
+            for path in paths:
+                self.failures.pop(path.name, None)
+            self.metrics["events_total"] += added
+            self.metrics["last_success_timestamp"] = time.time()
+            print(f"[daemon] Ingested {added} new events from {loaded} file(s) "
+                  f"({len(paths) - loaded} already loaded), lag {lag:.2f} s", flush=True)
+        finally:
+            self.metrics["batch_seconds"] = time.perf_counter() - start
+            self.metrics["batches_total"] += 1
+            self.update_depth()
+            self.write_metrics()
+        return True
+
+    def retry_later(self, paths):
+        """
+        Forgets that the files were queued, so a later poll() queues them
+        again, and holds them back for an exponential backoff. Returns the
+        longest delay applied.
+        """
+        now = time.monotonic()
+        longest = 0.0
+        for path in paths:
+            self.queued.pop(path.name, None)
+            count = self.failures.get(path.name, (0, 0.0))[0] + 1
+            delay = min(self.backoff * 2 ** (count - 1), self.max_backoff)
+            self.failures[path.name] = (count, now + delay)
+            longest = max(longest, delay)
+        return longest
+
+    async def ingest(self):
+        while not self.stopping.is_set():
+            if not await self.ingest_batch():
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout=self.interval / 4)
+                except asyncio.TimeoutError:
+                    pass
+
+    def prometheus_text(self):
+        kinds = {"files_total", "files_skipped_total", "events_total", "batches_total", "errors_total"}
+        lines = []
+        for name, value in self.metrics.items():
+            metric = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} {'counter' if name in kinds else 'gauge'}")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self):
+        if self.metrics_path:
+            write_atomic(self.metrics_path, self.prometheus_text())
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stopping.set)
+
+        print(f"[daemon] Watching {self.data_dir} every {self.interval} s "
+              f"(settle {self.settle} s), database {DB_PATH}", flush=True)
+        await asyncio.gather(self.watch(), self.ingest())
+        print("[daemon] Stopped", flush=True)
+
+    async def run_once(self):
+        """Ingests every new or changed file currently in DATA_DIR, then returns."""
+        self.poll(settle=0)
+        await self.ingest_batch()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch DATA_DIR and ingest new files continuously.")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between scans.")
+    parser.add_argument("--settle", type=float, default=2.0,
+                        help="Seconds a file's size and mtime must stay unchanged before ingesting.")
+    parser.add_argument("--reference-datetime", default=REFERENCE_DATETIME)
+    parser.add_argument("--queues", nargs="+", default=TARGET_QUEUES)
+    parser.add_argument("--metrics-prom", default=None,
+                        help="Prometheus textfile with ingest lag, queue depth and counters.")
+    parser.add_argument("--backoff", type=float, default=1.0,
+                        help="Seconds before retrying files whose ingest failed (doubles per failure).")
+    parser.add_argument("--max-backoff", type=float, default=60.0)
+    parser.add_argument("--once", action="store_true", help="Ingest what is there and exit.")
+    args = parser.parse_args(argv)
+
+    daemon = IngestDaemon(
+        interval=args.interval,
+        settle=args.settle,
+        reference_datetime=args.reference_datetime,
+        target_queues=args.queues,
+        metrics_path=args.metrics_prom,
+        backoff=args.backoff,
+        max_backoff=args.max_backoff,
+    )
+    asyncio.run(daemon.run_once() if args.once else daemon.run())
+
+
+if __name__ == "__main__":
+    main()
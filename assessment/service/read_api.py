@@ -0,0 +1,378 @@
+# service/read_api.py
+#
+# Local HTTP read service on top of data.db, so downstream scripts do not
+# open the database themselves and contend with the pipeline's writes:
+#
+#     GET /accounts/<id>                    current state, name and address
+#     GET /accounts/<id>/state?at=<ts>      state as of YYYY-MM-DD[ HH:MM:SS]
+#     GET /final_latest_accounts?queue=LEGAL&limit=100&offset=0
+#     GET /health, GET /stats
+#
+# Requests are served by a ThreadingHTTPServer; each request borrows one of
+# --pool-size read-only connections (mode=ro, query_only). main() switches
+# the database to WAL, which later pipeline runs keep (see bulk_load_session
+# in steps/bulk_load.py), so these readers never block the pipeline's
+# commits and see the last committed data.
+#
+# Account responses are kept in an LRU keyed by (account, as-of time). The
+# cache is emptied whenever pipeline_meta's data_version changes, i.e. after
+# any ingestion (steps/meta.py).
+#
+# Run from the assessment folder:
+#     python -m service.read_api --port 8080 --pool-size 8 --cache-size 50000
+
+import argparse
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from steps.bulk_load import set_journal_mode
+from steps.config import DB_PATH
+from steps.db import connect
+from steps.meta import data_version
+from steps.state import account_state, to_epoch
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_CACHE_SIZE = 50_000
+
+# Rows returned by /final_latest_accounts when no limit is given, and at most
+DEFAULT_PAGE = 1_000
+MAX_PAGE = 10_000
+
+# Seconds a request waits for a free connection before answering 503
+POOL_TIMEOUT = 5.0
+
+# account_id is a SQLite INTEGER (signed 64-bit)
+MAX_ACCOUNT_ID = 2**63 - 1
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Fixed set of read-only connections shared by the server threads:
+
+        with pool.connection() as conn:
+            conn.execute(...)
+    """
+
+    def __init__(self, path=DB_PATH, size=DEFAULT_POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.idle = queue.Queue()
+        self.waits = 0
+        for _ in range(size):
+            self.idle.put(self._open())
+
+    def _open(self):
+        conn = sqlite3.connect(
+            f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+        )
+        conn.execute("PRAGMA query_only = ON;")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            self.waits += 1
+            try:
+                conn = self.idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise PoolExhausted(f"no free connection after {self.timeout} s") from None
+        try:
+            yield conn
+        finally:
+            # Ends the read transaction, so the pipeline can checkpoint the WAL
+            conn.rollback()
+            self.idle.put(conn)
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+
+class LRUCache:
+    """Thread-safe LRU of responses, emptied when the data version changes."""
+
+    def __init__(self, size=DEFAULT_CACHE_SIZE):
+        self.size = size
+        self.items = OrderedDict()
+        self.version = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self.lock:
+            if version != self.version:
+                self.items.clear()
+                self.version = version
+            value = self.items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version):
+        with self.lock:
+            if version != self.version or self.size <= 0:
+                return
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+
+class ReadService:
+    """The queries behind the endpoints, on a ConnectionPool and an LRUCache."""
+
+    def __init__(self, path=DB_PATH, pool_size=DEFAULT_POOL_SIZE, cache_size=DEFAULT_CACHE_SIZE):
+        self.pool = ConnectionPool(path, pool_size)
+        self.cache = LRUCache(cache_size)
+        self.started_at = time.time()
+        self.requests = 0
+        self.requests_lock = threading.Lock()
+
+    def count_request(self):
+        with self.requests_lock:
+            self.requests += 1
+
+    def account(self, account, at=None):
+        """
+        State of one account (latest, or as of `at`) with its name and
+        address, or None when the account is unknown.
+        """
+        at = None if at is None else to_epoch(at)
+        key = (account, at)
+        with self.pool.connection() as conn:
+            version = data_version(conn)
+            cached = self.cache.get(key, version)
+            if cached is not None:
+                return cached
+
+            details = conn.execute(
+                "SELECT name, address FROM accounts WHERE account_id = ?;", (account,)
+            ).fetchone()
+            state = account_state(conn, account, at)
+
+        if details is None and state is None:
+            return None
+        result = {
+            "account_id": account,
+            "name": details[0] if details else None,
+            "address": details[1] if details else None,
+            "as_of": None if at is None else time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(at)),
+            "queue": state[1] if state else None,
+            "status": state[2] if state else None,
+            "event_datetime": state[3] if state else None,
+        }
+        self.cache.put(key, result, version)
+        return result
+
+    def final_latest_accounts(self, queue_name=None, limit=DEFAULT_PAGE, offset=0):
+        """A page of final_latest_accounts (step 4), by account_id."""
+        where, params = "", {"limit": limit, "offset": offset}
+        if queue_name:
+            where = "WHERE queue = :queue"
+            params["queue"] = queue_name.strip().upper()
+        with self.pool.connection() as conn:
+            rows = conn.execute(f"""
+                SELECT account_id, name, address, latest_update_datetime, queue, status
+                FROM final_latest_accounts
+                {where}
+                ORDER BY account_id
+                LIMIT :limit OFFSET :offset;
+            """, params).fetchall()
+        columns = ["account_id", "name", "address", "latest_update_datetime", "queue", "status"]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def stats(self):
+        with self.pool.connection() as conn:
+            version = data_version(conn)
+        return {
+            "data_version": version,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "requests": self.requests,
+            "cache": {
+                "entries": len(self.cache.items),
+                "size": self.cache.size,
+                "hits": self.cache.hits,
+                "misses": self.cache.misses,
+            },
+            "pool": {
+                "size": self.pool.size,
+                "idle": self.pool.idle.qsize(),
+                "waits": self.pool.waits,
+            },
+        }
+
+    def close(self):
+        self.pool.close()
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _int_param(query, name, default, low=0, high=None):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer") from None
+    if value < low or (high is not None and value > high):
+        raise BadRequest(f"{name} must be between {low} and {high}")
+    return value
+
+
+def make_handler(service, access_log=False):
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, so clients do not pay a TCP handshake per request
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes; with Nagle on, the body waits
+        # for the client's delayed ACK (~40 ms per response)
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            service.count_request()
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            parts = [p for p in url.path.split("/") if p]
+            try:
+                status, body = self.route(parts, query)
+            except BadRequest as exc:
+                status, body = 400, {"error": str(exc)}
+            except PoolExhausted as exc:
+                status, body = 503, {"error": str(exc)}
+            except Exception as exc:
+                self.log_error("Error serving %s: %r", self.path, exc)
+                status, body = 500, {"error": "internal error"}
+            self.send_json(status, body)
+
+        def route(self, parts, query):
+            if parts == ["health"]:
+                return 200, {"status": "ok"}
+            if parts == ["stats"]:
+                return 200, service.stats()
+            if parts == ["final_latest_accounts"]:
+                rows = service.final_latest_accounts(
+                    queue_name=query.get("queue", [None])[0],
+                    limit=_int_param(query, "limit", DEFAULT_PAGE, 1, MAX_PAGE),
+                    offset=_int_param(query, "offset", 0),
+                )
+                return 200, {"rows": rows, "count": len(rows)}
+
+            if len(parts) in (2, 3) and parts[0] == "accounts":
+                if len(parts) == 3 and parts[2] != "state":
+                    return 404, {"error": f"not found: {self.path}"}
+                try:
+                    account = int(parts[1])
+                except ValueError:
+                    raise BadRequest("account id must be an integer") from None
+                if not -MAX_ACCOUNT_ID - 1 <= account <= MAX_ACCOUNT_ID:
+                    raise BadRequest("account id is out of range")
+                at = None
+                if len(parts) == 3:
+                    at = query.get("at", [None])[0]
+                    if not at:
+                        raise BadRequest("at is required, e.g. ?at=2025-06-01 or ?at=2025-06-01+12:00:00")
+                    try:
+                        to_epoch(at)
+                    except ValueError:
+                        raise BadRequest(f"invalid datetime for at: {at!r}") from None
+                result = service.account(account, at)
+                if result is None:
+                    return 404, {"error": f"unknown account {account}"}
+                return 200, result
+
+            return 404, {"error": f"not found: {self.path}"}
+
+        def send_json(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            if access_log:
+                super().log_message(format, *args)
+
+        def log_error(self, format, *args):
+            # Errors are logged even without --access-log
+            super().log_message(format, *args)
+
+    return Handler
+
+
+class ReadServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # listen() backlog; the default of 5 drops connections from larger client pools
+    request_queue_size = 128
+
+
+def enable_wal(path=DB_PATH):
+    """Switches the database to WAL (persistent); returns the mode in effect."""
+    conn = connect(path)
+    try:
+        return set_journal_mode(conn, "WAL")
+    finally:
+        conn.close()
+
+
+def make_server(host="127.0.0.1", port=8080, path=DB_PATH, pool_size=DEFAULT_POOL_SIZE,
+                cache_size=DEFAULT_CACHE_SIZE, access_log=False):
+    """The HTTP server and its ReadService; call serve_forever() on the server."""
+    service = ReadService(path, pool_size, cache_size)
+    server = ReadServer((host, port), make_handler(service, access_log))
+    return server, service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve account state from data.db over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE,
+                        help="Read-only connections shared by the request threads.")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help="Account responses kept in the LRU (0 disables it).")
+    parser.add_argument("--access-log", action="store_true", help="Log every request.")
+    args = parser.parse_args(argv)
+
+    mode = enable_wal(DB_PATH)
+    if mode.lower() != "wal":
+        print(f"[api] Could not switch {DB_PATH} to WAL (journal_mode={mode}); "
+              "readers may wait for the pipeline's commits", flush=True)
+    server, service = make_server(
+        args.host, args.port, DB_PATH, args.pool_size, args.cache_size, args.access_log
+    )
+    print(f"[api] Serving {DB_PATH} on http://{args.host}:{server.server_port} "
+          f"(pool {args.pool_size}, cache {args.cache_size})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        print("[api] Stopped", flush=True)
+
+
+if __name__ == "__main__":
+    main()
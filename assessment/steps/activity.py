@@ -0,0 +1,240 @@
+# steps/activity.py
+#
+# Per-account activity summary of daily_status, so "who was active since /
+# between ..." is answered from one row per account instead of scanning
+# every daily change:
+#
+#     account_activity          first and last change, number of changes
+#     account_activity_monthly  number of changes per account and month (YYYY-MM)
+#
+# Kept up to date incrementally: only daily_status rows above the id
+# watermark stored in pipeline_meta are folded in. A rebuilt events table
+# (full step1 run) means daily_status was reloaded too and triggers a rebuild.
+# The queries refuse to run on a missing or out-of-date summary instead of
+# answering from it (see require_account_activity).
+#
+# Usage (from the assessment folder):
+#     python -m steps.activity 2025-01-01               # active on or after
+#     python -m steps.activity 2025-03-01 2025-03-31    # active between (inclusive)
+
+import argparse
+import time
+
+from .db import connect
+from .meta import get_meta, set_meta
+
+# pipeline_meta keys
+WATERMARK_KEY = "activity_last_daily_id"
+GENERATION_KEY = "activity_events_generation"
+
+# Accounts with a change at or after :start
+ACTIVE_SINCE_SQL = """
+    SELECT account
+    FROM account_activity
+    WHERE last_change >= :start
+"""
+
+# Accounts with a change in [:start, :end]. Whenever the first or last
+# change falls in the range the summary row decides; otherwise (changes
+# before and after the range) a month with changes strictly inside the range
+# decides, and only the remaining accounts are probed in daily_status, one
+# seek each on idx_daily_status_account_changed.
+ACTIVE_BETWEEN_SQL = """
+    SELECT a.account
+    FROM account_activity a
+    WHERE a.last_change >= :start
+      AND a.first_change <= :end
+      AND (
+          a.first_change >= :start
+          OR a.last_change <= :end
+          OR EXISTS (
+              SELECT 1 FROM account_activity_monthly m
+              WHERE m.account = a.account
+                AND m.month > substr(:start, 1, 7)
+                AND m.month < substr(:end, 1, 7)
+          )
+          OR EXISTS (
+              SELECT 1 FROM daily_status d
+              WHERE d.account = a.account
+                AND d.changed_datetime >= :start
+                AND d.changed_datetime <= :end
+          )
+      )
+    ORDER BY a.account
+"""
+
+
+def create_activity_tables(conn, drop_existing=False):
+    cur = conn.cursor()
+
+    if drop_existing:
+        cur.execute("DROP TABLE IF EXISTS account_activity;")
+        cur.execute("DROP TABLE IF EXISTS account_activity_monthly;")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS account_activity (
+            account INTEGER PRIMARY KEY,
+            first_change TEXT NOT NULL,
+            last_change TEXT NOT NULL,
+            change_count INTEGER NOT NULL
+        );
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS account_activity_monthly (
+            account INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            change_count INTEGER NOT NULL,
+            PRIMARY KEY (account, month)
+        );
+    """)
+
+    # Range seeks for "active since" / "active until"
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_account_activity_last
+        ON account_activity (last_change, account);
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_account_activity_first
+        ON account_activity (first_change, account);
+    """)
+    # daily_status probe of ACTIVE_BETWEEN_SQL. Created here, after step 1
+    # has loaded, so a full load builds it with one sort
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_daily_status_account_changed
+        ON daily_status (account, changed_datetime);
+    """)
+    conn.commit()
+
+
+def update_account_activity(conn, full=False):
+    """
+    Folds the daily_status rows added since the last update into the
+    summary tables (first/last change widened, counts added). Rebuilds
+    from scratch when the tables are new or daily_status was reloaded.
+    Returns the number of daily_status rows folded in.
+    """
+    start = time.perf_counter()
+    cur = conn.cursor()
+
+    generation = get_meta(conn, "events_generation")
+    exists = cur.execute("""
+        SELECT 1 FROM sqlite_master
+        WHERE type = 'table' AND name = 'account_activity';
+    """).fetchone()
+    if not exists or get_meta(conn, GENERATION_KEY) != generation:
+        full = True
+    create_activity_tables(conn, drop_existing=full)
+
+    watermark = 0 if full else int(get_meta(conn, WATERMARK_KEY, 0))
+    max_id, new_rows = cur.execute("""
+        SELECT COALESCE(MAX(id), 0), COUNT(*) FROM daily_status WHERE id > ?;
+    """, (watermark,)).fetchone()
+
+    if new_rows:
+        cur.execute("""
+            INSERT INTO account_activity (account, first_change, last_change, change_count)
+            SELECT account, MIN(changed_datetime), MAX(changed_datetime), COUNT(*)
+            FROM daily_status
+            WHERE id > ?
+            GROUP BY account
+            ON CONFLICT(account) DO UPDATE SET
+                first_change = MIN(first_change, excluded.first_change),
+                last_change = MAX(last_change, excluded.last_change),
+                change_count = change_count + excluded.change_count;
+        """, (watermark,))
+        cur.execute("""
+            INSERT INTO account_activity_monthly (account, month, change_count)
+            SELECT account, substr(changed_datetime, 1, 7), COUNT(*)
+            FROM daily_status
+            WHERE id > ?
+            GROUP BY account, substr(changed_datetime, 1, 7)
+            ON CONFLICT(account, month) DO UPDATE SET
+                change_count = change_count + excluded.change_count;
+        """, (watermark,))
+
+    set_meta(conn, WATERMARK_KEY, max(max_id, watermark))
+    set_meta(conn, GENERATION_KEY, generation)
+    conn.commit()
+
+    elapsed = time.perf_counter() - start
+    mode = "Rebuilt" if full else "Updated"
+    print(f"[activity] {mode} account_activity with {new_rows} daily changes in {elapsed:.3f} s")
+    return new_rows
+
+
+def require_account_activity(conn, current=True):
+    """
+    Raises ValueError unless account_activity exists and, with `current`,
+    also account_activity_monthly and the daily_status probe index, with
+    every daily_status row folded in. Shards only get account_activity
+    (for step 2), hence current=False.
+    """
+    required = {"account_activity"}
+    if current:
+        required |= {"account_activity_monthly", "idx_daily_status_account_changed"}
+    found = {name for (name,) in conn.execute(
+        f"SELECT name FROM sqlite_master WHERE name IN ({','.join('?' * len(required))});",
+        sorted(required),
+    )}
+    if found != required:
+        raise ValueError(
+            f"{', '.join(sorted(required - found))} missing; run "
+            "update_account_activity() (step 1 or step 2) first"
+        )
+    if not current:
+        return
+
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM daily_status;").fetchone()[0]
+    if (
+        get_meta(conn, GENERATION_KEY) != get_meta(conn, "events_generation")
+        or int(get_meta(conn, WATERMARK_KEY, 0)) < max_id
+    ):
+        raise ValueError(
+            "account_activity is out of date with daily_status; run "
+            "update_account_activity() (step 1 or step 2) first"
+        )
+
+
+def _bound(value, end=False):
+    """A date alone means the start (or, for `end`, the end) of that day."""
+    if len(value) == 10:
+        return value + (" 23:59:59" if end else " 00:00:00")
+    return value
+
+
+def active_since(conn, start):
+    """Accounts with at least one daily change at or after start."""
+    require_account_activity(conn)
+    rows = conn.execute(ACTIVE_SINCE_SQL + " ORDER BY account;", {"start": _bound(start)})
+    return [account for (account,) in rows]
+
+
+def active_between(conn, start, end):
+    """Accounts with at least one daily change in [start, end] (dates are whole days)."""
+    require_account_activity(conn)
+    rows = conn.execute(ACTIVE_BETWEEN_SQL, {"start": _bound(start), "end": _bound(end, end=True)})
+    return [account for (account,) in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List accounts active since / between dates.")
+    parser.add_argument("start", help="YYYY-MM-DD or 'YYYY-MM-DD HH:MM:SS'")
+    parser.add_argument("end", nargs="?", default=None, help="Inclusive end (optional).")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        update_account_activity(conn)
+        if args.end is None:
+            accounts = active_since(conn, args.start)
+        else:
+            accounts = active_between(conn, args.start, args.end)
+    finally:
+        conn.close()
+
+    for account in accounts:
+        print(account)
+
+
+if __name__ == "__main__":
+    main()
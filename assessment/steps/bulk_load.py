@@ -0,0 +1,132 @@
+# steps/bulk_load.py
+
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Fast, non-durable settings used only while step1 loads data
+LOAD_PRAGMAS = {
+    "journal_mode": "MEMORY",
+    "synchronous": "OFF",
+    "cache_size": -262144,  # 256 MB (negative = KiB)
+    "temp_store": "MEMORY",
+}
+
+# Settings restored once loading is finished (SQLite defaults). A database
+# that was in WAL before loading (switched by service/read_api.py, so its
+# readers and the pipeline's commits do not block each other) is left in WAL.
+DURABLE_PRAGMAS = {
+    "journal_mode": "DELETE",
+    "synchronous": "FULL",
+    "cache_size": -2000,
+    "temp_store": "DEFAULT",
+}
+
+
+def set_journal_mode(conn, mode):
+    """
+    Switches journal_mode and returns the mode in effect. Leaving WAL needs
+    the database to itself: while other connections are open (e.g. the read
+    API) the database stays in WAL rather than waiting for them to close.
+    """
+    current = conn.execute("PRAGMA journal_mode;").fetchone()[0]
+    if current.lower() != "wal" or mode.lower() == "wal":
+        return conn.execute(f"PRAGMA journal_mode = {mode};").fetchone()[0]
+
+    timeout = conn.execute("PRAGMA busy_timeout;").fetchone()[0]
+    conn.execute("PRAGMA busy_timeout = 0;")
+    try:
+        return conn.execute(f"PRAGMA journal_mode = {mode};").fetchone()[0]
+    except sqlite3.OperationalError:
+        print(f"[bulk] Database in use by other connections, loading in WAL instead of {mode}")
+        return current
+    finally:
+        conn.execute(f"PRAGMA busy_timeout = {timeout};")
+
+
+def apply_pragmas(conn, pragmas):
+    # journal_mode cannot change inside an open transaction
+    conn.commit()
+    for name, value in pragmas.items():
+        if name == "journal_mode":
+            set_journal_mode(conn, value)
+        else:
+            conn.execute(f"PRAGMA {name} = {value};")
+
+
+@contextmanager
+def bulk_load_session(conn, **overrides):
+    """
+    Applies LOAD_PRAGMAS (updated with `overrides`) for the duration of the
+    block and always restores DURABLE_PRAGMAS afterwards, even when loading
+    fails. A database already in WAL goes back to WAL.
+    """
+    durable = dict(DURABLE_PRAGMAS)
+    if conn.execute("PRAGMA journal_mode;").fetchone()[0].lower() == "wal":
+        durable["journal_mode"] = "WAL"
+    apply_pragmas(conn, {**LOAD_PRAGMAS, **overrides})
+    try:
+        yield conn
+    finally:
+        apply_pragmas(conn, durable)
+
+
+def dataframe_rows(df, columns):
+    """
+    Yields plain Python tuples for executemany (NaN/NaT become None,
+    NumPy scalars become Python ints/floats).
+    """
+    values = []
+    for col in columns:
+        arr = df[col].to_numpy(dtype=object)
+        missing = pd.isna(arr)
+        if missing.any():
+            arr = arr.copy()
+            arr[missing] = None
+        values.append(arr.tolist())
+    return zip(*values)
+
+
+def bulk_insert(conn, table, df, columns=None, or_ignore=False, on_conflict=None,
+                label="bulk", report=True):
+    """
+    Writes a DataFrame with a single executemany in one transaction.
+
+    or_ignore=True skips rows that violate a unique index (INSERT OR IGNORE).
+    on_conflict is an optional upsert clause, e.g.
+    "ON CONFLICT(account_id) DO UPDATE SET name = excluded.name".
+
+    Returns the number of rows written and, with report=True, prints the
+    throughput.
+    """
+    columns = list(columns or df.columns)
+    verb = "INSERT OR IGNORE" if or_ignore else "INSERT"
+    sql = (
+        f"{verb} INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+    if on_conflict:
+        sql += f" {on_conflict}"
+
+    start = time.perf_counter()
+    before = conn.total_changes
+
+    conn.commit()
+    conn.execute("BEGIN;")
+    try:
+        conn.executemany(sql + ";", dataframe_rows(df, columns))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    written = conn.total_changes - before
+    if not report:
+        return written
+
+    elapsed = time.perf_counter() - start
+    rate = written / elapsed if elapsed > 0 else float("inf")
+    print(f"[{label}] {table}: {written} rows in {elapsed:.3f} s ({rate:,.0f} rows/s)")
+    return written
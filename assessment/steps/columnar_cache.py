@@ -0,0 +1,169 @@
+# steps/columnar_cache.py
+#
+# Columnar cache of the normalised events: one .npy file per column, in the
+# order of steps/numpy_engine.py (sorted by account, event_ts, event_id),
+# next to data.db in data_columns/. Opening it maps the files with
+# np.load(mmap_mode="r"): nothing is parsed or copied, so it takes
+# milliseconds and processes reading the same cache share the page cache.
+#
+# The cache is rebuilt only when the source files change: its signature is
+# the ingested_files manifest (file name and content hash of every daily
+# and monthly file) plus the last event_id of the database it came from.
+#
+# Usage (from the assessment folder):
+#     python -m steps.columnar_cache            # rebuild if stale
+#     python -m steps.columnar_cache --rebuild  # rebuild unconditionally
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .config import DB_PATH
+from .db import step_connection
+from .numpy_engine import load_events
+
+CACHE_DIR = DB_PATH.parent / f"{DB_PATH.stem}_columns"
+
+# Arrays written as <name>.npy (see numpy_engine.load_events)
+COLUMNS = ["account", "event_ts", "queue", "status", "source", "accounts", "starts", "ends"]
+
+# Dictionaries of the coded columns, stored in meta.json
+DICTIONARIES = ["queue_values", "status_values", "source_values"]
+
+# Narrowest dtypes that hold the codes
+CODE_DTYPES = {"queue": np.int16, "status": np.int16, "source": np.int8}
+
+# 2: queue/status codes are the queue_id / status_id lookup codes
+FORMAT_VERSION = 2
+
+
+def cache_signature(conn):
+    """
+    Identifies what the cache was built from: the daily/monthly entries of
+    the ingested_files manifest, the database file and its last event_id.
+    """
+    db_file = conn.execute("PRAGMA database_list;").fetchone()[2]
+    has_manifest = conn.execute("""
+        SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ingested_files';
+    """).fetchone()
+    files = conn.execute("""
+        SELECT file_name, content_hash
+        FROM ingested_files
+        WHERE kind IN ('daily', 'monthly')
+        ORDER BY file_name;
+    """).fetchall() if has_manifest else []
+    last_event_id = conn.execute("SELECT COALESCE(MAX(event_id), 0) FROM events;").fetchone()[0]
+
+    payload = {
+        "version": FORMAT_VERSION,
+        "db": str(Path(db_file).resolve()) if db_file else None,
+        "files": files,
+        "last_event_id": last_event_id,
+    }
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+
+def read_meta(cache_dir=CACHE_DIR):
+    path = Path(cache_dir) / "meta.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def is_fresh(conn, cache_dir=CACHE_DIR):
+    meta = read_meta(cache_dir)
+    return meta is not None and meta["signature"] == cache_signature(conn)
+
+
+def build_cache(conn, cache_dir=CACHE_DIR):
+    """
+    Writes the events of conn as .npy columns into cache_dir. The files are
+    written to a sibling folder first and swapped in, so readers never see
+    a half-written cache. Returns the number of events.
+    """
+    start = time.perf_counter()
+    cache_dir = Path(cache_dir)
+    signature = cache_signature(conn)
+    ev = load_events(conn)
+
+    tmp_dir = cache_dir.with_name(cache_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    for name in COLUMNS:
+        np.save(tmp_dir / f"{name}.npy", ev[name].astype(CODE_DTYPES.get(name, np.int64)))
+    meta = {
+        "signature": signature,
+        "rows": int(len(ev["account"])),
+        "accounts": int(len(ev["accounts"])),
+        "created_at": time.time(),
+        **{name: ev[name].tolist() for name in DICTIONARIES},
+    }
+    (tmp_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+
+    old_dir = cache_dir.with_name(cache_dir.name + ".old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if cache_dir.exists():
+        os.replace(cache_dir, old_dir)
+    os.replace(tmp_dir, cache_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"[columnar] Wrote {meta['rows']} events to {cache_dir} in {elapsed:.3f} s")
+    return meta["rows"]
+
+
+def open_cache(cache_dir=CACHE_DIR):
+    """
+    Maps the cache read-only. Returns the same dict as
+    numpy_engine.load_events (arrays are np.memmap), so it can be passed to
+    latest_status_rows / as_of_index directly. Does not check freshness.
+    """
+    cache_dir = Path(cache_dir)
+    meta = read_meta(cache_dir)
+    if meta is None:
+        raise FileNotFoundError(f"[columnar] No columnar cache in {cache_dir}")
+
+    ev = {name: np.load(cache_dir / f"{name}.npy", mmap_mode="r") for name in COLUMNS}
+    for name in DICTIONARIES:
+        ev[name] = np.array(meta[name], dtype=object)
+    return ev
+
+
+def cached_events(conn, cache_dir=CACHE_DIR):
+    """The mapped cache when it matches conn's data, else None."""
+    if not is_fresh(conn, cache_dir):
+        return None
+    return open_cache(cache_dir)
+
+
+def refresh_cache(conn, cache_dir=CACHE_DIR, force=False):
+    """Rebuilds the cache if the source files changed (or force=True)."""
+    if not force and is_fresh(conn, cache_dir):
+        print(f"[columnar] {cache_dir} is up to date")
+        return False
+    build_cache(conn, cache_dir)
+    return True
+
+
+def run(force=False, conn=None):
+    print(f"[columnar] Using database: {DB_PATH}")
+    with step_connection(conn) as conn:
+        refresh_cache(conn, force=force)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the memory-mapped columnar events cache.")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild even if up to date.")
+    args = parser.parse_args(argv)
+    run(force=args.rebuild)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,15 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 
 # Path to the data folder containing CSV files
-DATA_DIR = PROJECT_ROOT / "data"
+# (ASSESSMENT_DATA_DIR overrides it, e.g. for benchmarks on generated data)
+DATA_DIR = Path(os.environ.get("ASSESSMENT_DATA_DIR", PROJECT_ROOT / "data"))
 
-# Path to the SQLite database
-DB_PATH = PROJECT_ROOT / "data.db"
+# Path to the SQLite database (ASSESSMENT_DB_PATH overrides it)
+DB_PATH = Path(os.environ.get("ASSESSMENT_DB_PATH", PROJECT_ROOT / "data.db"))
+
+# SQLite page cache (KiB) used by streaming ingestion, so that memory does
+# not grow with the size of the database
+STREAMING_CACHE_KIB = 32 * 1024
 
 # Ensure directories exist
 if not DATA_DIR.exists():
@@ -0,0 +1,73 @@
+# steps/db.py
+
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+from . import config
+from .instrumentation import TracedConnection, recording
+
+
+def connect(path=None):
+    """
+    Opens the pipeline database (config.DB_PATH by default). While the
+    orchestrator records step metrics the connection is traced (see
+    steps/instrumentation.py); otherwise it is a plain sqlite3 connection.
+    """
+    path = config.DB_PATH if path is None else path
+    if recording():
+        return sqlite3.connect(path, factory=TracedConnection)
+    return sqlite3.connect(path)
+
+
+@contextmanager
+def step_connection(conn=None):
+    """
+    The connection a step's run() works on: `conn` when the caller owns one
+    (left open), otherwise a new connection closed at the end of the block.
+    A failing block is rolled back first, so its transaction does not keep
+    the database locked for whoever records the failure.
+    """
+    if conn is not None:
+        yield conn
+        return
+
+    conn = connect()
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def open_in_memory(path=None):
+    """
+    Returns a traced :memory: connection holding a copy of the pipeline
+    database (empty when the file does not exist yet), for running every
+    step on one connection without touching the disk.
+    """
+    path = config.DB_PATH if path is None else path
+    memory = sqlite3.connect(":memory:", factory=TracedConnection)
+    if Path(path).exists():
+        disk = sqlite3.connect(path)
+        try:
+            disk.backup(memory)
+        finally:
+            disk.close()
+    return memory
+
+
+def save_to_disk(memory, path=None):
+    """
+    Replaces the database file with the content of `memory` in a single
+    Connection.backup() (one transaction, one sync at the end).
+    """
+    path = config.DB_PATH if path is None else path
+    memory.commit()
+    disk = sqlite3.connect(path)
+    try:
+        memory.backup(disk)
+    finally:
+        disk.close()
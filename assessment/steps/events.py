@@ -0,0 +1,151 @@
+# steps/events.py
+
+import time
+
+from .meta import bump_data_version, create_meta_table, get_meta, set_meta
+
+# event_ts is stored as integer Unix seconds; datetime(event_ts, 'unixepoch')
+# turns it back into 'YYYY-MM-DD HH:MM:SS'
+EVENT_TS_SQL = "CAST(strftime('%s', {}) AS INTEGER)"
+
+
+def create_events_table(conn, drop_existing=True):
+    """
+    Creates the events table: one row per daily change or monthly snapshot,
+    with a source tag and an integer epoch timestamp, so later steps never
+    have to convert text datetimes again.
+
+    (source, source_id) points back at daily_status.id / monthly_status.id
+    and is what makes refresh_events incremental. queue_id / status_id are
+    the codes of the queues / statuses lookup tables, as in daily_status.
+
+    Whenever events is (re)created, the events_generation counter in
+    pipeline_meta is bumped so that tables derived from events know their
+    event_id watermarks are no longer valid (and data_version, for cached
+    query results). pipeline_meta is created here too, so the table can be
+    built on a database step 1 never touched (shards, benchmarks).
+    """
+    create_meta_table(conn)
+    cur = conn.cursor()
+
+    exists = cur.execute("""
+        SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'events';
+    """).fetchone()
+    columns = {row[1] for row in cur.execute("PRAGMA table_info(events);")}
+    if exists and "queue_id" not in columns:
+        # events from before the lookup codes: copied again from the status tables
+        drop_existing = True
+    if drop_existing or not exists:
+        set_meta(conn, "events_generation", int(get_meta(conn, "events_generation", 0)) + 1)
+        bump_data_version(conn)
+
+    if drop_existing:
+        cur.execute("DROP TABLE IF EXISTS events;")
+        cur.execute("DROP TABLE IF EXISTS event_accounts;")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            event_id INTEGER PRIMARY KEY,
+            account INTEGER NOT NULL,
+            event_ts INTEGER NOT NULL,
+            queue_id INTEGER,
+            status_id INTEGER,
+            source TEXT NOT NULL,
+            source_id INTEGER NOT NULL,
+            UNIQUE (source, source_id)
+        );
+    """)
+
+    # Every account that has at least one event: the driving table for
+    # per-account index seeks (see steps/state.py)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS event_accounts (
+            account INTEGER PRIMARY KEY
+        );
+    """)
+    conn.commit()
+
+
+def create_events_indexes(conn):
+    """
+    Covering index for per-account, time-ordered access: the as-of and
+    latest-change lookups in step3 are answered from the index alone.
+
+    event_id is part of the key so that "ORDER BY event_ts DESC, event_id
+    DESC LIMIT 1" is read straight from the index without a temp B-tree
+    sort (idx_events_account_ts, the earlier version without it, is
+    replaced).
+    """
+    conn.execute("DROP INDEX IF EXISTS idx_events_account_ts;")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_events_account_ts_id
+        ON events (account, event_ts, event_id, queue_id, status_id);
+    """)
+    conn.commit()
+
+
+def refresh_events(conn):
+    """
+    Appends daily_status / monthly_status rows that are not in events yet
+    (ids above the highest source_id already copied for each source).
+    Rows whose datetime cannot be converted are skipped. New accounts are
+    added to event_accounts, and data_version is bumped when anything was
+    added. Returns the number of new events.
+    """
+    start = time.perf_counter()
+    cur = conn.cursor()
+
+    last_daily, last_monthly = cur.execute("""
+        SELECT
+            (SELECT COALESCE(MAX(source_id), 0) FROM events WHERE source = 'DAILY'),
+            (SELECT COALESCE(MAX(source_id), 0) FROM events WHERE source = 'MONTHLY');
+    """).fetchone()
+
+    last_event_id = cur.execute("SELECT COALESCE(MAX(event_id), 0) FROM events;").fetchone()[0]
+    if cur.execute("SELECT NOT EXISTS (SELECT 1 FROM event_accounts);").fetchone()[0]:
+        # event_accounts is new or empty: backfill it from every event
+        last_event_id = 0
+
+    before = conn.total_changes
+
+    cur.execute(f"""
+        INSERT OR IGNORE INTO events (account, event_ts, queue_id, status_id, source, source_id)
+        SELECT account, event_ts, queue_id, status_id, 'DAILY', id
+        FROM (
+            SELECT
+                id, account, queue_id, status_id,
+                {EVENT_TS_SQL.format("changed_datetime")} AS event_ts
+            FROM daily_status
+            WHERE id > ?
+        )
+        WHERE event_ts IS NOT NULL;
+    """, (last_daily,))
+
+    # Monthly snapshots take effect at midnight of snapshot_date
+    cur.execute(f"""
+        INSERT OR IGNORE INTO events (account, event_ts, queue_id, status_id, source, source_id)
+        SELECT account, event_ts, queue_id, status_id, 'MONTHLY', id
+        FROM (
+            SELECT
+                id, account, queue_id, status_id,
+                {EVENT_TS_SQL.format("snapshot_date || ' 00:00:00'")} AS event_ts
+            FROM monthly_status
+            WHERE id > ?
+        )
+        WHERE event_ts IS NOT NULL;
+    """, (last_monthly,))
+
+    added = conn.total_changes - before
+    if added:
+        bump_data_version(conn)
+
+    cur.execute("""
+        INSERT OR IGNORE INTO event_accounts (account)
+        SELECT DISTINCT account FROM events WHERE event_id > ?;
+    """, (last_event_id,))
+
+    conn.commit()
+
+    elapsed = time.perf_counter() - start
+    print(f"[events] Added {added} rows to events in {elapsed:.3f} s")
+    return added
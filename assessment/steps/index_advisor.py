@@ -0,0 +1,343 @@
+# steps/index_advisor.py
+#
+# Query plans and index recommendations for the pipeline's read queries.
+#
+# explain_workload() runs EXPLAIN QUERY PLAN for the queries of steps 2-4
+# (with the reference datetime and queues the pipeline runs with) and the
+# step5 benchmark query and flags full table scans and temp B-tree sorts.
+# advise() tries the candidate indexes one at a time (greedily, on top of the
+# ones already picked) and keeps an index only when the read time it saves
+# per pipeline run outweighs what it costs to maintain on inserts. The
+# candidates are CANDIDATE_INDEXES plus a partial index on the target
+# queues, whose codes are read from the queues table (candidate_indexes()).
+#
+# Usage (from the assessment folder):
+#     python -m steps.index_advisor             # report only
+#     python -m steps.index_advisor --apply     # also create the recommended indexes
+#     python -m steps.index_advisor --reference-datetime "2025-06-30 23:59:59" --queues LEGAL
+
+import argparse
+import sqlite3
+import time
+
+from .db import connect
+from .state import REFERENCE_DATETIME, TARGET_QUEUES, latest_status_sql, queue_filter_sql, to_epoch
+from .step2_active_accounts import ACTIVE_ACCOUNTS_SQL, START_DATE
+from .step4_final_table import FINAL_SELECT_SQL
+
+# Query measured by step5 before/after indexing (steps/step5_performance.py)
+TARGET_QUERY_SQL = """
+    SELECT
+        ds.account,
+        q.name AS queue,
+        st.name AS status,
+        ds.changed_datetime,
+        a.name,
+        a.address
+    FROM daily_status ds
+    JOIN accounts a
+        ON a.account_id = ds.account
+    JOIN queues q
+        ON q.queue_id = ds.queue_id
+    LEFT JOIN statuses st
+        ON st.status_id = ds.status_id
+    WHERE ds.account IN (
+        SELECT account_id
+        FROM latest_status_collections_legal
+    )
+      AND ds.queue_id IN (
+        SELECT queue_id
+        FROM queues
+        WHERE name IN ('COLLECTIONS', 'LEGAL')
+    );
+"""
+
+# name -> index definition (everything after "CREATE INDEX <name> ON")
+CANDIDATE_INDEXES = {
+    # step5's hand-picked indexes
+    "idx_daily_account_queue_changed": "daily_status (account, queue_id, changed_datetime)",
+    "idx_daily_queue_changed": "daily_status (queue_id, changed_datetime)",
+    "idx_latest_status_account": "latest_status_collections_legal (account_id)",
+    # covering index for the step5 query (no lookups into the table)
+    "idx_daily_account_cover": "daily_status (account, queue_id, status_id, changed_datetime)",
+}
+
+# Partial index: only the target-queue rows the step3/step5 queries read.
+# A partial index's WHERE cannot hold a subquery, so the queue codes are
+# filled in by candidate_indexes()
+TARGET_QUEUES_INDEX = "idx_daily_target_queues"
+
+# Rows written to daily_status per pipeline run, used to weigh insert cost
+ROWS_PER_RUN = 10_000
+
+
+def target_queue_codes(conn, queues=TARGET_QUEUES):
+    """Sorted queue_id codes of the given queue names (only those in the table)."""
+    condition, params = queue_filter_sql("queue_id", queues)
+    rows = conn.execute(f"SELECT queue_id FROM queues WHERE {condition};", params)
+    return sorted(code for (code,) in rows)
+
+
+def candidate_indexes(conn, queues=TARGET_QUEUES):
+    """
+    CANDIDATE_INDEXES plus the partial index on the target queues, built
+    from their current codes (left out when none of them has a code yet).
+    """
+    indexes = dict(CANDIDATE_INDEXES)
+    codes = target_queue_codes(conn, queues)
+    if codes:
+        indexes[TARGET_QUEUES_INDEX] = (
+            "daily_status (account, changed_datetime, queue_id, status_id) "
+            f"WHERE queue_id IN ({', '.join(str(c) for c in codes)})"
+        )
+    return indexes
+
+
+def workload(reference_datetime=REFERENCE_DATETIME, target_queues=TARGET_QUEUES):
+    """[(name, sql, params)] for the read queries of steps 2-5, as step 3 runs them."""
+    step3_sql, queue_params = latest_status_sql("event_accounts", target_queues)
+    return [
+        ("step2 active accounts", ACTIVE_ACCOUNTS_SQL, (START_DATE,)),
+        ("step3 latest status", step3_sql,
+         {"ts": to_epoch(reference_datetime), **queue_params}),
+        ("step4 final select", FINAL_SELECT_SQL.format(filter=""), ()),
+        ("step5 target query", TARGET_QUERY_SQL, ()),
+    ]
+
+
+def query_plan(conn, sql, params=()):
+    """Returns the EXPLAIN QUERY PLAN detail lines of a statement."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def plan_issues(plan):
+    """Plan lines that read a whole table or sort through a temp B-tree."""
+    return [
+        line for line in plan
+        if (line.startswith("SCAN ") and "COVERING INDEX" not in line)
+        or "TEMP B-TREE" in line
+    ]
+
+
+def explain_workload(conn, queries):
+    """Prints the plan of every workload query and flags scans / temp sorts."""
+    for name, sql, params in queries:
+        plan = query_plan(conn, sql, params)
+        issues = plan_issues(plan)
+        print(f"[advisor] {name}: {'OK' if not issues else f'{len(issues)} issue(s)'}")
+        for line in plan:
+            flag = "  <-- " if line in issues else ""
+            print(f"    {line}{flag}")
+
+
+def time_workload(conn, queries, repeats=3):
+    """Best-of-`repeats` time of each workload query, {name: seconds}."""
+    times = {}
+    for name, sql, params in queries:
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            best = min(best, time.perf_counter() - start)
+        times[name] = best
+    return times
+
+
+def index_bytes(conn, name):
+    """Size of an index from the dbstat table (None when SQLite lacks dbstat)."""
+    try:
+        return conn.execute(
+            "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = ?;", (name,)
+        ).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+
+def create_index(conn, name, indexes=CANDIDATE_INDEXES):
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {indexes[name]};")
+    conn.commit()
+
+
+def drop_index(conn, name):
+    conn.execute(f"DROP INDEX IF EXISTS {name};")
+    conn.commit()
+
+
+def insert_cost_per_row(conn, sample_rows=5000):
+    """
+    Seconds per row to insert a copy of existing daily_status rows (rolled
+    back afterwards), with whatever indexes currently exist.
+    """
+    conn.commit()
+    start = time.perf_counter()
+    conn.execute("BEGIN;")
+    try:
+        # Random hashes so the copies do not hit the row_hash index
+        n = conn.execute("""
+            INSERT INTO daily_status (account, queue_id, status_id, changed_datetime, row_hash)
+            SELECT account, queue_id, status_id, changed_datetime, random()
+            FROM daily_status
+            LIMIT ?;
+        """, (sample_rows,)).rowcount
+        elapsed = time.perf_counter() - start
+    finally:
+        conn.rollback()
+    return elapsed / n if n else 0.0
+
+
+def measure_candidate(conn, name, queries, baseline, base_insert_cost, repeats=3,
+                      indexes=CANDIDATE_INDEXES):
+    """
+    Creates one candidate index on top of the current ones, measures it and
+    drops it again. Returns a dict with the read time saved per workload
+    run, build time, size and extra insert cost per row.
+    """
+    start = time.perf_counter()
+    create_index(conn, name, indexes)
+    build_s = time.perf_counter() - start
+    size = index_bytes(conn, name)
+
+    try:
+        times = time_workload(conn, queries, repeats)
+        # Only daily_status takes inserts on every run
+        on_daily = indexes[name].startswith("daily_status ")
+        insert_cost = insert_cost_per_row(conn) if on_daily else base_insert_cost
+    finally:
+        drop_index(conn, name)
+
+    saved = {q: baseline[q] - t for q, t in times.items()}
+    return {
+        "name": name,
+        "read_saved_s": sum(saved.values()),
+        "speedups": {q: baseline[q] / t if t > 0 else float("inf") for q, t in times.items()},
+        "build_s": build_s,
+        "size_bytes": size,
+        "insert_overhead_s_per_row": max(insert_cost - base_insert_cost, 0.0),
+        "times": times,
+    }
+
+
+def advise(conn, candidates=None, rows_per_run=ROWS_PER_RUN, repeats=3, min_speedup=1.1,
+           reference_datetime=REFERENCE_DATETIME, target_queues=TARGET_QUEUES):
+    """
+    Greedy index selection. Starting from no candidate indexes, repeatedly
+    adds the candidate with the largest net benefit per pipeline run:
+
+        read time saved on the workload - insert overhead * rows_per_run
+
+    as long as that benefit is positive and it speeds up at least one query
+    by min_speedup. Candidate indexes that already exist are dropped first
+    and the database is left without them. The workload and the partial
+    index follow reference_datetime / target_queues. Returns (recommended
+    names, measurements of every round).
+    """
+    queries = workload(reference_datetime, target_queues)
+    indexes = candidate_indexes(conn, target_queues)
+    candidates = list(candidates or indexes)
+    for name in candidates:
+        drop_index(conn, name)
+
+    selected, rounds = [], []
+    while True:
+        baseline = time_workload(conn, queries, repeats)
+        base_insert_cost = insert_cost_per_row(conn)
+
+        results = [
+            measure_candidate(conn, name, queries, baseline, base_insert_cost, repeats, indexes)
+            for name in candidates if name not in selected
+        ]
+        for r in results:
+            r["net_saved_s"] = r["read_saved_s"] - r["insert_overhead_s_per_row"] * rows_per_run
+        rounds.append(results)
+
+        useful = [
+            r for r in results
+            if r["net_saved_s"] > 0 and max(r["speedups"].values()) >= min_speedup
+        ]
+        if not useful:
+            break
+
+        best = max(useful, key=lambda r: r["net_saved_s"])
+        selected.append(best["name"])
+        create_index(conn, best["name"], indexes)
+
+    for name in selected:
+        drop_index(conn, name)
+    return selected, rounds
+
+
+def print_report(selected, rounds):
+    for i, results in enumerate(rounds, start=1):
+        print(f"[advisor] Round {i}:")
+        for r in sorted(results, key=lambda r: -r["net_saved_s"]):
+            best_query, speedup = max(r["speedups"].items(), key=lambda kv: kv[1])
+            size = "n/a" if r["size_bytes"] is None else f"{r['size_bytes'] / 1024:.0f} KiB"
+            print(
+                f"    {r['name']}: net {r['net_saved_s'] * 1000:+.2f} ms/run, "
+                f"best {speedup:.1f}x on {best_query}, "
+                f"build {r['build_s']:.3f} s, size {size}, "
+                f"insert +{r['insert_overhead_s_per_row'] * 1e6:.1f} us/row"
+            )
+    print(f"[advisor] Recommended indexes: {', '.join(selected) or '(none)'}")
+
+
+def existing_indexes(conn):
+    return {
+        name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index';")
+    }
+
+
+def run_advisor(conn, apply=False, rows_per_run=ROWS_PER_RUN,
+                reference_datetime=REFERENCE_DATETIME, target_queues=TARGET_QUEUES):
+    """
+    Prints the query plans and the recommendation for the pipeline run with
+    reference_datetime / target_queues. With apply=True the recommended set
+    replaces the candidate indexes that exist; otherwise the database is
+    left with the indexes it had.
+    """
+    queries = workload(reference_datetime, target_queues)
+    indexes = candidate_indexes(conn, target_queues)
+    before = existing_indexes(conn) & set(indexes)
+
+    print("[advisor] Query plans without candidate indexes:")
+    for name in indexes:
+        drop_index(conn, name)
+    explain_workload(conn, queries)
+
+    selected, rounds = advise(
+        conn, rows_per_run=rows_per_run,
+        reference_datetime=reference_datetime, target_queues=target_queues,
+    )
+    print_report(selected, rounds)
+
+    for name in (selected if apply else before):
+        create_index(conn, name, indexes)
+    if apply:
+        print("[advisor] Applied the recommended indexes. Query plans now:")
+        explain_workload(conn, queries)
+    return selected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Explain the pipeline queries and recommend indexes.")
+    parser.add_argument("--apply", action="store_true", help="Create the recommended indexes.")
+    parser.add_argument("--rows-per-run", type=int, default=ROWS_PER_RUN,
+                        help="daily_status rows inserted per run, to weigh insert cost.")
+    parser.add_argument("--reference-datetime", default=REFERENCE_DATETIME,
+                        help="Step 3 'as of' time the pipeline runs with.")
+    parser.add_argument("--queues", nargs="+", default=TARGET_QUEUES,
+                        help="Step 3 target queues the pipeline runs with.")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        run_advisor(
+            conn, apply=args.apply, rows_per_run=args.rows_per_run,
+            reference_datetime=args.reference_datetime, target_queues=args.queues,
+        )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# steps/instrumentation.py
+#
+# Per-step metrics for the orchestrator: wall/CPU time, rows fetched and
+# written, peak memory and a profile of every SQL statement, exported as
+# JSON or as a Prometheus textfile.
+#
+# Connections opened with steps.db.connect() while a step is being recorded
+# are TracedConnection objects; they time each execute/executemany and count
+# fetched rows. Statement times cover execute() only (SQLite produces rows
+# lazily, so the time to fetch a large SELECT shows up in the step's wall
+# time rather than in its statement).
+
+import cProfile
+import json
+import os
+import re
+import resource
+import sqlite3
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+# Recorder of the step currently running (None outside PipelineMetrics.step)
+_active = None
+
+PROMETHEUS_PREFIX = "assessment_step"
+
+# Statements kept per step in the JSON output (slowest first)
+TOP_STATEMENTS = 20
+
+
+def _statement_key(sql):
+    """Collapses whitespace so the same statement is aggregated across calls."""
+    return re.sub(r"\s+", " ", sql).strip()[:300]
+
+
+class StepRecorder:
+    """Counters of one step run; updated by the traced connections."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows_read = 0
+        self.rows_written = 0
+        self.statements = {}
+
+    def record_statement(self, sql, elapsed, rowcount):
+        stats = self.statements.setdefault(
+            _statement_key(sql), {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0}
+        )
+        stats["calls"] += 1
+        stats["seconds"] += elapsed
+        stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+        if rowcount > 0:
+            stats["rows"] += rowcount
+
+    def record_fetch(self, rows):
+        self.rows_read += rows
+
+
+class TracedCursor(sqlite3.Cursor):
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        result = super().execute(sql, parameters)
+        if _active is not None:
+            _active.record_statement(sql, time.perf_counter() - start, self.rowcount)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        if _active is not None:
+            _active.record_statement(sql, time.perf_counter() - start, self.rowcount)
+        return result
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        result = super().executescript(sql_script)
+        if _active is not None:
+            _active.record_statement(sql_script, time.perf_counter() - start, -1)
+        return result
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None and _active is not None:
+            _active.record_fetch(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if _active is not None:
+            _active.record_fetch(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if _active is not None:
+            _active.record_fetch(len(rows))
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        if _active is not None:
+            _active.record_fetch(1)
+        return row
+
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3.Connection whose cursors report to the active step recorder."""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def close(self):
+        # total_changes counts every row inserted, updated or deleted
+        if _active is not None:
+            _active.rows_written += self.total_changes
+        super().close()
+
+
+def recording():
+    """True while a step is being recorded (steps.db.connect traces then)."""
+    return _active is not None
+
+
+def _reset_peak_rss():
+    """Resets the kernel's peak RSS counter (Linux); False when not possible."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux; it is the peak of the whole process so far
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PipelineMetrics:
+    """
+    Collects one record per step:
+
+        metrics = PipelineMetrics(profile_dir="profiles")
+        with metrics.step("step1"):
+            run_step1()
+        metrics.write_json("metrics.json")
+
+    trace_memory=True also measures the Python heap peak with tracemalloc
+    (noticeably slower); profile_dir dumps a cProfile file per step.
+    """
+
+    def __init__(self, profile_dir=None, trace_memory=False):
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.trace_memory = trace_memory
+        self.steps = []
+
+    @contextmanager
+    def step(self, name, conn=None):
+        """
+        Records one step. conn: a connection shared across steps (it is not
+        closed per step, so its writes are counted here instead).
+        """
+        global _active
+        recorder = StepRecorder(name)
+        changes_before = conn.total_changes if conn is not None else 0
+        rss_reset = _reset_peak_rss()
+        if self.trace_memory:
+            tracemalloc.start()
+        profiler = cProfile.Profile() if self.profile_dir else None
+
+        _active = recorder
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield recorder
+        finally:
+            if profiler:
+                profiler.disable()
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            _active = None
+            if conn is not None:
+                recorder.rows_written += conn.total_changes - changes_before
+
+            record = {
+                "step": name,
+                "wall_seconds": wall,
+                "cpu_seconds": cpu,
+                "rows_read": recorder.rows_read,
+                "rows_written": recorder.rows_written,
+                "peak_rss_bytes": _peak_rss_bytes(),
+                "peak_rss_is_step_local": rss_reset,
+                "sql_statements": sum(s["calls"] for s in recorder.statements.values()),
+                "sql_seconds": sum(s["seconds"] for s in recorder.statements.values()),
+                "statements": sorted(
+                    ({"sql": sql, **stats} for sql, stats in recorder.statements.items()),
+                    key=lambda s: -s["seconds"]
+                )[:TOP_STATEMENTS],
+            }
+            if self.trace_memory:
+                record["python_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            if profiler:
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                profile_path = self.profile_dir / f"{name}.prof"
+                profiler.dump_stats(profile_path)
+                record["profile"] = str(profile_path)
+            self.steps.append(record)
+
+    def print_summary(self):
+        print("[metrics] Step summary:")
+        for r in self.steps:
+            print(
+                f"  {r['step']}: {r['wall_seconds']:.3f} s wall, {r['cpu_seconds']:.3f} s cpu, "
+                f"{r['rows_read']} rows read, {r['rows_written']} rows written, "
+                f"{r['sql_statements']} statements ({r['sql_seconds']:.3f} s), "
+                f"peak RSS {r['peak_rss_bytes'] / 2**20:.0f} MiB"
+            )
+
+    def to_dict(self):
+        return {"created_at": time.time(), "pid": os.getpid(), "steps": self.steps}
+
+    def write_json(self, path):
+        write_atomic(path, json.dumps(self.to_dict(), indent=2))
+        print(f"[metrics] Wrote {path}")
+
+    def prometheus_text(self):
+        gauges = [
+            ("wall_seconds", "Wall time of the step"),
+            ("cpu_seconds", "CPU time of the step (this process)"),
+            ("rows_read", "Rows fetched from SQLite"),
+            ("rows_written", "Rows inserted, updated or deleted"),
+            ("peak_rss_bytes", "Peak resident set size during the step"),
+            ("python_peak_bytes", "Peak Python heap (tracemalloc)"),
+            ("sql_statements", "SQL statements executed"),
+            ("sql_seconds", "Time spent in SQL execute calls"),
+        ]
+        lines = []
+        for field, help_text in gauges:
+            values = [(r["step"], r[field]) for r in self.steps if field in r]
+            if not values:
+                continue
+            metric = f"{PROMETHEUS_PREFIX}_{field}"
+            lines.append(f"# HELP {metric} {help_text}.")
+            lines.append(f"# TYPE {metric} gauge")
+            lines.extend(f'{metric}{{step="{step}"}} {value}' for step, value in values)
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        write_atomic(path, self.prometheus_text())
+        print(f"[metrics] Wrote {path}")
+
+
+def write_atomic(path, text):
+    """Writes next to path and renames, so collectors never see half a file."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
@@ -0,0 +1,57 @@
+# steps/meta.py
+#
+# Small key/value table for watermarks and parameters that derived tables
+# need to remember between runs. The table is created by step 1 with the
+# other tables (create_tables); reads never write, so they can run inside a
+# caller's transaction or on a read-only connection.
+
+import sqlite3
+
+
+def create_meta_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """)
+    conn.commit()
+
+
+def get_meta(conn, key, default=None):
+    """Stored value (text), or default when the key or the table is missing."""
+    try:
+        row = conn.execute("SELECT value FROM pipeline_meta WHERE key = ?;", (key,)).fetchone()
+    except sqlite3.OperationalError as exc:
+        # Database from before step 1 ran
+        if "no such table" not in str(exc):
+            raise
+        return default
+    return default if row is None else row[0]
+
+
+def set_meta(conn, key, value):
+    """Stores value (as text); the caller commits."""
+    conn.execute("""
+        INSERT INTO pipeline_meta (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value;
+    """, (key, None if value is None else str(value)))
+
+
+def delete_meta(conn, key):
+    conn.execute("DELETE FROM pipeline_meta WHERE key = ?;", (key,))
+
+
+# Bumped whenever the events change (new rows or a rebuild) or accounts.csv
+# is loaded; cached query results are keyed on it (see steps/result_cache.py
+# and service/read_api.py)
+DATA_VERSION_KEY = "data_version"
+
+
+def data_version(conn):
+    return int(get_meta(conn, DATA_VERSION_KEY, 0))
+
+
+def bump_data_version(conn):
+    """Marks the ingested data as changed; the caller commits."""
+    set_meta(conn, DATA_VERSION_KEY, data_version(conn) + 1)
@@ -0,0 +1,334 @@
+# steps/normalize.py
+
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ISO_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Candidate layouts for changed_datetime, most common first
+DATETIME_FORMATS = [
+    ISO_FORMAT,
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d-%m-%Y %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y/%m/%d %H:%M:%S",
+    "%d/%m/%Y",
+]
+
+# Zero-padded byte layout of each format: one letter per digit
+# (Y year, m month, d day, H hour, M minute, S second), anything else
+# must match literally.
+_FIXED_LAYOUTS = {
+    fmt: (fmt.replace("%Y", "YYYY").replace("%m", "mm").replace("%d", "dd")
+             .replace("%H", "HH").replace("%M", "MM").replace("%S", "SS"))
+    for fmt in DATETIME_FORMATS
+}
+
+# Days per month, index 1..12 (February without the leap day)
+_DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+
+# Detected format per file version ((name, size, mtime_ns) -> format or None),
+# least recently used first; bounded, since the ingest daemon is long-running
+_format_cache = OrderedDict()
+FORMAT_CACHE_SIZE = 1024
+
+
+def detect_datetime_format(values, sample_size=200):
+    """
+    Returns the format in DATETIME_FORMATS that parses the most values of a
+    small sample (the first one that parses all of them wins), or None if
+    none of them fits.
+    """
+    sample = values.head(sample_size).dropna().astype(str)
+    if sample.empty:
+        return None
+
+    best_fmt, best_count = None, 0
+    for fmt in DATETIME_FORMATS:
+        count = pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum()
+        if count == len(sample):
+            return fmt
+        if count > best_count:
+            best_fmt, best_count = fmt, count
+    return best_fmt
+
+
+def format_cache_key(path):
+    """Key of one version of a file: a file delivered again with new content gets a new key."""
+    st = Path(path).stat()
+    return (Path(path).name, st.st_size, st.st_mtime_ns)
+
+
+def cached_datetime_format(key, values):
+    """Detects the datetime format once per key (usually format_cache_key(path))."""
+    if key in _format_cache:
+        _format_cache.move_to_end(key)
+        return _format_cache[key]
+    fmt = _format_cache[key] = detect_datetime_format(values)
+    while len(_format_cache) > FORMAT_CACHE_SIZE:
+        _format_cache.popitem(last=False)
+    return fmt
+
+
+def clear_format_cache():
+    _format_cache.clear()
+
+
+def _valid_dates(year, month, day):
+    """Mask of the (year, month, day) triples that are real calendar dates."""
+    valid = (year >= 1) & (year <= 9999) & (month >= 1) & (month <= 12) & (day >= 1)
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = _DAYS_IN_MONTH[np.where(valid, month, 0)] + ((month == 2) & leap)
+    return valid & (day <= month_days)
+
+
+def _days_from_civil(year, month, day):
+    """Days since 1970-01-01 for proleptic Gregorian dates (integer arithmetic only)."""
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _civil_from_days(days):
+    """Inverse of _days_from_civil: returns (year, month, day) arrays."""
+    days = days + 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    mp = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * mp + 2) // 5 + 1
+    month = np.where(mp < 10, mp + 3, mp - 9)
+    year = year_of_era + era * 400 + (month <= 2)
+    return year, month, day
+
+
+def _char_codes(values, width):
+    """
+    Returns (codes, fits): the first `width` bytes of every value of an
+    object array as a (width, n) uint8 matrix, and a mask of the values
+    that are exactly `width` ASCII characters long.
+    """
+    try:
+        chars = values.astype(f"S{width + 1}")
+    except UnicodeEncodeError:
+        chars = np.array(
+            [v.encode("ascii", "replace") if isinstance(v, str) else b"" for v in values],
+            dtype=f"S{width + 1}"
+        )
+
+    # One contiguous row per character position keeps the column scans fast
+    codes = chars.view(np.uint8).reshape(len(chars), width + 1).T.copy()
+    fits = (codes[width] == 0) & (codes[width - 1] != 0)
+    return codes[:width], fits
+
+
+def parse_fixed_width(values, fmt):
+    """
+    Parses the values (object array) that follow fmt's zero-padded layout
+    exactly, straight from their bytes with integer arithmetic.
+    Returns (datetime64[s] array, ok mask); rows that do not follow the
+    layout or are not valid dates/times are NaT with ok=False.
+    """
+    layout = _FIXED_LAYOUTS[fmt]
+    codes, ok = _char_codes(values, len(layout))
+
+    fields = {}
+    for pos, ch in enumerate(layout):
+        col = codes[pos]
+        if ch in "YmdHMS":
+            digit = col - np.uint8(ord("0"))  # wraps around for bytes below '0'
+            ok &= digit <= 9
+            fields[ch] = fields.get(ch, 0) * 10 + digit.astype(np.int64)
+        else:
+            ok &= col == ord(ch)
+
+    n = codes.shape[1]
+    year, month, day = fields["Y"], fields["m"], fields["d"]
+    hour, minute, second = (fields.get(k, np.zeros(n, dtype=np.int64)) for k in "HMS")
+
+    ok &= _valid_dates(year, month, day)
+    ok &= (hour < 24) & (minute < 60) & (second < 60)
+
+    epoch_seconds = (
+        _days_from_civil(year, month, day) * 86400
+        + hour * 3600 + minute * 60 + second
+    )
+    parsed = epoch_seconds.astype("datetime64[s]")
+    parsed[~ok] = np.datetime64("NaT")
+    return parsed, ok
+
+
+def parse_datetimes_slow(raw):
+    """
+    Element-wise fallback: ISO strings with an explicit format, everything
+    else with format inference and dayfirst=True.
+    """
+    raw = raw.astype(str)
+
+    # ISO-like: 2025-10-20 00:01:10 (YYYY-MM-DD HH:MM:SS)
+    iso_mask = raw.str.match(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
+
+    # Parse DD/MM/YYYY HH:MM:SS (and similar) with dayfirst=True
+    dt_dayfirst = pd.to_datetime(
+        raw.where(~iso_mask),
+        errors="coerce",
+        dayfirst=True
+    )
+
+    # Parse ISO strings with an explicit format
+    dt_iso = pd.to_datetime(
+        raw.where(iso_mask),
+        errors="coerce",
+        format=ISO_FORMAT
+    )
+
+    return dt_dayfirst.fillna(dt_iso)
+
+
+def _parse(values, fmt):
+    """
+    Returns (datetime64[s] array, fixed mask) for an object array, where the
+    mask flags the values decoded straight from fmt's fixed-width layout.
+    """
+    parsed, fixed = parse_fixed_width(values, fmt)
+
+    rest = ~fixed
+    if rest.any():
+        leftovers = pd.Series(values[rest]).astype(str)
+        parsed[rest] = pd.to_datetime(
+            leftovers, format=fmt, errors="coerce"
+        ).to_numpy(dtype=parsed.dtype)
+
+        failed = np.isnat(parsed)
+        if failed.any():
+            parsed[failed] = parse_datetimes_slow(
+                pd.Series(values[failed])
+            ).to_numpy(dtype=parsed.dtype)
+
+    return parsed, fixed
+
+
+def parse_datetimes(raw, fmt=None):
+    """
+    Parses a whole column with one explicit format.
+
+    Values in fmt's zero-padded layout are decoded from their bytes; the
+    rest is tried with pd.to_datetime(format=fmt), and only the rows that
+    still fail go through parse_datetimes_slow. Unparseable rows are NaT.
+    """
+    if fmt is None:
+        return parse_datetimes_slow(raw)
+
+    parsed, _ = _parse(raw.to_numpy(dtype=object), fmt)
+    return pd.Series(parsed, index=raw.index, name=raw.name)
+
+
+def _render_fixed_width(pieces, n):
+    """
+    Renders n fixed-width strings column by column. pieces is a sequence of
+    separators (str) and (int array, width) pairs rendered zero-padded.
+    """
+    width = sum(len(p) if isinstance(p, str) else p[1] for p in pieces)
+    buf = np.empty((n, width), dtype=np.uint8)
+
+    col = 0
+    for piece in pieces:
+        if isinstance(piece, str):
+            buf[:, col:col + len(piece)] = np.frombuffer(piece.encode("ascii"), dtype=np.uint8)
+            col += len(piece)
+            continue
+        values, w = piece
+        for k in range(w):
+            buf[:, col + w - 1 - k] = 48 + (values // 10 ** k) % 10
+        col += w
+
+    return buf.view(f"S{width}").ravel().astype(f"U{width}").astype(object)
+
+
+def format_iso(parsed):
+    """Renders a datetime64[s] array without NaT as 'YYYY-MM-DD HH:MM:SS'."""
+    days, second_of_day = np.divmod(parsed.astype(np.int64), 86400)
+    year, month, day = _civil_from_days(days)
+
+    return _render_fixed_width([
+        (year, 4), "-", (month, 2), "-", (day, 2), " ",
+        (second_of_day // 3600, 2), ":",
+        (second_of_day // 60 % 60, 2), ":",
+        (second_of_day % 60, 2),
+    ], len(parsed))
+
+
+def to_iso_strings(parsed):
+    """Formats a datetime column (without NaT) as 'YYYY-MM-DD HH:MM:SS'."""
+    text = format_iso(parsed.to_numpy(dtype="datetime64[s]"))
+    return pd.Series(text, index=parsed.index, name=parsed.name)
+
+
+def normalize_datetimes(raw, fmt=None):
+    """
+    Parses a raw datetime column and returns it as 'YYYY-MM-DD HH:MM:SS'
+    text, with None for values that cannot be parsed.
+
+    Values already in exactly that layout are reused as they are (they parse
+    to the same timestamp), so only the other rows are formatted.
+    """
+    values = raw.to_numpy(dtype=object)
+
+    if fmt is None:
+        parsed = parse_datetimes_slow(raw).to_numpy(dtype="datetime64[s]")
+        canonical = np.zeros(len(values), dtype=bool)
+    else:
+        parsed, canonical = _parse(values, fmt)
+
+    if fmt != ISO_FORMAT:
+        canonical = parse_fixed_width(values, ISO_FORMAT)[1]
+
+    out = np.full(len(values), None, dtype=object)
+    out[canonical] = values[canonical]
+
+    todo = ~canonical & ~np.isnat(parsed)
+    if todo.any():
+        out[todo] = format_iso(parsed[todo])
+
+    return pd.Series(out, index=raw.index, name=raw.name)
+
+
+def build_snapshot_dates(year, month, day):
+    """
+    Builds 'YYYY-MM-DD' strings from integer year/month/day columns with
+    array arithmetic. Rows that are not real calendar dates (e.g. day 31 in
+    a 30-day month) are formatted per value, as before, so nothing is lost.
+    """
+    year = np.asarray(year, dtype=np.int64)
+    month = np.asarray(month, dtype=np.int64)
+    day = np.asarray(day, dtype=np.int64)
+
+    valid = _valid_dates(year, month, day)
+
+    out = _render_fixed_width([(year, 4), "-", (month, 2), "-", (day, 2)], len(year))
+    for i in np.flatnonzero(~valid):
+        out[i] = f"{int(year[i]):04d}-{int(month[i]):02d}-{int(day[i]):02d}"
+
+    return out
+
+
+def normalize_labels(values):
+    """
+    Queue / status names as stored in the lookup tables: surrounding
+    whitespace removed and upper-cased, so 'Legal ' and 'LEGAL' are one
+    code. Only the distinct values are cleaned (there are a few dozen);
+    missing values become None.
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+    # Code -1 (missing) picks the trailing None
+    cleaned = np.array([str(u).strip().upper() for u in uniques] + [None], dtype=object)
+    return pd.Series(cleaned[codes], index=values.index, name=values.name)
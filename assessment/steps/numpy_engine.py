@@ -0,0 +1,166 @@
+# steps/numpy_engine.py
+#
+# In-memory alternative to the SQL in step3: events are loaded once into
+# NumPy arrays sorted by (account, event_ts, event_id), and both "state as
+# of T" and "latest change" become group-boundary lookups with searchsorted.
+# Useful for backfills and what-if runs that ask many questions of the same
+# events (load once, query many times).
+
+import numpy as np
+
+from .normalize import format_iso
+from .state import to_epoch
+
+FETCH_ROWS = 500_000
+
+# events.source, by code
+SOURCE_VALUES = ["DAILY", "MONTHLY"]
+
+
+def _lookup_values(conn, table, key):
+    """
+    Names of a lookup table (queues / statuses) indexed by their code, so
+    the codes stored in events index the array directly; unused codes are None.
+    """
+    rows = conn.execute(f"SELECT {key}, name FROM {table};").fetchall()
+    values = np.full(max((code for code, _ in rows), default=-1) + 1, None, dtype=object)
+    for code, name in rows:
+        values[code] = name
+    return values
+
+
+def load_events(conn):
+    """
+    Reads the events table into a dict of arrays:
+
+      account, event_ts   int64, sorted by (account, event_ts, event_id)
+      queue, status       int32 codes (queue_id / status_id) into
+                          queue_values / status_values, -1 for NULL
+      source              int8 code into source_values (DAILY, MONTHLY)
+      accounts, starts, ends
+                          one entry per account: id and the [start, end)
+                          slice of its events
+
+    The queue/status codes and the source are packed into one integer in
+    SQL, so only three integers per event cross into Python (the sqlite3
+    row conversion is most of the load time). Rows are read in event_id order
+    and sorted with a stable sort, which keeps event_id as the tie-breaker.
+    """
+    queue_values = _lookup_values(conn, "queues", "queue_id")
+    status_values = _lookup_values(conn, "statuses", "status_id")
+    status_base = len(status_values) + 1
+
+    cur = conn.execute(f"""
+        SELECT
+            account,
+            event_ts,
+            ((COALESCE(queue_id, -1) + 1) * {status_base} + COALESCE(status_id, -1) + 1) * 2
+                + (source = 'MONTHLY')
+        FROM events
+        ORDER BY event_id;
+    """)
+    chunks = [np.empty((0, 3), dtype=np.int64)]
+    while True:
+        rows = cur.fetchmany(FETCH_ROWS)
+        if not rows:
+            break
+        chunks.append(np.array(rows, dtype=np.int64))
+    data = np.concatenate(chunks)
+    filled = len(data)
+
+    # One stable sort on a packed (account, event_ts) key when it fits in
+    # int64, two-key lexsort otherwise
+    ts_min = int(data[:, 1].min()) if filled else 0
+    ts_span = int(data[:, 1].max()) - ts_min + 1 if filled else 1
+    acc_min = int(data[:, 0].min()) if filled else 0
+    acc_span = int(data[:, 0].max()) - acc_min + 1 if filled else 1
+    if acc_span * ts_span < 2 ** 62:
+        key = (data[:, 0] - acc_min) * ts_span + (data[:, 1] - ts_min)
+        order = np.argsort(key, kind="stable")
+    else:
+        order = np.lexsort((data[:, 1], data[:, 0]))
+    data = data[order]
+
+    account = np.ascontiguousarray(data[:, 0])
+    codes, source = np.divmod(data[:, 2], 2)
+    queue, status = np.divmod(codes, status_base)
+    starts = np.flatnonzero(np.r_[True, account[1:] != account[:-1]]) if filled else np.empty(0, dtype=np.int64)
+    ends = np.r_[starts[1:], filled].astype(np.int64)
+
+    return {
+        "account": account,
+        "event_ts": np.ascontiguousarray(data[:, 1]),
+        "queue": (queue - 1).astype(np.int32),
+        "status": (status - 1).astype(np.int32),
+        "source": source.astype(np.int8),
+        "queue_values": queue_values,
+        "status_values": status_values,
+        "source_values": np.array(SOURCE_VALUES, dtype=object),
+        "accounts": account[starts],
+        "starts": starts,
+        "ends": ends,
+    }
+
+
+def latest_index(ev):
+    """Position of each account's latest event (one per entry of ev['accounts'])."""
+    return ev["ends"] - 1
+
+
+def as_of_index(ev, ts):
+    """
+    Position of each account's last event at or before ts, or -1 when the
+    account has no event that early.
+
+    (group number, event_ts) is packed into one increasing int64 key, so a
+    single searchsorted answers every account at once.
+    """
+    event_ts = ev["event_ts"]
+    starts = ev["starts"]
+    if len(event_ts) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    ts_min = int(event_ts.min())
+    span = int(event_ts.max()) - ts_min + 2
+
+    group = np.repeat(np.arange(len(starts), dtype=np.int64), ev["ends"] - starts)
+    keys = group * span + (event_ts - ts_min)
+
+    offset = min(max(to_epoch(ts) - ts_min, -1), span - 2)
+    probes = np.arange(len(starts), dtype=np.int64) * span + offset
+
+    pos = np.searchsorted(keys, probes, side="right") - 1
+    return np.where(pos >= starts, pos, -1)
+
+
+def _codes_in(values, wanted):
+    """Mask over dictionary codes whose value is in `wanted` (case-insensitive)."""
+    wanted = {w.strip().upper() for w in wanted}
+    return np.array([v is not None and v.upper() in wanted for v in values], dtype=bool)
+
+
+def latest_status_rows(ev, reference_datetime, target_queues):
+    """
+    Same rows as step3's SQL: accounts whose queue as of reference_datetime
+    is one of target_queues, with their latest change overall, as
+    [(account_id, queue, status, latest_update_datetime)] ordered by account.
+    """
+    ref = as_of_index(ev, reference_datetime)
+    has_state = ref >= 0
+
+    target_codes = _codes_in(ev["queue_values"], target_queues)
+    ref_queue = ev["queue"][np.where(has_state, ref, 0)]
+    in_target = has_state & (ref_queue >= 0) & target_codes[np.maximum(ref_queue, 0)]
+
+    latest = latest_index(ev)[in_target]
+
+    # Index -1 (NULL) picks the trailing None
+    queue_values = np.append(ev["queue_values"], None)
+    status_values = np.append(ev["status_values"], None)
+
+    accounts = ev["accounts"][in_target].tolist()
+    queues = queue_values[ev["queue"][latest]].tolist()
+    statuses = status_values[ev["status"][latest]].tolist()
+    datetimes = format_iso(ev["event_ts"][latest].astype("datetime64[s]")).tolist()
+
+    return list(zip(accounts, queues, statuses, datetimes))
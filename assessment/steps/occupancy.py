@@ -0,0 +1,178 @@
+# steps/occupancy.py
+#
+# Daily queue occupancy: how many accounts sit in each queue at the end of
+# every day, computed with one sweep over events in time order instead of
+# one step3-style "state as of T" query per day.
+#
+# Usage (from the assessment folder):
+#     python -m steps.occupancy            # extend the series with new events
+#     python -m steps.occupancy --full     # rebuild it from scratch
+
+import argparse
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from .config import DB_PATH
+from .db import step_connection
+from .meta import get_meta, set_meta
+from .state import state_as_of
+
+SECONDS_PER_DAY = 86400
+EPOCH_DATE = date(1970, 1, 1)
+
+# pipeline_meta keys
+WATERMARK_KEY = "occupancy_last_event_id"
+GENERATION_KEY = "occupancy_events_generation"
+
+
+def create_occupancy_table(conn, drop_existing=False):
+    cur = conn.cursor()
+
+    if drop_existing:
+        cur.execute("DROP TABLE IF EXISTS queue_occupancy_daily;")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS queue_occupancy_daily (
+            date TEXT NOT NULL,
+            queue TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (date, queue)
+        );
+    """)
+    conn.commit()
+
+
+def _day_text(day):
+    return (EPOCH_DATE + timedelta(days=int(day))).isoformat()
+
+
+def sweep(events, queue_of, first_day, last_day):
+    """
+    Walks (account, event_ts, queue) rows sorted by (event_ts, event_id) and
+    yields (date, queue, count) for every day from first_day to last_day
+    (days since 1970-01-01), counting each account in the queue of its last
+    event up to the end of that day.
+
+    queue_of maps account -> queue at the start of first_day and is updated
+    in place. Queues with no accounts on a given day are not emitted.
+    """
+    counts = Counter(q for q in queue_of.values() if q is not None)
+    day = first_day
+
+    def snapshot(d):
+        text = _day_text(d)
+        return [(text, q, n) for q, n in sorted(counts.items()) if n > 0]
+
+    for account, event_ts, queue in events:
+        event_day = event_ts // SECONDS_PER_DAY
+        while day < event_day and day <= last_day:
+            yield from snapshot(day)
+            day += 1
+
+        previous = queue_of.get(account)
+        if previous is not None:
+            counts[previous] -= 1
+        if queue is not None:
+            counts[queue] += 1
+        queue_of[account] = queue
+
+    while day <= last_day:
+        yield from snapshot(day)
+        day += 1
+
+
+def update_occupancy(conn, full=False):
+    """
+    Brings queue_occupancy_daily up to date with the events table.
+
+    Incremental by default: only days from the earliest new event onwards
+    (events with event_id above the stored watermark) are recomputed, starting
+    from every account's state at the end of the previous day (state_as_of).
+    Late events that land before the last stored day are handled the same way.
+    A full rebuild is done when the table is new or when events was rebuilt
+    since the last run. Returns the number of rows written.
+    """
+    start = time.perf_counter()
+    cur = conn.cursor()
+
+    generation = get_meta(conn, "events_generation")
+    last_event_id = int(get_meta(conn, WATERMARK_KEY, 0))
+    exists = cur.execute("""
+        SELECT 1 FROM sqlite_master
+        WHERE type = 'table' AND name = 'queue_occupancy_daily';
+    """).fetchone()
+
+    if not exists or get_meta(conn, GENERATION_KEY) != generation:
+        full = True
+    create_occupancy_table(conn, drop_existing=full)
+    if full:
+        last_event_id = 0
+
+    max_event_id, min_new_ts, max_ts = cur.execute("""
+        SELECT
+            (SELECT COALESCE(MAX(event_id), 0) FROM events),
+            (SELECT MIN(event_ts) FROM events WHERE event_id > ?),
+            (SELECT MAX(event_ts) FROM events);
+    """, (last_event_id,)).fetchone()
+
+    if min_new_ts is None:
+        print("[occupancy] No new events; queue_occupancy_daily is up to date")
+        return 0
+
+    first_day = min_new_ts // SECONDS_PER_DAY
+    last_day = max_ts // SECONDS_PER_DAY
+    day_start = first_day * SECONDS_PER_DAY
+
+    # State at the end of the day before the first recomputed day
+    queue_of = {}
+    if not full:
+        queue_of = {
+            account: queue
+            for account, queue, _, _ in state_as_of(conn, day_start - 1)
+        }
+
+    events = conn.execute("""
+        SELECT e.account, e.event_ts, q.name
+        FROM events e
+        LEFT JOIN queues q
+            ON q.queue_id = e.queue_id
+        WHERE e.event_ts >= ?
+        ORDER BY e.event_ts, e.event_id;
+    """, (day_start,))
+    rows = list(sweep(events, queue_of, first_day, last_day))
+
+    cur.execute("DELETE FROM queue_occupancy_daily WHERE date >= ?;", (_day_text(first_day),))
+    cur.executemany("""
+        INSERT INTO queue_occupancy_daily (date, queue, count)
+        VALUES (?, ?, ?);
+    """, rows)
+
+    set_meta(conn, WATERMARK_KEY, max_event_id)
+    set_meta(conn, GENERATION_KEY, generation)
+    conn.commit()
+
+    elapsed = time.perf_counter() - start
+    mode = "Rebuilt" if full else "Extended"
+    print(
+        f"[occupancy] {mode} queue_occupancy_daily from {_day_text(first_day)} "
+        f"to {_day_text(last_day)}: {len(rows)} rows in {elapsed:.3f} s"
+    )
+    return len(rows)
+
+
+def run(full=False, conn=None):
+    print(f"[occupancy] Using database: {DB_PATH}")
+    with step_connection(conn) as conn:
+        update_occupancy(conn, full=full)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the daily queue occupancy series.")
+    parser.add_argument("--full", action="store_true", help="Rebuild the whole series.")
+    args = parser.parse_args(argv)
+    run(full=args.full)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# steps/pipeline.py
+#
+# Small DAG runner used by the orchestrator. Each Step declares what it reads
+# (data files, parameters, upstream steps whose tables it uses) and what it
+# writes (tables, files). Before running a step the runner fingerprints its
+# inputs; when the fingerprint matches the last successful run recorded in
+# step_runs and the outputs still exist, the step is skipped.
+#
+# Fingerprints are content-addressed on the inputs rather than on the output
+# tables: data files by name and SHA-256 of their content, parameters by
+# value, the steps package by source hash, and upstream tables by the
+# fingerprint of the step that produced them (same inputs -> same tables).
+# A file whose size and mtime match step 1's ingested_files manifest reuses
+# the hash stored there, so only new or touched files are read. Edits made
+# to the database by hand are not detected; use --force for those.
+
+import hashlib
+import json
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from .db import step_connection
+
+STEPS_DIR = Path(__file__).resolve().parent
+
+
+@dataclass
+class Step:
+    name: str
+    run: object                      # callable without arguments
+    upstream: list = field(default_factory=list)
+    files: object = None             # callable returning the input file paths
+    params: dict = field(default_factory=dict)
+    output_tables: list = field(default_factory=list)
+    output_files: list = field(default_factory=list)
+    cacheable: bool = True           # False: always run when selected (e.g. benchmarks)
+
+
+def create_step_runs_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS step_runs (
+            step TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            status TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT,
+            duration_s REAL
+        );
+    """)
+    conn.commit()
+
+
+def code_fingerprint():
+    """Hash of every module in the steps package (any code change invalidates the cache)."""
+    h = hashlib.sha256()
+    for path in sorted(STEPS_DIR.glob("*.py")):
+        h.update(path.name.encode())
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def file_manifest(conn):
+    """{file_name: (size_bytes, mtime, content_hash)} from step 1's ingested_files, if any."""
+    try:
+        rows = conn.execute(
+            "SELECT file_name, size_bytes, mtime, content_hash FROM ingested_files;"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return {name: (size, mtime, content_hash) for name, size, mtime, content_hash in rows}
+
+
+def file_signature(path, manifest=None):
+    """[name, SHA-256 of the content]; the manifest's hash is reused when size and mtime match."""
+    path = Path(path)
+    if not path.exists():
+        return [path.name, None]
+    st = path.stat()
+    known = (manifest or {}).get(path.name)
+    if known and known[0] == st.st_size and known[1] == st.st_mtime:
+        return [path.name, known[2]]
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return [path.name, h.hexdigest()]
+
+
+def step_fingerprint(step, upstream_fingerprints, code, manifest=None):
+    files = step.files() if step.files else []
+    payload = {
+        "step": step.name,
+        "code": code,
+        "params": step.params,
+        "files": [file_signature(p, manifest) for p in files],
+        "upstream": {name: upstream_fingerprints.get(name) for name in step.upstream},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def last_runs(conn):
+    return {
+        step: (fingerprint, status)
+        for step, fingerprint, status in conn.execute(
+            "SELECT step, fingerprint, status FROM step_runs;"
+        )
+    }
+
+
+def outputs_exist(conn, step):
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table';")}
+    return (
+        all(t in tables for t in step.output_tables)
+        and all(Path(f).exists() for f in step.output_files)
+    )
+
+
+def record_run(step, fingerprint, status, started, duration, conn=None):
+    with step_connection(conn) as conn:
+        create_step_runs_table(conn)
+        conn.execute("""
+            INSERT INTO step_runs (step, fingerprint, status, started_at, finished_at, duration_s)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(step) DO UPDATE SET
+                fingerprint = excluded.fingerprint,
+                status = excluded.status,
+                started_at = excluded.started_at,
+                finished_at = excluded.finished_at,
+                duration_s = excluded.duration_s;
+        """, (
+            step.name, fingerprint, status, started.isoformat(timespec="seconds"),
+            datetime.now().isoformat(timespec="seconds"), duration,
+        ))
+        conn.commit()
+
+
+def select_steps(steps, only=None, from_step=None):
+    """Names of the steps to consider: all, `only`, or from_step and everything after it."""
+    names = [s.name for s in steps]
+    for name in list(only or []) + ([from_step] if from_step else []):
+        if name not in names:
+            raise ValueError(f"[pipeline] Unknown step {name!r}, expected one of {names}")
+    if only:
+        return set(only)
+    if from_step:
+        return set(names[names.index(from_step):])
+    return set(names)
+
+
+def run_pipeline(steps, only=None, from_step=None, force=False, metrics=None, conn=None):
+    """
+    Runs `steps` (already in dependency order).
+
+    - default: every step runs unless its fingerprint is unchanged
+    - only=[...] / from_step=...: just those steps, always run
+    - force=True: run every selected step regardless of fingerprints
+
+    Steps outside the selection are not run; their last recorded fingerprint
+    stands in for them when fingerprinting the steps downstream.
+    conn: connection shared with the steps (e.g. the in-memory mode);
+    step_runs is kept there too.
+    Returns {step: "ran" | "skipped" | "not selected"}.
+    """
+    selected = select_steps(steps, only, from_step)
+    forced = force or bool(only) or bool(from_step)
+
+    with step_connection(conn) as c:
+        create_step_runs_table(c)
+        previous = last_runs(c)
+        manifest = file_manifest(c)
+
+    code = code_fingerprint()
+    fingerprints, outcome = {}, {}
+
+    for step in steps:
+        fingerprint = step_fingerprint(step, fingerprints, code, manifest)
+        last_fingerprint, last_status = previous.get(step.name, (None, None))
+
+        if step.name not in selected:
+            fingerprints[step.name] = last_fingerprint or fingerprint
+            outcome[step.name] = "not selected"
+            continue
+
+        fingerprints[step.name] = fingerprint
+
+        if not forced and step.cacheable and last_status == "ok" and last_fingerprint == fingerprint:
+            with step_connection(conn) as c:
+                up_to_date = outputs_exist(c, step)
+            if up_to_date:
+                print(f"[pipeline] {step.name}: inputs unchanged since last successful run, skipped")
+                outcome[step.name] = "skipped"
+                continue
+
+        print(f"[pipeline] {step.name}: running")
+        started, start = datetime.now(), time.perf_counter()
+        try:
+            if metrics is not None:
+                with metrics.step(step.name, conn=conn):
+                    step.run()
+            else:
+                step.run()
+        except BaseException:
+            if conn is not None:
+                # What a step's own connection would have discarded on close
+                conn.rollback()
+            record_run(step, fingerprint, "failed", started, time.perf_counter() - start, conn)
+            raise
+        record_run(step, fingerprint, "ok", started, time.perf_counter() - start, conn)
+        outcome[step.name] = "ran"
+
+    print("[pipeline] " + ", ".join(f"{name}: {state}" for name, state in outcome.items()))
+    return outcome
@@ -0,0 +1,220 @@
+# steps/result_cache.py
+#
+# Cache of parameterised as-of query results, keyed by (query kind,
+# reference datetime as Unix seconds, queues, data_version). data_version is bumped in
+# pipeline_meta whenever step1 adds events (steps/events.py), so results
+# computed before an ingestion are never served after it.
+#
+# Two levels: an in-process LRU (OrderedDict) in front of the query_cache
+# table, which keeps results across processes with LRU eviction by entry
+# count and total size. Step 3 reads its rebuild rows through it with
+# --result-cache (steps/step3_latest_collections_legal.py).
+#
+# Usage (from the assessment folder):
+#     python -m steps.result_cache latest_status "2025-11-27 23:59:59" --queues COLLECTIONS LEGAL
+#     python -m steps.result_cache state_as_of 2025-06-01 --repeat 3
+#     python -m steps.result_cache --clear
+
+import argparse
+import json
+import time
+import zlib
+from collections import OrderedDict
+
+from .db import connect
+from .meta import data_version
+from .state import REFERENCE_DATETIME, TARGET_QUEUES, latest_status_sql, state_as_of, to_epoch
+
+# Limits of the query_cache table
+MAX_ENTRIES = 256
+MAX_BYTES = 256 * 2**20
+
+# Results kept in the in-process LRU
+MEMORY_ENTRIES = 32
+
+
+def _latest_status(conn, ts, queues):
+    """Step 3's rows, (account_id, queue, status, latest_update_datetime) by account."""
+    sql, queue_params = latest_status_sql("event_accounts", queues)
+    return conn.execute(
+        sql + " ORDER BY account_id", {"ts": to_epoch(ts), **queue_params}
+    ).fetchall()
+
+
+def _state_as_of(conn, ts, queues):
+    """state.state_as_of rows, (account, queue, status, event_datetime)."""
+    return state_as_of(conn, ts, queues=queues)
+
+
+# kind -> function(conn, ts, queues) computing the rows
+QUERY_KINDS = {
+    "latest_status": _latest_status,
+    "state_as_of": _state_as_of,
+}
+
+
+def create_cache_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS query_cache (
+            cache_key TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL,
+            data_version INTEGER NOT NULL,
+            result BLOB NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL
+        );
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_query_cache_last_used
+        ON query_cache (last_used_at);
+    """)
+    conn.commit()
+
+
+def _encode(rows):
+    return zlib.compress(json.dumps(rows).encode())
+
+
+def _decode(blob):
+    return [tuple(row) for row in json.loads(zlib.decompress(blob))]
+
+
+class ResultCache:
+    """
+    Cached as-of queries on one connection:
+
+        cache = ResultCache(conn)
+        rows = cache.get("latest_status", "2025-11-27 23:59:59", ["COLLECTIONS", "LEGAL"])
+
+    ts may be any form to_epoch accepts (equivalent times share an entry),
+    or None for state_as_of's latest state.
+
+    Hits in the in-process LRU do not touch SQLite apart from reading
+    data_version; stats counts memory hits, table hits and misses.
+    """
+
+    def __init__(self, conn, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES,
+                 memory_entries=MEMORY_ENTRIES):
+        self.conn = conn
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.version = None
+        self.stats = {"memory": 0, "table": 0, "miss": 0}
+        create_cache_table(conn)
+
+    def get(self, kind, ts, queues=None):
+        if kind not in QUERY_KINDS:
+            raise ValueError(f"Unknown query kind {kind!r}, expected one of {list(QUERY_KINDS)}")
+
+        version = data_version(self.conn)
+        if version != self.version:
+            # Everything held in memory belongs to an older version
+            self.memory.clear()
+            self.version = version
+
+        if kind == "latest_status" and not queues:
+            queues = TARGET_QUEUES
+        ts = None if ts is None else to_epoch(ts)
+        params = {"ts": ts, "queues": sorted(q.upper() for q in queues) if queues else None}
+        key = json.dumps([kind, params, version])
+
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.stats["memory"] += 1
+            return list(self.memory[key])
+
+        row = self.conn.execute(
+            "SELECT result FROM query_cache WHERE cache_key = ?;", (key,)
+        ).fetchone()
+        if row is not None:
+            self.conn.execute(
+                "UPDATE query_cache SET last_used_at = ? WHERE cache_key = ?;", (time.time(), key)
+            )
+            self.conn.commit()
+            rows = _decode(row[0])
+            self.stats["table"] += 1
+        else:
+            rows = QUERY_KINDS[kind](self.conn, ts, params["queues"])
+            self._store(key, kind, params, version, rows)
+            self.stats["miss"] += 1
+
+        self._remember(key, rows)
+        return list(rows)
+
+    def _remember(self, key, rows):
+        self.memory[key] = rows
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _store(self, key, kind, params, version, rows):
+        blob = _encode(rows)
+        now = time.time()
+        cur = self.conn.cursor()
+        # Results of older data versions can never be hit again
+        cur.execute("DELETE FROM query_cache WHERE data_version != ?;", (version,))
+        cur.execute("""
+            INSERT OR REPLACE INTO query_cache (
+                cache_key, kind, params, data_version, result, size_bytes,
+                created_at, last_used_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+        """, (key, kind, json.dumps(params), version, blob, len(blob), now, now))
+        self.evict()
+        self.conn.commit()
+
+    def evict(self):
+        """Drops least recently used rows until both limits hold; the caller commits."""
+        cur = self.conn.cursor()
+        while True:
+            entries, total = cur.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM query_cache;"
+            ).fetchone()
+            if entries <= self.max_entries and total <= self.max_bytes:
+                return
+            cur.execute("""
+                DELETE FROM query_cache
+                WHERE cache_key = (
+                    SELECT cache_key FROM query_cache ORDER BY last_used_at LIMIT 1
+                );
+            """)
+
+    def clear(self):
+        self.memory.clear()
+        self.conn.execute("DELETE FROM query_cache;")
+        self.conn.commit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run an as-of query through the result cache.")
+    parser.add_argument("kind", nargs="?", choices=list(QUERY_KINDS))
+    parser.add_argument("ts", nargs="?", default=REFERENCE_DATETIME)
+    parser.add_argument("--queues", nargs="+", default=None)
+    parser.add_argument("--repeat", type=int, default=1, help="Run the query this many times.")
+    parser.add_argument("--clear", action="store_true", help="Empty the cache.")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        cache = ResultCache(conn)
+        if args.clear:
+            cache.clear()
+            print("[cache] Cleared query_cache")
+        if args.kind:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                rows = cache.get(args.kind, args.ts, args.queues)
+                elapsed = time.perf_counter() - start
+                print(f"[cache] {args.kind} {args.ts}: {len(rows)} rows in {elapsed * 1000:.2f} ms")
+            print(f"[cache] memory hits {cache.stats['memory']}, table hits "
+                  f"{cache.stats['table']}, misses {cache.stats['miss']}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# steps/sharding.py
+#
+# Account-sharded execution of steps 2-4. Every computation in those steps
+# is independent per account (active detection, state as of the reference
+# datetime, latest change), so the book can be split by a hash of the
+# account into N shard databases, each processed by the unchanged step
+# functions in its own process, and the per-shard output tables
+# concatenated back into data.db.
+#
+# Usage (from the assessment folder):
+#     python -m steps.sharding --shards 4
+
+import argparse
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import step3_latest_collections_legal as step3
+from . import step4_final_table as step4
+from .config import DB_PATH
+from .activity import update_account_activity
+from .db import connect
+from .events import create_events_indexes, create_events_table
+from .meta import get_meta, set_meta
+from .step1_setup_db import LABEL_LOOKUPS, create_lookup_tables
+from .step2_active_accounts import create_active_accounts_table
+
+# Knuth's multiplicative hash: consecutive account ids spread evenly
+HASH_MULTIPLIER = 2654435761
+
+# Output tables of steps 2-4, copied back from every shard
+OUTPUT_TABLES = ["active_accounts", "latest_status_collections_legal", "final_latest_accounts"]
+
+
+def shard_of(account, shards):
+    """Shard index of an account (same formula as the SQL filter below)."""
+    return (account * HASH_MULTIPLIER) % 4294967296 % shards
+
+
+def _shard_filter(column):
+    return f"({column} * {HASH_MULTIPLIER}) % 4294967296 % :shards = :shard"
+
+
+def build_shard(shard, shards, shard_path, engine="sqlite",
+                reference_datetime=step3.REFERENCE_DATETIME,
+                target_queues=step3.TARGET_QUEUES):
+    """
+    Worker process: copies the shard's accounts, account_activity rows
+    (step 2) and events, and the queue/status lookup tables, out of data.db
+    into shard_path, then runs steps 2-4 on it.
+    Returns (shard_path, seconds).
+    """
+    start = time.perf_counter()
+    params = {"shard": shard, "shards": shards}
+
+    conn = connect(shard_path)
+    try:
+        # Before attaching: unqualified DROP TABLE would reach live.events
+        create_events_table(conn)
+        create_lookup_tables(conn)
+        conn.execute("ATTACH DATABASE ? AS live;", (str(DB_PATH),))
+        for table, _ in LABEL_LOOKUPS.values():
+            conn.execute(f"INSERT INTO main.{table} SELECT * FROM live.{table};")
+
+        conn.execute(f"""
+            CREATE TABLE main.accounts AS
+            SELECT account_id, name, address
+            FROM live.accounts
+            WHERE {_shard_filter("account_id")};
+        """, params)
+        conn.execute(f"""
+            CREATE TABLE main.account_activity AS
+            SELECT * FROM live.account_activity
+            WHERE {_shard_filter("account")};
+        """, params)
+
+        conn.execute(f"""
+            INSERT INTO main.events
+            SELECT * FROM live.events
+            WHERE {_shard_filter("account")}
+            ORDER BY event_id;
+        """, params)
+        conn.execute(f"""
+            INSERT INTO main.event_accounts (account)
+            SELECT account FROM live.event_accounts
+            WHERE {_shard_filter("account")};
+        """, params)
+        conn.commit()
+        conn.execute("DETACH DATABASE live;")
+        create_events_indexes(conn)
+
+        create_active_accounts_table(conn)
+        step3.create_latest_status_table(conn, reference_datetime, target_queues, engine)
+        step4.create_final_table(conn)
+    finally:
+        conn.close()
+
+    return shard_path, time.perf_counter() - start
+
+
+def merge_shards(conn, shard_paths):
+    """
+    Recreates the output tables in data.db with the shards' schema and
+    concatenates the shard rows into them in one transaction. The tables
+    are keyed by account_id, so they read back in the same order as after
+    a single-database run.
+    """
+    conn.commit()
+    for i, path in enumerate(shard_paths):
+        conn.execute(f"ATTACH DATABASE ? AS shard_{i};", (str(path),))
+
+    conn.execute("BEGIN;")
+    try:
+        for table in OUTPUT_TABLES:
+            (ddl,) = conn.execute(
+                "SELECT sql FROM shard_0.sqlite_master WHERE type = 'table' AND name = ?;",
+                (table,)
+            ).fetchone()
+            conn.execute(f"DROP TABLE IF EXISTS main.{table};")
+            conn.execute(ddl)
+            for i in range(len(shard_paths)):
+                conn.execute(f"INSERT INTO main.{table} SELECT * FROM shard_{i}.{table};")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        for i in range(len(shard_paths)):
+            conn.execute(f"DETACH DATABASE shard_{i};")
+
+
+def record_state(conn, reference_datetime, target_queues):
+    """
+    Stores the same step3/step4 watermarks a single-database full run
+    would, so later --incremental runs can build on the merged tables.
+    """
+    last_event_id = conn.execute("SELECT COALESCE(MAX(event_id), 0) FROM events;").fetchone()[0]
+    step3.record_state(conn, last_event_id, reference_datetime, target_queues)
+    set_meta(conn, step3.BUILD_KEY, int(get_meta(conn, step3.BUILD_KEY, 0)) + 1)
+    step4.record_state(conn)
+    conn.commit()
+
+
+def run_sharded(shards, reference_datetime=step3.REFERENCE_DATETIME,
+                target_queues=step3.TARGET_QUEUES, engine="sqlite", workers=None,
+                output=step4.DEFAULT_OUTPUT):
+    """
+    Runs steps 2-4 on `shards` account shards in a process pool (workers
+    defaults to min(shards, CPU count)), merges the output tables into
+    data.db and exports them to `output` (see step4.export_results). Always a full rebuild of steps 2-4.
+    """
+    if shards < 1:
+        raise ValueError(f"[shards] Need at least one shard, got {shards}")
+    workers = workers or min(shards, os.cpu_count() or 1)
+
+    print(f"[shards] Using database: {DB_PATH}")
+    conn = connect()
+    try:
+        update_account_activity(conn)
+    finally:
+        conn.close()
+
+    shard_dir = DB_PATH.parent / f"{DB_PATH.stem}_shards"
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    shard_dir.mkdir(parents=True)
+
+    try:
+        start = time.perf_counter()
+        print(f"[shards] Running steps 2-4 on {shards} shard(s) with {workers} worker(s)...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    build_shard, i, shards, shard_dir / f"shard_{i}.db",
+                    engine, reference_datetime, target_queues
+                )
+                for i in range(shards)
+            ]
+            results = [f.result() for f in futures]
+        slowest = max(seconds for _, seconds in results)
+        print(
+            f"[shards] Shards done in {time.perf_counter() - start:.3f} s "
+            f"(slowest shard {slowest:.3f} s)"
+        )
+
+        conn = connect()
+        try:
+            start = time.perf_counter()
+            merge_shards(conn, [path for path, _ in results])
+            record_state(conn, reference_datetime, target_queues)
+            print(f"[shards] Merged shard outputs in {time.perf_counter() - start:.3f} s")
+
+            for table in OUTPUT_TABLES:
+                count = conn.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0]
+                print(f"[shards] Rows in {table}: {count}")
+            step4.export_results(conn, output)
+        finally:
+            conn.close()
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run steps 2-4 on account shards in parallel.")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--engine", choices=step3.ENGINES, default="sqlite")
+    args = parser.parse_args(argv)
+    run_sharded(args.shards, engine=args.engine, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+# steps/state.py
+#
+# Point-in-time account state on top of the events table.
+#
+# Each account's last event at or before T is found with one seek on
+# idx_events_account_ts_id (account, event_ts, event_id, ...) per account,
+# driven by event_accounts, instead of a ROW_NUMBER() sort over every event.
+# The cost grows with the number of accounts asked for, not with the number
+# of events.
+#
+# Step 3's query (latest_status_sql) and its default reference datetime and
+# queues live here too, so step 3, the result cache and the index advisor
+# all build on this module.
+#
+# Usage (from the assessment folder):
+#     python -m steps.state "2025-11-27 23:59:59" --queues COLLECTIONS LEGAL
+#     python -m steps.state "2025-06-01" --accounts 26686 48388
+
+import argparse
+import calendar
+import csv
+import sys
+from datetime import date, datetime
+
+from .db import connect
+
+# Step 3's defaults: "as of Nov 27th", in COLLECTIONS or LEGAL
+REFERENCE_DATETIME = "2025-11-27 23:59:59"
+
+TARGET_QUEUES = ["COLLECTIONS", "LEGAL"]
+
+# Last event of account `a.account` at or before :ts (index seek, newest
+# first; event_id breaks ties between events with the same timestamp)
+LAST_EVENT_AS_OF_SQL = """
+    SELECT event_id
+    FROM events
+    WHERE account = a.account
+      AND event_ts <= :ts
+    ORDER BY event_ts DESC, event_id DESC
+    LIMIT 1
+"""
+
+# Last event of account `a.account` overall
+LAST_EVENT_SQL = """
+    SELECT event_id
+    FROM events
+    WHERE account = a.account
+    ORDER BY event_ts DESC, event_id DESC
+    LIMIT 1
+"""
+
+# Queue / status names of event `e` (events store lookup codes)
+LABEL_JOINS_SQL = """
+    LEFT JOIN queues q
+        ON q.queue_id = e.queue_id
+    LEFT JOIN statuses st
+        ON st.status_id = e.status_id
+"""
+
+
+def queue_filter_sql(column, names):
+    """
+    `column IN (codes of the queues called names)`, case-insensitive.
+    The names are resolved to codes once, so the filter compares integers
+    and can use an index on the code column. Returns (sql, params).
+    """
+    params = {f"q{i}": q.strip().upper() for i, q in enumerate(names)}
+    placeholders = ", ".join(":" + k for k in params)
+    sql = f"{column} IN (SELECT queue_id FROM queues WHERE name IN ({placeholders}))"
+    return sql, params
+
+
+def latest_status_sql(source, target_queues):
+    """
+    Step 3 query for the accounts in `source` (a table with an account
+    column):
+      - determine which of them are in target queues (COLLECTIONS / LEGAL)
+        as of :ts
+      - for those accounts, find their most recent queue/status change,
+        considering both daily updates and monthly snapshots
+        (both are in the events table built by step1).
+
+    Both lookups are one index seek per account on idx_events_account_ts_id
+    (see above) instead of a window sort over every event. The
+    queue test compares queue_id codes; names come from the lookup tables.
+    Returns (sql, queue params).
+    """
+    queue_condition, queue_params = queue_filter_sql("e.queue_id", target_queues)
+
+    sql = f"""
+    WITH
+    -- State of each account as of the reference datetime
+    state_as_of_ref AS (
+        SELECT
+            a.account,
+            ({LAST_EVENT_AS_OF_SQL}) AS event_id
+        FROM {source} a
+    ),
+
+    -- Accounts that are in target queues at the reference datetime
+    target_accounts AS (
+        SELECT
+            s.account
+        FROM state_as_of_ref s
+        JOIN events e
+            ON e.event_id = s.event_id
+        WHERE {queue_condition}
+    ),
+
+    -- For those accounts, find their latest change (overall)
+    latest_changes AS (
+        SELECT
+            a.account,
+            ({LAST_EVENT_SQL}) AS event_id
+        FROM target_accounts a
+    )
+
+    SELECT
+        e.account AS account_id,
+        q.name AS queue,
+        st.name AS status,
+        datetime(e.event_ts, 'unixepoch') AS latest_update_datetime
+    FROM latest_changes l
+    JOIN events e
+        ON e.event_id = l.event_id
+    {LABEL_JOINS_SQL}
+    """
+    return sql, queue_params
+
+
+def to_epoch(ts):
+    """
+    Converts 'YYYY-MM-DD[ HH:MM:SS]', a date/datetime (naive, read as UTC
+    like SQLite's strftime('%s', ...)) or an int to Unix seconds.
+    """
+    if isinstance(ts, int):
+        return ts
+    if isinstance(ts, str):
+        fmt = "%Y-%m-%d %H:%M:%S" if " " in ts.strip() else "%Y-%m-%d"
+        ts = datetime.strptime(ts.strip(), fmt)
+    elif isinstance(ts, date) and not isinstance(ts, datetime):
+        ts = datetime(ts.year, ts.month, ts.day)
+    return calendar.timegm(ts.timetuple())
+
+
+def _account_source(conn, accounts):
+    """
+    Returns the FROM source of the accounts to look up: event_accounts for
+    the whole book, or a temp table holding the requested accounts.
+    """
+    if accounts is None:
+        return "event_accounts"
+
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS state_accounts (account INTEGER PRIMARY KEY);")
+    conn.execute("DELETE FROM state_accounts;")
+    conn.executemany(
+        "INSERT OR IGNORE INTO state_accounts (account) VALUES (?);",
+        [(int(a),) for a in accounts]
+    )
+    return "temp.state_accounts"
+
+
+def state_as_of(conn, ts=None, accounts=None, queues=None):
+    """
+    Returns [(account, queue, status, event_datetime)] with each account's
+    last event at or before ts (ts=None: latest event overall), ordered by
+    account.
+
+    accounts: iterable of account ids to look up (default: every account).
+    queues: only keep accounts whose queue at ts is one of these
+            (case-insensitive).
+    Accounts without any event at or before ts are not returned.
+    """
+    source = _account_source(conn, accounts)
+    seek = LAST_EVENT_SQL if ts is None else LAST_EVENT_AS_OF_SQL
+    params = {} if ts is None else {"ts": to_epoch(ts)}
+
+    queue_filter = ""
+    if queues:
+        condition, queue_params = queue_filter_sql("e.queue_id", queues)
+        queue_filter = f"WHERE {condition}"
+        params.update(queue_params)
+
+    sql = f"""
+        SELECT
+            e.account,
+            q.name AS queue,
+            st.name AS status,
+            datetime(e.event_ts, 'unixepoch') AS event_datetime
+        FROM {source} a
+        JOIN events e
+            ON e.event_id = ({seek})
+        {LABEL_JOINS_SQL}
+        {queue_filter}
+        ORDER BY e.account;
+    """
+    return conn.execute(sql, params).fetchall()
+
+
+def account_state(conn, account, ts=None):
+    """
+    One account's last event at or before ts (ts=None: latest overall) as
+    (account, queue, status, event_datetime), or None when it has none.
+    Unlike state_as_of it needs no temp table, so it also runs on
+    read-only connections.
+    """
+    seek = LAST_EVENT_SQL if ts is None else LAST_EVENT_AS_OF_SQL
+    params = {"account": int(account)}
+    if ts is not None:
+        params["ts"] = to_epoch(ts)
+
+    return conn.execute(f"""
+        SELECT
+            e.account,
+            q.name AS queue,
+            st.name AS status,
+            datetime(e.event_ts, 'unixepoch') AS event_datetime
+        FROM (SELECT :account AS account) a
+        JOIN events e
+            ON e.event_id = ({seek})
+        {LABEL_JOINS_SQL};
+    """, params).fetchone()
+
+
+def latest_state(conn, accounts=None, queues=None):
+    """Each account's latest event overall (see state_as_of)."""
+    return state_as_of(conn, None, accounts=accounts, queues=queues)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Account state as of a point in time.")
+    parser.add_argument("ts", nargs="?", default=None,
+                        help="'YYYY-MM-DD[ HH:MM:SS]' (default: latest state)")
+    parser.add_argument("--accounts", type=int, nargs="+", default=None)
+    parser.add_argument("--queues", nargs="+", default=None)
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        rows = state_as_of(conn, args.ts, accounts=args.accounts, queues=args.queues)
+    finally:
+        conn.close()
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["account", "queue", "status", "event_datetime"])
+    writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
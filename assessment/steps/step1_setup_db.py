@@ -1,66 +1,403 @@
+import hashlib
+import os
+import shutil
 import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
 import pandas as pd
-import re
 
-from .config import DATA_DIR, DB_PATH
+from .activity import update_account_activity
+from .bulk_load import bulk_insert, bulk_load_session
+from .config import DATA_DIR, DB_PATH, STREAMING_CACHE_KIB
+from .db import step_connection
+from .events import create_events_indexes, create_events_table, refresh_events
+from .meta import bump_data_version, create_meta_table
+from .normalize import (
+    build_snapshot_dates,
+    cached_datetime_format,
+    format_cache_key,
+    normalize_datetimes,
+    normalize_labels,
+)
+
+# Text column in the CSVs -> (lookup table, code column stored instead)
+LABEL_LOOKUPS = {
+    "queue": ("queues", "queue_id"),
+    "status": ("statuses", "status_id"),
+}
+
+# Normalised columns identifying a row; their hash is stored in row_hash
+ROW_KEY_COLUMNS = {
+    "daily_status": ["account", "queue", "status", "changed_datetime"],
+    "monthly_status": ["account", "queue", "status", "year", "month", "day"],
+}
+
+# Stands for a missing value in the hashed key (never occurs in the CSVs)
+NULL_KEY = "\x00"
+
+
+def row_hashes(df, columns):
+    """
+    Stable 64-bit hash of every row's `columns`: blake2b of the values
+    joined by a separator, as a signed integer so SQLite stores it in 8
+    bytes. Unlike hash() it is the same in every process and run, and
+    missing values hash alike (as in drop_duplicates).
+
+    Returns an int64 Series aligned with df, also for an empty frame: a
+    float column would make pd.concat upcast (and round) every hash.
+    """
+    values = []
+    for col in columns:
+        series = df[col]
+        if pd.api.types.is_float_dtype(series):
+            # Integers read next to missing values come back as floats
+            series = series.astype("Int64")
+        values.append(series.astype(object).where(series.notna(), NULL_KEY).tolist())
+
+    blake2b = hashlib.blake2b
+    hashes = [
+        int.from_bytes(
+            blake2b("\x1f".join(map(str, row)).encode(), digest_size=8).digest(),
+            "little", signed=True,
+        )
+        for row in zip(*values)
+    ]
+    return pd.Series(hashes, index=df.index, dtype="int64")
+
+
+def create_lookup_tables(conn):
+    """
+    Creates the queues / statuses lookup tables: every normalised name once,
+    with the small integer code that daily_status, monthly_status and
+    events store instead of the text.
+    """
+    for table, key in LABEL_LOOKUPS.values():
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {key} INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            );
+        """)
+    conn.commit()
+
 
+def create_tables(conn, drop_existing=True):
+    """
+    Creates the raw tables and the ingestion manifest.
 
-def create_tables(conn):
+    With drop_existing=False (incremental mode) existing tables and their
+    rows are kept, so only the missing objects are created, and tables
+    from before row_hash or the queue/status codes existed are migrated
+    (see migrate_row_hashes and migrate_label_codes).
+    """
     cur = conn.cursor()
 
-    # Drop if rerunning
-    cur.execute("DROP TABLE IF EXISTS daily_status;")
-    cur.execute("DROP TABLE IF EXISTS monthly_status;")
-    cur.execute("DROP TABLE IF EXISTS accounts;")
+    if drop_existing:
+        # Drop if rerunning
+        cur.execute("DROP TABLE IF EXISTS daily_status;")
+        cur.execute("DROP TABLE IF EXISTS monthly_status;")
+        cur.execute("DROP TABLE IF EXISTS accounts;")
+        cur.execute("DROP TABLE IF EXISTS ingested_files;")
+        for table, _ in LABEL_LOOKUPS.values():
+            cur.execute(f"DROP TABLE IF EXISTS {table};")
 
     # Accounts table
     cur.execute("""
-        CREATE TABLE accounts (
+        CREATE TABLE IF NOT EXISTS accounts (
             account_id INTEGER PRIMARY KEY,
             name TEXT NOT NULL,
             address TEXT
         );
     """)
 
+    # Queue and status names, stored once; the status tables keep the codes
+    create_lookup_tables(conn)
+
     # Daily status table
     cur.execute("""
-        CREATE TABLE daily_status (
+        CREATE TABLE IF NOT EXISTS daily_status (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             account INTEGER NOT NULL,
-            queue TEXT,
-            status TEXT,
+            queue_id INTEGER,
+            status_id INTEGER,
             changed_datetime TEXT NOT NULL,
-            FOREIGN KEY (account) REFERENCES accounts(account_id)
+            row_hash INTEGER NOT NULL,
+            FOREIGN KEY (account) REFERENCES accounts(account_id),
+            FOREIGN KEY (queue_id) REFERENCES queues(queue_id),
+            FOREIGN KEY (status_id) REFERENCES statuses(status_id)
         );
     """)
 
     # Monthly table
     cur.execute("""
-        CREATE TABLE monthly_status (
+        CREATE TABLE IF NOT EXISTS monthly_status (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             account INTEGER NOT NULL,
-            queue TEXT,
-            status TEXT,
+            queue_id INTEGER,
+            status_id INTEGER,
             month INTEGER NOT NULL,
             day INTEGER NOT NULL,
             year INTEGER NOT NULL,
             snapshot_date TEXT NOT NULL,
-            FOREIGN KEY (account) REFERENCES accounts(account_id)
+            row_hash INTEGER NOT NULL,
+            FOREIGN KEY (account) REFERENCES accounts(account_id),
+            FOREIGN KEY (queue_id) REFERENCES queues(queue_id),
+            FOREIGN KEY (status_id) REFERENCES statuses(status_id)
         );
     """)
 
+    # Manifest of ingested files (one row per CSV)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ingested_files (
+            file_name TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            content_hash TEXT NOT NULL,
+            rows_loaded INTEGER NOT NULL,
+            ingested_at TEXT NOT NULL
+        );
+    """)
+
+    # Watermarks and data_version of the derived tables (kept across runs)
+    create_meta_table(conn)
+
+    conn.commit()
+
+    if not drop_existing:
+        migrate_row_hashes(conn)
+        migrate_label_codes(conn)
+
+
+def migrate_row_hashes(conn, batch_rows=200_000):
+    """
+    Adds and backfills row_hash in daily_status / monthly_status tables
+    created before it existed, and drops their natural-key unique indexes.
+    Rows that only the old index let through (NULL queue or status, which
+    SQLite never treats as equal) are removed, keeping the first one, so
+    the row_hash index can be created.
+    """
+    for table, columns in ROW_KEY_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table});")}
+        if "row_hash" in existing:
+            continue
+
+        start = time.perf_counter()
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN row_hash INTEGER;")
+        conn.execute(f"DROP INDEX IF EXISTS ux_{table}_row;")
+
+        last_id = 0
+        updated = 0
+        while True:
+            rows = conn.execute(f"""
+                SELECT id, {", ".join(columns)}
+                FROM {table}
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?;
+            """, (last_id, batch_rows)).fetchall()
+            if not rows:
+                break
+            df = pd.DataFrame(rows, columns=["id", *columns])
+            for column in LABEL_LOOKUPS:
+                df[column] = normalize_labels(df[column])
+            conn.executemany(
+                f"UPDATE {table} SET row_hash = ? WHERE id = ?;",
+                zip(row_hashes(df, columns).tolist(), df["id"].tolist()),
+            )
+            last_id = rows[-1][0]
+            updated += len(rows)
+
+        removed = conn.execute(f"""
+            DELETE FROM {table}
+            WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY row_hash);
+        """).rowcount
+        conn.commit()
+
+        elapsed = time.perf_counter() - start
+        print(f"[step1] Added row_hash to {updated} {table} rows in {elapsed:.3f} s"
+              + (f" ({removed} duplicates removed)" if removed else ""))
+
+
+def migrate_label_codes(conn):
+    """
+    Replaces the queue / status text columns of daily_status and
+    monthly_status tables from before the lookup tables by queue_id /
+    status_id, adding the (normalised) names to queues and statuses in
+    order of first appearance. Indexes on the text columns are dropped.
+    """
+    for table in ROW_KEY_COLUMNS:
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table});")}
+        if "queue" not in existing:
+            continue
+
+        start = time.perf_counter()
+        for _, index, _, origin, _ in conn.execute(f"PRAGMA index_list({table});").fetchall():
+            indexed = {row[2] for row in conn.execute(f"PRAGMA index_info({index});")}
+            if origin == "c" and indexed & set(LABEL_LOOKUPS):
+                conn.execute(f"DROP INDEX {index};")
+
+        for column, (lookup, key) in LABEL_LOOKUPS.items():
+            conn.execute(f"""
+                INSERT OR IGNORE INTO {lookup} (name)
+                SELECT UPPER(TRIM({column})) AS name
+                FROM {table}
+                WHERE {column} IS NOT NULL
+                GROUP BY name
+                ORDER BY MIN(id);
+            """)
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {key} INTEGER REFERENCES {lookup}({key});")
+            conn.execute(f"""
+                UPDATE {table}
+                SET {key} = (SELECT {key} FROM {lookup} WHERE name = UPPER(TRIM({table}.{column})));
+            """)
+            conn.execute(f"ALTER TABLE {table} DROP COLUMN {column};")
+        conn.commit()
+
+        elapsed = time.perf_counter() - start
+        print(f"[step1] Replaced queue/status text in {table} by lookup codes in {elapsed:.3f} s")
+
+
+def encode_labels(conn, df):
+    """
+    Returns df with the queue / status columns replaced by queue_id /
+    status_id, adding names seen for the first time to the lookup tables.
+    """
+    for column, (lookup, key) in LABEL_LOOKUPS.items():
+        names = df[column].dropna().unique().tolist()
+        conn.executemany(f"INSERT OR IGNORE INTO {lookup} (name) VALUES (?);", [(n,) for n in names])
+        codes = dict(conn.execute(f"SELECT name, {key} FROM {lookup};").fetchall())
+        df[key] = df[column].map(codes).astype("Int64")
+    return df.drop(columns=list(LABEL_LOOKUPS))
+
+
+def create_indexes(conn):
+    """
+    Creates the unique row_hash indexes. Every load inserts with INSERT OR
+    IGNORE while they exist, so a row already stored, by this run or an
+    earlier one, costs one index probe and is skipped; no dedup pass over
+    the loaded frames is needed.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_daily_status_row_hash
+        ON daily_status (row_hash);
+    """)
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_monthly_status_row_hash
+        ON monthly_status (row_hash);
+    """)
     conn.commit()
 
 
+# -----------------------------------------------------------
+# Ingestion manifest
+# -----------------------------------------------------------
+
+def hash_file(path, block_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def select_files_to_load(conn, paths, incremental):
+    """
+    Returns [(path, content_hash)] for the files that must be (re)loaded.
+
+    In full mode every file is returned. In incremental mode a file is
+    skipped when the manifest has the same size and mtime, or when its
+    content hash is unchanged (e.g. the file was only touched).
+    """
+    manifest = {}
+    if incremental:
+        rows = conn.execute(
+            "SELECT file_name, size_bytes, mtime, content_hash FROM ingested_files;"
+        ).fetchall()
+        manifest = {r[0]: (r[1], r[2], r[3]) for r in rows}
+
+    selected = []
+    for path in paths:
+        st = path.stat()
+        known = manifest.get(path.name)
+
+        if known and known[0] == st.st_size and known[1] == st.st_mtime:
+            continue
+
+        content_hash = hash_file(path)
+        if known and known[2] == content_hash:
+            # Same content, new mtime: remember it so the next run skips the hash
+            conn.execute(
+                "UPDATE ingested_files SET mtime = ? WHERE file_name = ?;",
+                (st.st_mtime, path.name)
+            )
+            continue
+
+        selected.append((path, content_hash))
+
+    conn.commit()
+    return selected
+
+
+def record_ingested_files(conn, kind, loaded):
+    """
+    Stores manifest rows for loaded files.
+    loaded: [(path, content_hash, rows_loaded)]
+    """
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    records = []
+    for path, content_hash, rows in loaded:
+        st = path.stat()
+        records.append((path.name, kind, st.st_size, st.st_mtime, content_hash, rows, now))
+
+    conn.executemany("""
+        INSERT OR REPLACE INTO ingested_files (
+            file_name, kind, size_bytes, mtime, content_hash, rows_loaded, ingested_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?);
+    """, records)
+    conn.commit()
+
+
+def parse_files(parse_fn, paths, workers=1):
+    """
+    Applies parse_fn to every path and returns the DataFrames in path order.
+
+    With workers > 1 the files are parsed and validated in a process pool,
+    so only concatenation and inserts are left to the main process. Results
+    keep the input order, so the loaded tables are the same as a serial run.
+    """
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+
+    if workers == 1 or len(paths) < 2:
+        return [parse_fn(path) for path in paths]
+
+    # Several files per task keep the pickling overhead low for small files
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        return list(pool.map(parse_fn, paths, chunksize=chunksize))
+
+
 # -----------------------------------------------------------
 # Load ACCOUNTS
 # -----------------------------------------------------------
 
-def load_accounts(conn):
+def load_accounts(conn, incremental=False):
     accounts_path = DATA_DIR / "accounts.csv"
     if not accounts_path.exists():
         raise FileNotFoundError(f"[step1] accounts.csv not found: {accounts_path}")
 
+    to_load = select_files_to_load(conn, [accounts_path], incremental)
+    if not to_load:
+        print("[step1] accounts.csv unchanged since last run. Skipping.")
+        return
+    _, content_hash = to_load[0]
+
     df = pd.read_csv(accounts_path)
 
     # Validate required columns
@@ -74,7 +411,20 @@ def load_accounts(conn):
         print("[step1] Warning: duplicate account_id rows detected. Deduplicating.")
         df = df.drop_duplicates(subset=["account_id"], keep="first")
 
-    df.to_sql("accounts", conn, if_exists="append", index=False)
+    # Newer file content wins for accounts that already exist (incremental)
+    bulk_insert(
+        conn, "accounts", df,
+        columns=["account_id", "name", "address"],
+        on_conflict=(
+            "ON CONFLICT(account_id) DO UPDATE SET "
+            "name = excluded.name, address = excluded.address"
+        ) if incremental else None,
+        label="step1",
+    )
+
+    record_ingested_files(conn, "accounts", [(accounts_path, content_hash, len(df))])
+    # Account names/addresses are served from caches too (service/read_api.py)
+    bump_data_version(conn)
     print(f"[step1] Loaded {len(df)} rows into accounts")
 
 
@@ -82,125 +432,186 @@ def load_accounts(conn):
 # Load DAILY STATUS
 # -----------------------------------------------------------
 
-def load_daily_status(conn):
-    daily_files = sorted(DATA_DIR.glob("daily_*.csv"))
+def normalize_daily_frame(df, path):
+    """Validates and normalises rows read from a daily_*.csv file."""
+    expected_cols = {"account", "queue", "status", "changed_datetime"}
+    missing = expected_cols - set(df.columns)
+    if missing:
+        raise ValueError(f"[step1] Missing columns in {path.name}: {missing}")
+
+    # Detect the layout once per file, parse the column with it and fall
+    # back to per-value parsing only for the rows it does not match
+    fmt = cached_datetime_format(format_cache_key(path), df["changed_datetime"])
+    df["changed_datetime"] = normalize_datetimes(df["changed_datetime"], fmt)
+
+    # Report invalid datetimes
+    if df["changed_datetime"].isna().any():
+        bad = df[df["changed_datetime"].isna()]
+        print(f"[step1] Warning: invalid changed_datetime rows in {path.name}:")
+        print(bad)
+        # Drop invalid rows instead of inserting corrupt data
+        df = df.dropna(subset=["changed_datetime"])
+
+    for column in LABEL_LOOKUPS:
+        df[column] = normalize_labels(df[column])
+
+    # Duplicates are skipped on insert by the row_hash index
+    df["row_hash"] = row_hashes(df, ROW_KEY_COLUMNS["daily_status"])
+
+    return df
+
+
+def parse_daily_file(path):
+    """Reads, validates and normalises one daily_*.csv file."""
+    return normalize_daily_frame(pd.read_csv(path), path)
+
+
+def stream_files(conn, table, to_load, normalize_fn, chunksize):
+    """
+    Reads each file in chunks of `chunksize` rows, normalises every chunk and
+    writes it straight away with INSERT OR IGNORE, so memory stays bounded
+    by one chunk.
+    Returns (loaded, inserted) with loaded = [(path, content_hash, rows)].
+    """
+    loaded = []
+    inserted = 0
+    start = time.perf_counter()
+
+    for path, content_hash in to_load:
+        rows = 0
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            chunk = normalize_fn(chunk, path)
+            rows += len(chunk)
+            inserted += bulk_insert(
+                conn, table, encode_labels(conn, chunk), or_ignore=True, report=False
+            )
+        loaded.append((path, content_hash, rows))
+
+    elapsed = time.perf_counter() - start
+    rate = inserted / elapsed if elapsed > 0 else float("inf")
+    print(f"[step1] {table}: streamed {inserted} rows in {elapsed:.3f} s ({rate:,.0f} rows/s)")
+    return loaded, inserted
+
+
+def load_daily_status(conn, incremental=False, workers=1, streaming=False, chunksize=100_000,
+                      files=None):
+    """Loads daily_*.csv files (`files`: only these paths, default every file in DATA_DIR)."""
+    daily_files = sorted(DATA_DIR.glob("daily_*.csv") if files is None else files)
 
     if not daily_files:
         print("[step1] No daily_*.csv files found.")
         return
 
-    frames = []
+    to_load = select_files_to_load(conn, daily_files, incremental)
+    if not to_load:
+        print("[step1] No new or changed daily files.")
+        return
 
-    for path in daily_files:
-        df = pd.read_csv(path)
+    if streaming:
+        loaded, inserted = stream_files(
+            conn, "daily_status", to_load, normalize_daily_frame, chunksize
+        )
+        record_ingested_files(conn, "daily", loaded)
+        print(f"[step1] Loaded {inserted} rows into daily_status from {len(loaded)} file(s)")
+        return
 
-        expected_cols = {"account", "queue", "status", "changed_datetime"}
-        missing = expected_cols - set(df.columns)
-        if missing:
-            raise ValueError(f"[step1] Missing columns in {path.name}: {missing}")
+    paths = [path for path, _ in to_load]
+    frames = parse_files(parse_daily_file, paths, workers)
+    loaded = [
+        (path, content_hash, len(df))
+        for (path, content_hash), df in zip(to_load, frames)
+    ]
 
-        raw = df["changed_datetime"].astype(str)
+    full_df = pd.concat(frames, ignore_index=True)
 
-        # ISO-like: 2025-10-20 00:01:10 (YYYY-MM-DD HH:MM:SS)
-        iso_mask = raw.str.match(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
+    # Rows seen earlier in this load or in earlier runs are skipped by the
+    # row_hash index
+    inserted = bulk_insert(
+        conn, "daily_status", encode_labels(conn, full_df), or_ignore=True, label="step1"
+    )
 
-        # Parse DD/MM/YYYY HH:MM:SS (and similar) with dayfirst=True
-        dt_dayfirst = pd.to_datetime(
-            raw.where(~iso_mask),
-            errors="coerce",
-            dayfirst=True
-        )
+    record_ingested_files(conn, "daily", loaded)
+    print(f"[step1] Loaded {inserted} rows into daily_status from {len(loaded)} file(s)")
 
-        # Parse ISO strings with an explicit format
-        dt_iso = pd.to_datetime(
-            raw.where(iso_mask),
-            errors="coerce",
-            format="%Y-%m-%d %H:%M:%S"
-        )
 
-        # Combine both
-        df["changed_datetime"] = dt_dayfirst.fillna(dt_iso)
+# -----------------------------------------------------------
+# Load MONTHLY STATUS
+# -----------------------------------------------------------
+def normalize_monthly_frame(df, path):
+    """Validates and normalises rows read from a monthly_*.csv file."""
+    expected_cols = {"account", "queue", "status", "month", "day"}
+    missing = expected_cols - set(df.columns)
+    if missing:
+        raise ValueError(f"[step1] Missing columns in {path.name}: {missing}")
 
+    # Extract year from file name: monthly_YYYYMM*.csv
+    fname = path.name
+    try:
+        year = int(fname.split("_")[1][:4])
+    except Exception:
+        raise ValueError(f"[step1] Cannot extract year from filename: {fname}")
+
+    # Ensure numeric month/day
+    df["month"] = pd.to_numeric(df["month"], errors="coerce")
+    df["day"] = pd.to_numeric(df["day"], errors="coerce")
+
+    # Drop rows where month/day are invalid
+    before = len(df)
+    df = df.dropna(subset=["month", "day"])
+    after = len(df)
+    if after < before:
+        print(f"[step1] Dropped {before - after} rows with invalid month/day in {path.name}")
 
-        # Report invalid datetimes
-        if df["changed_datetime"].isna().any():
-            bad = df[df["changed_datetime"].isna()]
-            print(f"[step1] Warning: invalid changed_datetime rows in {path.name}:")
-            print(bad)
-            # Drop invalid rows instead of inserting corrupt data
-            df = df.dropna(subset=["changed_datetime"])
+    df["month"] = df["month"].astype(int)
+    df["day"] = df["day"].astype(int)
 
-        # Convert to ISO
-        df["changed_datetime"] = df["changed_datetime"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    # Set year column for all remaining rows
+    df["year"] = year
 
-        # Remove fully duplicated rows
-        df = df.drop_duplicates()
+    # Build snapshot_date as YYYY-MM-DD
+    df["snapshot_date"] = build_snapshot_dates(df["year"], df["month"], df["day"])
 
-        frames.append(df)
+    for column in LABEL_LOOKUPS:
+        df[column] = normalize_labels(df[column])
 
-    full_df = pd.concat(frames, ignore_index=True)
+    # Duplicates are skipped on insert by the row_hash index
+    df["row_hash"] = row_hashes(df, ROW_KEY_COLUMNS["monthly_status"])
 
-    # Final deduplication across all daily files
-    full_df = full_df.drop_duplicates(subset=["account", "queue", "status", "changed_datetime"])
+    return df
 
-    full_df.to_sql("daily_status", conn, if_exists="append", index=False)
-    print(f"[step1] Loaded {len(full_df)} rows into daily_status")
 
+def parse_monthly_file(path):
+    """Reads, validates and normalises one monthly_*.csv file."""
+    return normalize_monthly_frame(pd.read_csv(path), path)
 
-# -----------------------------------------------------------
-# Load MONTHLY STATUS
-# -----------------------------------------------------------
-def load_monthly_status(conn):
-    monthly_files = sorted(DATA_DIR.glob("monthly_*.csv"))
+
+def load_monthly_status(conn, incremental=False, workers=1, streaming=False, chunksize=100_000,
+                        files=None):
+    """Loads monthly_*.csv files (`files`: only these paths, default every file in DATA_DIR)."""
+    monthly_files = sorted(DATA_DIR.glob("monthly_*.csv") if files is None else files)
     if not monthly_files:
         print("[step1] No monthly_*.csv files found")
         return
 
-    frames = []
-    for path in monthly_files:
-        df = pd.read_csv(path)
-
-        expected_cols = {"account", "queue", "status", "month", "day"}
-        missing = expected_cols - set(df.columns)
-        if missing:
-            raise ValueError(f"[step1] Missing columns in {path.name}: {missing}")
-
-        # Extract year from file name: monthly_YYYYMM*.csv
-        fname = path.name
-        try:
-            year = int(fname.split("_")[1][:4])
-        except Exception:
-            raise ValueError(f"[step1] Cannot extract year from filename: {fname}")
-
-        # Ensure numeric month/day
-        df["month"] = pd.to_numeric(df["month"], errors="coerce")
-        df["day"] = pd.to_numeric(df["day"], errors="coerce")
-
-        # Drop rows where month/day are invalid
-        before = len(df)
-        df = df.dropna(subset=["month", "day"])
-        after = len(df)
-        if after < before:
-            print(f"[step1] Dropped {before - after} rows with invalid month/day in {path.name}")
-
-        df["month"] = df["month"].astype(int)
-        df["day"] = df["day"].astype(int)
-
-        # Set year column for all remaining rows
-        df["year"] = year
-
-        # Build snapshot_date as YYYY-MM-DD
-        df["snapshot_date"] = df.apply(
-            lambda r: f"{int(r['year']):04d}-{int(r['month']):02d}-{int(r['day']):02d}",
-            axis=1
-        )
+    to_load = select_files_to_load(conn, monthly_files, incremental)
+    if not to_load:
+        print("[step1] No new or changed monthly files.")
+        return
 
-        # Deduplicate per file
-        df = df.drop_duplicates(
-            subset=["account", "queue", "status", "year", "month", "day"]
+    if streaming:
+        loaded, inserted = stream_files(
+            conn, "monthly_status", to_load, normalize_monthly_frame, chunksize
         )
+        record_ingested_files(conn, "monthly", loaded)
+        print(f"[step1] Loaded {inserted} rows into monthly_status from {len(loaded)} file(s)")
+        return
 
-        frames.append(df)
+    paths = [path for path, _ in to_load]
+    frames = parse_files(parse_monthly_file, paths, workers)
+    loaded = [
+        (path, content_hash, len(df))
+        for (path, content_hash), df in zip(to_load, frames)
+    ]
 
     full_df = pd.concat(frames, ignore_index=True)
 
@@ -216,37 +627,241 @@ def load_monthly_status(conn):
     full_df["month"] = full_df["month"].astype(int)
     full_df["day"] = full_df["day"].astype(int)
 
-    # Deduplicate across all files
-    full_df = full_df.drop_duplicates(
-        subset=["account", "queue", "status", "year", "month", "day"]
+    inserted = bulk_insert(
+        conn, "monthly_status", encode_labels(conn, full_df), or_ignore=True, label="step1"
     )
 
-    full_df.to_sql("monthly_status", conn, if_exists="append", index=False)
-    print(f"[step1] Loaded {len(full_df)} rows into monthly_status")
+    record_ingested_files(conn, "monthly", loaded)
+    print(f"[step1] Loaded {inserted} rows into monthly_status from {len(loaded)} file(s)")
 
 
 # -----------------------------------------------------------
-# Run Step 1
+# Staged loading (accounts, daily and monthly concurrently)
 # -----------------------------------------------------------
 
-def run():
-    """Executes Step 1: schema creation + data loading + validation."""
-    print(f"[step1] Using database: {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
+STAGED_SOURCES = ("accounts", "daily", "monthly")
+
+
+def stage_source(kind, staging_path, incremental=False, workers=1, streaming=False,
+                 chunksize=100_000):
+    """
+    Worker process: loads one source (accounts, daily or monthly) into its
+    own staging database with the regular loaders, so the three sources do
+    not wait for each other or share a connection.
 
+    In incremental mode the source's manifest rows are copied from data.db
+    first, so the same files are skipped as in a serial run.
+    """
+    conn = sqlite3.connect(staging_path)
     try:
-        print("[step1] Creating tables...")
-        create_tables(conn)
+        create_tables(conn, drop_existing=True)
+
+        if incremental:
+            conn.execute("ATTACH DATABASE ? AS live;", (str(DB_PATH),))
+            conn.execute("""
+                INSERT INTO ingested_files
+                SELECT * FROM live.ingested_files WHERE kind = ?;
+            """, (kind,))
+            conn.commit()
+            conn.execute("DETACH DATABASE live;")
+
+        with bulk_load_session(conn):
+            create_indexes(conn)
+
+            if kind == "accounts":
+                load_accounts(conn, incremental=incremental)
+            elif kind == "daily":
+                load_daily_status(conn, incremental=incremental, workers=workers,
+                                  streaming=streaming, chunksize=chunksize)
+            else:
+                load_monthly_status(conn, incremental=incremental, workers=workers,
+                                    streaming=streaming, chunksize=chunksize)
+    finally:
+        conn.close()
+    return staging_path
+
+
+def _merge_status_sql(kind, table, columns):
+    """
+    Statements copying a staging status table into data.db. Each staging
+    database numbers queues and statuses on its own, so names new to
+    data.db are added first and the codes are translated by name.
+    """
+    statements = []
+    codes = []
+    joins = []
+    for lookup, key in LABEL_LOOKUPS.values():
+        statements.append(f"""
+            INSERT OR IGNORE INTO main.{lookup} (name)
+            SELECT name FROM stage_{kind}.{lookup} ORDER BY {key};
+        """)
+        codes.append(f"main_{lookup}.{key}")
+        joins.append(f"""
+            LEFT JOIN stage_{kind}.{lookup} stage_{lookup} ON stage_{lookup}.{key} = r.{key}
+            LEFT JOIN main.{lookup} main_{lookup} ON main_{lookup}.name = stage_{lookup}.name
+        """)
+
+    keys = [key for _, key in LABEL_LOOKUPS.values()]
+    statements.append(f"""
+        INSERT OR IGNORE INTO main.{table} ({", ".join(keys + columns)})
+        SELECT {", ".join(codes + [f"r.{c}" for c in columns])}
+        FROM stage_{kind}.{table} r
+        {"".join(joins)}
+        ORDER BY r.id;
+    """)
+    return statements
 
-        print("[step1] Loading accounts...")
-        load_accounts(conn)
 
-        print("[step1] Loading daily_status...")
-        load_daily_status(conn)
+def merge_staging(conn, staged, incremental=False):
+    """
+    Copies the staging databases into data.db with ATTACH + INSERT ... SELECT
+    in a single transaction (all sources or none). staged: {kind: path}.
 
-        print("[step1] Loading monthly_status...")
-        load_monthly_status(conn)
+    Rows keep their staging order, so ids match a serial load; queue and
+    status codes are translated by name; rows already stored are skipped
+    through the row_hash indexes and, in incremental mode, accounts are
+    upserted, as in load_accounts. data_version is bumped in data.db when
+    accounts were merged; new daily/monthly rows bump it through
+    refresh_events, as in a serial run.
+    """
+    start = time.perf_counter()
 
-        print("[step1] Step 1 completed successfully.")
+    conn.commit()
+    for kind, path in staged.items():
+        conn.execute(f"ATTACH DATABASE ? AS stage_{kind};", (str(path),))
+
+    before = conn.total_changes
+    conn.execute("BEGIN;")
+    try:
+        accounts_merged = conn.execute(f"""
+            INSERT INTO accounts (account_id, name, address)
+            SELECT account_id, name, address
+            FROM stage_accounts.accounts
+            WHERE true
+            {"ON CONFLICT(account_id) DO UPDATE SET "
+             "name = excluded.name, address = excluded.address" if incremental else ""};
+        """).rowcount
+        for kind, table, columns in (
+            ("daily", "daily_status", ["account", "changed_datetime", "row_hash"]),
+            ("monthly", "monthly_status",
+             ["account", "month", "day", "year", "snapshot_date", "row_hash"]),
+        ):
+            for sql in _merge_status_sql(kind, table, columns):
+                conn.execute(sql)
+        for kind in staged:
+            conn.execute(f"""
+                INSERT OR REPLACE INTO ingested_files
+                SELECT * FROM stage_{kind}.ingested_files;
+            """)
+        if accounts_merged:
+            # As load_accounts does in a serial run (it bumped the staging copy)
+            bump_data_version(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
     finally:
-        conn.close()
+        for kind in staged:
+            conn.execute(f"DETACH DATABASE stage_{kind};")
+
+    elapsed = time.perf_counter() - start
+    print(f"[step1] Merged staging databases: {conn.total_changes - before} rows in {elapsed:.3f} s")
+
+
+def load_staged(conn, incremental=False, workers=1, streaming=False, chunksize=100_000):
+    """
+    Loads accounts, daily and monthly files concurrently, one worker process
+    and staging database each (next to data.db), then merges them. Total
+    time is close to the slowest source instead of the sum of all three.
+    """
+    staging_dir = DB_PATH.parent / f"{DB_PATH.stem}_staging"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    staging_dir.mkdir(parents=True)
+
+    try:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=len(STAGED_SOURCES)) as pool:
+            futures = {
+                kind: pool.submit(
+                    stage_source, kind, staging_dir / f"{kind}.db",
+                    incremental, workers, streaming, chunksize
+                )
+                for kind in STAGED_SOURCES
+            }
+            staged = {kind: future.result() for kind, future in futures.items()}
+        print(f"[step1] Staged all sources in {time.perf_counter() - start:.3f} s")
+
+        merge_staging(conn, staged, incremental=incremental)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+# -----------------------------------------------------------
+# Run Step 1
+# -----------------------------------------------------------
+
+def run(incremental=False, workers=1, streaming=False, chunksize=100_000, staged=False,
+        conn=None):
+    """
+    Executes Step 1: schema creation + data loading + validation.
+
+    incremental=False drops and reloads everything.
+    incremental=True keeps existing rows and only loads files that are new
+    or changed according to the ingested_files manifest.
+    workers > 1 parses daily/monthly files in a process pool (0 = all cores).
+    streaming=True reads files in chunks of `chunksize` rows and writes each
+    chunk immediately (bounded memory).
+    Duplicate rows, within the files or against stored rows, are skipped on
+    insert by the unique row_hash indexes.
+    staged=True loads the three sources concurrently into staging databases
+    and merges them (see load_staged).
+    conn: work on this connection (left open) instead of opening DB_PATH.
+
+    Newly loaded rows are then appended to the typed events table.
+    """
+    print(f"[step1] Using database: {DB_PATH}")
+    with step_connection(conn) as conn:
+        if incremental:
+            print("[step1] Incremental mode: keeping existing rows...")
+        else:
+            print("[step1] Creating tables...")
+        create_tables(conn, drop_existing=not incremental)
+        create_events_table(conn, drop_existing=not incremental)
+
+        # Streaming keeps the page cache small as well, so RSS stays flat
+        overrides = {"cache_size": -STREAMING_CACHE_KIB} if streaming else {}
+
+        with bulk_load_session(conn, **overrides):
+            # Dedup happens on insert, so the unique indexes come first
+            create_indexes(conn)
+
+            if staged:
+                print("[step1] Loading accounts, daily_status and monthly_status concurrently...")
+                load_staged(
+                    conn, incremental=incremental, workers=workers,
+                    streaming=streaming, chunksize=chunksize
+                )
+            else:
+                print("[step1] Loading accounts...")
+                load_accounts(conn, incremental=incremental)
+
+                print("[step1] Loading daily_status...")
+                load_daily_status(
+                    conn, incremental=incremental, workers=workers,
+                    streaming=streaming, chunksize=chunksize
+                )
+
+                print("[step1] Loading monthly_status...")
+                load_monthly_status(
+                    conn, incremental=incremental, workers=workers,
+                    streaming=streaming, chunksize=chunksize
+                )
+
+            print("[step1] Updating events...")
+            refresh_events(conn)
+            create_events_indexes(conn)
+
+            print("[step1] Updating account_activity...")
+            update_account_activity(conn)
+
+        print("[step1] Step 1 completed successfully.")
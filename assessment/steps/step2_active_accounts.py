@@ -1,11 +1,21 @@
 # steps/step2_active_accounts.py
 
-import sqlite3
+from .activity import require_account_activity, update_account_activity
 from .config import DB_PATH
+from .db import step_connection
 
 # Starting point required by the spec
 START_DATE = "2025-01-01"
 
+# Accounts with a daily change on or after the start date (parameter:
+# START_DATE), answered from the per-account summary (steps/activity.py):
+# the latest change is on or after the start date
+ACTIVE_ACCOUNTS_SQL = """
+    SELECT account AS account_id
+    FROM account_activity
+    WHERE last_change >= ? || ' 00:00:00'
+"""
+
 
 def create_active_accounts_table(conn):
     """
@@ -18,7 +28,13 @@ def create_active_accounts_table(conn):
     Daily updates are the canonical source of actual changes with precise timestamps.
     Monthly snapshots are derived state and are used later for state reconstruction,
     not for detecting new activity.
+
+    Reads account_activity (one row per account with its last daily change)
+    instead of scanning daily_status; run() brings it up to date first,
+    and a missing summary raises instead of being scanned around. Shards
+    get a copy taken right after that update.
     """
+    require_account_activity(conn, current=False)
     cur = conn.cursor()
 
     # Drop if rerunning
@@ -30,14 +46,10 @@ def create_active_accounts_table(conn):
         );
     """)
 
-    sql = """
+    cur.execute(f"""
     INSERT INTO active_accounts (account_id)
-    SELECT DISTINCT account AS account_id
-    FROM daily_status
-    WHERE changed_datetime >= ? || ' 00:00:00';
-    """
-
-    cur.execute(sql, (START_DATE,))
+    {ACTIVE_ACCOUNTS_SQL};
+    """, (START_DATE,))
     conn.commit()
 
     count = cur.execute("SELECT COUNT(*) FROM active_accounts;").fetchone()[0]
@@ -63,20 +75,18 @@ def debug_sample(conn, limit=10):
         print(f"  account_id={r[0]}, name={r[1]}")
 
 
-def run():
+def run(conn=None):
     """
     Executes Step 2:
       - identifies accounts with activity on or after START_DATE
       - persists them in active_accounts
     """
     print(f"[step2] Using database: {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
+    with step_connection(conn) as conn:
+        update_account_activity(conn)
 
-    try:
         print("[step2] Creating and populating active_accounts...")
         create_active_accounts_table(conn)
 
         debug_sample(conn)
         print("[step2] Step 2 completed successfully.")
-    finally:
-        conn.close()
@@ -1,124 +1,184 @@
 # steps/step3_latest_collections_legal.py
 
-import sqlite3
+import json
+from .columnar_cache import cached_events
 from .config import DB_PATH
+from .db import step_connection
+from .meta import get_meta, set_meta
+from .numpy_engine import latest_status_rows, load_events
+from .result_cache import ResultCache
+from .state import REFERENCE_DATETIME, TARGET_QUEUES, latest_status_sql, to_epoch
 
-# Reference date for "as of Nov 27th"
-REFERENCE_DATETIME = "2025-11-27 23:59:59"
+# "sqlite": index seeks per account; "numpy": sorted arrays in memory
+# (steps/numpy_engine.py). Both produce the same rows.
+ENGINES = ("sqlite", "numpy")
 
-TARGET_QUEUES = ["COLLECTIONS", "LEGAL"]
+# pipeline_meta keys: what the table was last computed from
+WATERMARK_KEY = "step3_last_event_id"
+GENERATION_KEY = "step3_events_generation"
+PARAMS_KEY = "step3_params"
+BUILD_KEY = "step3_build"
 
 
-def create_latest_status_table(conn):
+def _params_text(reference_datetime, target_queues):
+    return json.dumps([reference_datetime, [q.upper() for q in target_queues]])
+
+
+def record_state(conn, last_event_id, reference_datetime, target_queues):
+    set_meta(conn, WATERMARK_KEY, last_event_id)
+    set_meta(conn, GENERATION_KEY, get_meta(conn, "events_generation"))
+    set_meta(conn, PARAMS_KEY, _params_text(reference_datetime, target_queues))
+
+
+def create_latest_status_table(conn, reference_datetime=REFERENCE_DATETIME,
+                               target_queues=TARGET_QUEUES, engine="sqlite",
+                               use_result_cache=False):
     """
-    Step 3:
-      - determine which accounts are in target queues (COLLECTIONS / LEGAL)
-        as of REFERENCE_DATETIME
-      - for those accounts, find their most recent queue/status change,
-        considering both daily updates and monthly snapshots.
+    Rebuilds latest_status_collections_legal for every account with events
+    and records what it was computed from, so that update_latest_status_table
+    can maintain it incrementally afterwards.
+
+    engine="numpy" computes the rows in memory instead of in SQL, from the
+    columnar cache (steps/columnar_cache.py) when it is up to date.
+    use_result_cache=True reads the SQL engine's rows through the
+    query_cache (steps/result_cache.py), so going back to a reference
+    datetime / queue list already computed on the same data skips the query.
     """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown step3 engine {engine!r}, expected one of {ENGINES}")
+
+    cached_rows = None
+    if use_result_cache and engine == "sqlite":
+        cache = ResultCache(conn)
+        cached_rows = cache.get("latest_status", reference_datetime, target_queues)
+        source = "hit" if cache.stats["miss"] == 0 else "miss, stored"
+        print(f"[step3] Result cache {source}: {len(cached_rows)} rows")
+
     cur = conn.cursor()
 
     # Drop if rerunning
     cur.execute("DROP TABLE IF EXISTS latest_status_collections_legal;")
 
-    sql = f"""
-    WITH all_events AS (
-        -- Daily events
-        SELECT
-            account,
-            queue,
-            status,
-            changed_datetime AS event_datetime,
-            'DAILY' AS source
-        FROM daily_status
-
-        UNION ALL
-
-        -- Monthly snapshots - use snapshot_date as event datetime at midnight
-        SELECT
-            account,
-            queue,
-            status,
-            snapshot_date || ' 00:00:00' AS event_datetime,
-            'MONTHLY' AS source
-        FROM monthly_status
-    ),
-    events_parsed AS (
-        SELECT
-            account,
-            queue,
-            status,
-            datetime(event_datetime) AS event_dt
-        FROM all_events
-        WHERE event_datetime IS NOT NULL
-    ),
-
-    -- State of each account as of the reference datetime
-    state_as_of_ref AS (
-        SELECT
-            account,
-            queue,
-            status,
-            event_dt,
-            ROW_NUMBER() OVER (
-                PARTITION BY account
-                ORDER BY event_dt DESC
-            ) AS rn
-        FROM events_parsed
-        WHERE event_dt <= datetime(?)
-    ),
-
-    -- Accounts that are in target queues at the reference datetime
-    target_accounts AS (
-        SELECT
-            account
-        FROM state_as_of_ref
-        WHERE rn = 1
-          AND UPPER(queue) IN ({",".join(["?" for _ in TARGET_QUEUES])})
-    ),
-
-    -- For those accounts, find their latest change (overall)
-    latest_changes AS (
-        SELECT
-            e.account,
-            e.queue,
-            e.status,
-            e.event_dt,
-            ROW_NUMBER() OVER (
-                PARTITION BY e.account
-                ORDER BY e.event_dt DESC
-            ) AS rn
-        FROM events_parsed e
-        JOIN target_accounts t
-            ON t.account = e.account
+    cur.execute("""
+        CREATE TABLE latest_status_collections_legal (
+            account_id INTEGER PRIMARY KEY,
+            queue TEXT,
+            status TEXT,
+            latest_update_datetime TEXT
+        );
+    """)
+
+    last_event_id = cur.execute("SELECT COALESCE(MAX(event_id), 0) FROM events;").fetchone()[0]
+
+    if cached_rows is not None:
+        cur.executemany("""
+            INSERT INTO latest_status_collections_legal (
+                account_id, queue, status, latest_update_datetime
+            )
+            VALUES (?, ?, ?, ?);
+        """, cached_rows)
+    elif engine == "numpy":
+        # The mapped columnar cache when it is up to date, else read events
+        ev = cached_events(conn)
+        if ev is None:
+            ev = load_events(conn)
+        else:
+            print("[step3] Using the columnar events cache")
+        rows = latest_status_rows(ev, reference_datetime, target_queues)
+        cur.executemany("""
+            INSERT INTO latest_status_collections_legal (
+                account_id, queue, status, latest_update_datetime
+            )
+            VALUES (?, ?, ?, ?);
+        """, rows)
+    else:
+        sql, queue_params = latest_status_sql("event_accounts", target_queues)
+        cur.execute(f"""
+            INSERT INTO latest_status_collections_legal (
+                account_id, queue, status, latest_update_datetime
+            )
+            {sql};
+        """, {"ts": to_epoch(reference_datetime), **queue_params})
+
+    record_state(conn, last_event_id, reference_datetime, target_queues)
+    set_meta(conn, BUILD_KEY, int(get_meta(conn, BUILD_KEY, 0)) + 1)
+    conn.commit()
+
+    count = cur.execute("""
+        SELECT COUNT(*) FROM latest_status_collections_legal;
+    """).fetchone()[0]
+
+    print(
+        "[step3] Accounts in target queues as of "
+        f"{reference_datetime} with a latest change: {count}"
     )
 
-    SELECT
-        account AS account_id,
-        queue,
-        status,
-        event_dt AS latest_update_datetime
-    FROM latest_changes
-    WHERE rn = 1;
+
+def update_latest_status_table(conn, reference_datetime=REFERENCE_DATETIME,
+                               target_queues=TARGET_QUEUES, engine="sqlite",
+                               use_result_cache=False):
     """
+    Incremental step 3: only the accounts with events above the stored
+    event_id watermark are recomputed; their rows are deleted and inserted
+    again if they are (still) in a target queue. The cost follows the
+    number of new events, not the size of the book.
+
+    Falls back to create_latest_status_table when the table does not exist
+    yet, events was rebuilt, or the reference datetime / queues changed
+    (engine and use_result_cache are only used for that rebuild).
+    """
+    cur = conn.cursor()
+
+    exists = cur.execute("""
+        SELECT 1 FROM sqlite_master
+        WHERE type = 'table' AND name = 'latest_status_collections_legal';
+    """).fetchone()
+    if (
+        not exists
+        or get_meta(conn, GENERATION_KEY) != get_meta(conn, "events_generation")
+        or get_meta(conn, PARAMS_KEY) != _params_text(reference_datetime, target_queues)
+    ):
+        print("[step3] No reusable previous result, rebuilding...")
+        create_latest_status_table(
+            conn, reference_datetime, target_queues, engine, use_result_cache
+        )
+        return
+
+    watermark = int(get_meta(conn, WATERMARK_KEY, 0))
+    last_event_id = cur.execute("SELECT COALESCE(MAX(event_id), 0) FROM events;").fetchone()[0]
+
+    cur.execute("CREATE TEMP TABLE IF NOT EXISTS step3_accounts (account INTEGER PRIMARY KEY);")
+    cur.execute("DELETE FROM step3_accounts;")
+    cur.execute("""
+        INSERT INTO step3_accounts (account)
+        SELECT DISTINCT account FROM events WHERE event_id > ?;
+    """, (watermark,))
+    affected = cur.execute("SELECT COUNT(*) FROM step3_accounts;").fetchone()[0]
+
+    before = cur.execute("SELECT COUNT(*) FROM latest_status_collections_legal;").fetchone()[0]
 
-    params = [REFERENCE_DATETIME] + [q.upper() for q in TARGET_QUEUES]
+    cur.execute("""
+        DELETE FROM latest_status_collections_legal
+        WHERE account_id IN (SELECT account FROM step3_accounts);
+    """)
+    removed = cur.rowcount
 
+    sql, queue_params = latest_status_sql("temp.step3_accounts", target_queues)
     cur.execute(f"""
-        CREATE TABLE latest_status_collections_legal AS
-        {sql}
-    """, params)
+        INSERT INTO latest_status_collections_legal (
+            account_id, queue, status, latest_update_datetime
+        )
+        {sql};
+    """, {"ts": to_epoch(reference_datetime), **queue_params})
+    inserted = cur.rowcount
 
+    record_state(conn, last_event_id, reference_datetime, target_queues)
     conn.commit()
 
-    count = cur.execute("""
-        SELECT COUNT(*) FROM latest_status_collections_legal;
-    """).fetchone()[0]
-
     print(
-        "[step3] Accounts in target queues as of "
-        f"{REFERENCE_DATETIME} with a latest change: {count}"
+        f"[step3] Incremental update: {affected} affected accounts, "
+        f"{removed} rows replaced/removed, {inserted} rows written "
+        f"({before} -> {before - removed + inserted} rows)"
     )
 
 
@@ -139,15 +199,19 @@ def debug_sample(conn, limit=10):
         )
 
 
-def run():
+def run(reference_datetime=REFERENCE_DATETIME, target_queues=TARGET_QUEUES,
+        incremental=False, engine="sqlite", use_result_cache=False, conn=None):
     print(f"[step3] Using database: {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
-
-    try:
+    with step_connection(conn) as conn:
         print("[step3] Computing latest changes for accounts "
-              "in COLLECTIONS or LEGAL as of reference date...")
-        create_latest_status_table(conn)
+              f"in {' or '.join(target_queues)} as of {reference_datetime}...")
+        if incremental:
+            update_latest_status_table(
+                conn, reference_datetime, target_queues, engine, use_result_cache
+            )
+        else:
+            create_latest_status_table(
+                conn, reference_datetime, target_queues, engine, use_result_cache
+            )
         debug_sample(conn)
         print("[step3] Step 3 completed successfully.")
-    finally:
-        conn.close()
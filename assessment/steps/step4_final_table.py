@@ -1,6 +1,61 @@
-import sqlite3
-import pandas as pd
+import csv
+import gzip
+import json
+import os
+import time
+from pathlib import Path
+
 from .config import DB_PATH
+from .db import step_connection
+from .meta import get_meta, set_meta
+
+# pipeline_meta keys: which step3 result the table was built from
+WATERMARK_KEY = "step4_last_event_id"
+STEP3_BUILD_KEY = "step4_step3_build"
+
+# Default export path (relative to the working directory)
+DEFAULT_OUTPUT = "final_latest_accounts.csv"
+
+EXPORT_FORMATS = ("csv", "csv.gz", "jsonl")
+
+# Rows fetched from the cursor per batch while exporting
+EXPORT_FETCH_ROWS = 10_000
+
+# Merge last changes (from step3) with account details
+FINAL_SELECT_SQL = """
+    SELECT
+        lc.account_id,
+        acc.name,
+        acc.address,
+        lc.latest_update_datetime,
+        lc.queue,
+        lc.status
+    FROM latest_status_collections_legal lc
+    {filter}
+    LEFT JOIN accounts acc
+        ON acc.account_id = lc.account_id
+"""
+
+FINAL_INSERT_SQL = """
+    INSERT INTO final_latest_accounts (
+        account_id, name, address,
+        latest_update_datetime, queue, status
+    )
+""" + FINAL_SELECT_SQL
+
+
+def record_state(conn):
+    set_meta(conn, WATERMARK_KEY, get_meta(conn, "step3_last_event_id"))
+    set_meta(conn, STEP3_BUILD_KEY, get_meta(conn, "step3_build"))
+
+
+def create_final_indexes(conn):
+    # Pages of one queue by account_id (service/read_api.py)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_final_latest_accounts_queue
+        ON final_latest_accounts (queue, account_id);
+    """)
+
 
 def create_final_table(conn):
     cur = conn.cursor()
@@ -20,27 +75,64 @@ def create_final_table(conn):
         );
     """)
 
-    # Merge last changes (from step3) with account details
-    sql = """
-        INSERT INTO final_latest_accounts (
-            account_id, name, address,
-            latest_update_datetime, queue, status
-        )
-        SELECT
-            lc.account_id,
-            acc.name,
-            acc.address,
-            lc.latest_update_datetime,
-            lc.queue,
-            lc.status
-        FROM latest_status_collections_legal lc
-        LEFT JOIN accounts acc
-            ON acc.account_id = lc.account_id;
+    cur.execute(FINAL_INSERT_SQL.format(filter=""))
+    create_final_indexes(conn)
+    record_state(conn)
+    conn.commit()
+
+def update_final_table(conn):
     """
+    Incremental step 4: rewrites only the rows of accounts that step3
+    recomputed since the last sync (events above the stored watermark), plus
+    rows whose name/address no longer match accounts. Rebuilds the table
+    when it does not exist yet or step3 was rebuilt from scratch.
+    """
+    cur = conn.cursor()
+
+    exists = cur.execute("""
+        SELECT 1 FROM sqlite_master
+        WHERE type = 'table' AND name = 'final_latest_accounts';
+    """).fetchone()
+    if not exists or get_meta(conn, STEP3_BUILD_KEY) != get_meta(conn, "step3_build"):
+        print("[step4] No reusable previous result, rebuilding...")
+        create_final_table(conn)
+        return
+
+    create_final_indexes(conn)
+    watermark = int(get_meta(conn, WATERMARK_KEY, 0))
 
-    cur.execute(sql)
+    cur.execute("CREATE TEMP TABLE IF NOT EXISTS step4_accounts (account INTEGER PRIMARY KEY);")
+    cur.execute("DELETE FROM step4_accounts;")
+    cur.execute("""
+        INSERT OR IGNORE INTO step4_accounts (account)
+        SELECT DISTINCT account FROM events WHERE event_id > ?;
+    """, (watermark,))
+    cur.execute("""
+        INSERT OR IGNORE INTO step4_accounts (account)
+        SELECT f.account_id
+        FROM final_latest_accounts f
+        LEFT JOIN accounts acc
+            ON acc.account_id = f.account_id
+        WHERE f.name IS NOT acc.name
+           OR f.address IS NOT acc.address;
+    """)
+
+    cur.execute("""
+        DELETE FROM final_latest_accounts
+        WHERE account_id IN (SELECT account FROM step4_accounts);
+    """)
+    removed = cur.rowcount
+
+    cur.execute(FINAL_INSERT_SQL.format(
+        filter="JOIN temp.step4_accounts t ON t.account = lc.account_id"
+    ))
+    inserted = cur.rowcount
+
+    record_state(conn)
     conn.commit()
 
+    print(f"[step4] Incremental update: {removed} rows replaced/removed, {inserted} rows written")
+
 def preview_results(conn, limit=10):
     cur = conn.cursor()
     rows = cur.execute(f"""
@@ -54,25 +146,77 @@ def preview_results(conn, limit=10):
     for r in rows:
         print(r)
 
-def export_to_csv(conn):
-    df = pd.read_sql_query("SELECT * FROM final_latest_accounts", conn)
-    df.to_csv("final_latest_accounts.csv", index=False)
-    print("[step4] Exported final_latest_accounts.csv")
+def export_format(path):
+    """Export format implied by the file name (.jsonl, .csv.gz / .gz, otherwise csv)."""
+    name = Path(path).name.lower()
+    if name.endswith(".jsonl"):
+        return "jsonl"
+    if name.endswith(".gz"):
+        return "csv.gz"
+    return "csv"
 
-def run():
-    print(f"[step4] Using database: {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
+def export_results(conn, output=DEFAULT_OUTPUT, fmt=None):
+    """
+    Streams final_latest_accounts to `output` in batches of
+    EXPORT_FETCH_ROWS rows, so memory stays flat whatever the table size.
+
+    fmt: "csv", "csv.gz" or "jsonl" (default: from the file name). CSV has a
+    header row and empty fields for NULLs, like the earlier pandas export.
+    The file is written next to `output` and renamed into place, so readers
+    never see a partial export. Returns the number of rows written.
+    """
+    fmt = fmt or export_format(output)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {EXPORT_FORMATS}")
+
+    start = time.perf_counter()
+    path = Path(output)
+    tmp = path.with_name(path.name + ".tmp")
+
+    cur = conn.execute("SELECT * FROM final_latest_accounts;")
+    columns = [d[0] for d in cur.description]
+    rows_written = 0
 
     try:
+        if fmt == "csv.gz":
+            f = gzip.open(tmp, "wt", encoding="utf-8", newline="")
+        else:
+            f = open(tmp, "w", encoding="utf-8", newline="")
+        with f:
+            writer = csv.writer(f, lineterminator="\n")
+            if fmt != "jsonl":
+                writer.writerow(columns)
+            while True:
+                rows = cur.fetchmany(EXPORT_FETCH_ROWS)
+                if not rows:
+                    break
+                if fmt == "jsonl":
+                    f.writelines(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+                else:
+                    writer.writerows(rows)
+                rows_written += len(rows)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    elapsed = time.perf_counter() - start
+    print(f"[step4] Exported {rows_written} rows to {path} ({fmt}) in {elapsed:.3f} s")
+    return rows_written
+
+def run(incremental=False, output=DEFAULT_OUTPUT, conn=None):
+    print(f"[step4] Using database: {DB_PATH}")
+    with step_connection(conn) as conn:
         print("[step4] Creating and populating final_latest_accounts...")
-        create_final_table(conn)
+        if incremental:
+            update_final_table(conn)
+        else:
+            create_final_table(conn)
 
         count = conn.execute("SELECT COUNT(*) FROM final_latest_accounts;").fetchone()[0]
         print(f"[step4] Rows in final_latest_accounts: {count}")
 
         preview_results(conn)
-        export_to_csv(conn)
+        export_results(conn, output)
 
         print("[step4] Step 4 completed successfully.")
-    finally:
-        conn.close()
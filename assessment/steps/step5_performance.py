@@ -1,6 +1,8 @@
-import sqlite3
 import time
 from .config import DB_PATH
+from .db import step_connection
+from .index_advisor import TARGET_QUERY_SQL, run_advisor
+from .state import REFERENCE_DATETIME, TARGET_QUEUES
 
 
 def run_query(conn, repeats=5):
@@ -9,31 +11,13 @@ def run_query(conn, repeats=5):
       - average execution time
       - number of rows returned (from the last run)
     """
-    sql = """
-        SELECT
-            ds.account,
-            ds.queue,
-            ds.status,
-            ds.changed_datetime,
-            a.name,
-            a.address
-        FROM daily_status ds
-        JOIN accounts a
-            ON a.account_id = ds.account
-        WHERE ds.account IN (
-            SELECT account_id
-            FROM latest_status_collections_legal
-        )
-          AND UPPER(ds.queue) IN ('COLLECTIONS', 'LEGAL');
-    """
-
     cur = conn.cursor()
     total_time = 0.0
     row_count = 0
 
     for _ in range(repeats):
         start = time.perf_counter()
-        rows = cur.execute(sql).fetchall()
+        rows = cur.execute(TARGET_QUERY_SQL).fetchall()
         elapsed = time.perf_counter() - start
         total_time += elapsed
         row_count = len(rows)
@@ -66,13 +50,13 @@ def create_indexes(conn):
     #   - sort/scan by changed_datetime if needed
     cur.execute("""
         CREATE INDEX IF NOT EXISTS idx_daily_account_queue_changed
-        ON daily_status (account, queue, changed_datetime);
+        ON daily_status (account, queue_id, changed_datetime);
     """)
 
     # Optional index focused on queue / datetime scans
     cur.execute("""
         CREATE INDEX IF NOT EXISTS idx_daily_queue_changed
-        ON daily_status (queue, changed_datetime);
+        ON daily_status (queue_id, changed_datetime);
     """)
 
     # Index on latest_status_collections_legal to speed up the IN (subquery)
@@ -84,11 +68,17 @@ def create_indexes(conn):
     conn.commit()
 
 
-def run():
+def run(advise=False, apply_indexes=False, reference_datetime=REFERENCE_DATETIME,
+        target_queues=TARGET_QUEUES, conn=None):
+    """
+    Measures the target query before and after create_indexes. With
+    advise=True, also explains every pipeline query (step 3's as of
+    reference_datetime for target_queues) and runs the index advisor
+    (steps/index_advisor.py); apply_indexes=True creates the indexes it
+    recommends.
+    """
     print(f"[step5] Using database: {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
-
-    try:
+    with step_connection(conn) as conn:
         # 1. Baseline: no indexes
         print("[step5] Dropping indexes (if any) for baseline measurement...")
         drop_indexes(conn)
@@ -118,6 +108,12 @@ def run():
         print(f"        Baseline avg: {avg_before:.6f} s")
         print(f"        Indexed avg: {avg_after:.6f} s")
 
-    finally:
-        conn.close()
+        # 5. Query plans and index recommendations for the whole pipeline
+        if advise or apply_indexes:
+            print("[step5] Running the index advisor...")
+            run_advisor(
+                conn, apply=apply_indexes,
+                reference_datetime=reference_datetime, target_queues=target_queues,
+            )
+
         print("[step5] Step 5 completed.")
@@ -0,0 +1,43 @@
+# tests/conftest.py
+#
+# The tests run the steps on a copy of data/ and a scratch database, never
+# on the checked-in data.db. steps.config reads the paths from the
+# environment when it is first imported, so they are set here, before any
+# test module imports steps.
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ASSESSMENT_DIR = Path(__file__).resolve().parents[1]
+WORK_DIR = Path(tempfile.mkdtemp(prefix="assessment-tests-"))
+DATA_DIR = WORK_DIR / "data"
+DB_PATH = WORK_DIR / "test.db"
+
+sys.path.insert(0, str(ASSESSMENT_DIR))
+shutil.copytree(ASSESSMENT_DIR / "data", DATA_DIR)
+os.environ["ASSESSMENT_DATA_DIR"] = str(DATA_DIR)
+os.environ["ASSESSMENT_DB_PATH"] = str(DB_PATH)
+
+
+@pytest.fixture
+def data_dir():
+    """A fresh copy of the repo's data/ at the path steps.config uses."""
+    shutil.rmtree(DATA_DIR)
+    shutil.copytree(ASSESSMENT_DIR / "data", DATA_DIR)
+    return DATA_DIR
+
+
+@pytest.fixture
+def db(data_dir):
+    """Connection to an empty database at steps.config.DB_PATH."""
+    for path in WORK_DIR.glob(DB_PATH.name + "*"):
+        path.unlink()
+    conn = sqlite3.connect(DB_PATH)
+    yield conn
+    conn.close()
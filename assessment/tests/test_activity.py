@@ -0,0 +1,27 @@
+import pytest
+
+from steps import step1_setup_db
+from steps.activity import active_between, active_since, update_account_activity
+
+
+def test_queries_refuse_a_missing_summary(db):
+    step1_setup_db.create_tables(db)
+    with pytest.raises(ValueError, match="account_activity"):
+        active_since(db, "2025-01-01")
+    with pytest.raises(ValueError, match="account_activity"):
+        active_between(db, "2025-03-01", "2025-03-31")
+
+
+def test_queries_refuse_a_stale_summary(db, data_dir):
+    step1_setup_db.run(incremental=True)
+    before = active_since(db, "2025-01-01")
+
+    with open(data_dir / "daily_20241209.csv", "a") as fh:
+        fh.write("90869,LEGAL,NEW STATUS,2025-12-09 23:00:00\n")
+    step1_setup_db.load_daily_status(db, incremental=True)
+    with pytest.raises(ValueError, match="out of date"):
+        active_between(db, "2025-12-01", "2025-12-31")
+
+    update_account_activity(db)
+    assert 90869 in active_between(db, "2025-12-01", "2025-12-31")
+    assert set(active_since(db, "2025-01-01")) == set(before) | {90869}
@@ -0,0 +1,16 @@
+# Smoke tests: the benchmarks run end to end on a tiny synthetic table (they
+# assert themselves that the engines / the cache agree with SQLite).
+
+from benchmarks import bench_columnar, bench_engines
+
+TINY = ["--events", "2000", "--accounts", "200"]
+
+
+def test_bench_engines_runs(capsys):
+    bench_engines.main(TINY)
+    assert "(identical)" in capsys.readouterr().out
+
+
+def test_bench_columnar_runs(capsys):
+    bench_columnar.main(TINY)
+    assert "same as SQLite" in capsys.readouterr().out
@@ -0,0 +1,45 @@
+import os
+
+from steps import step1_setup_db
+
+
+def counts(conn):
+    return {
+        table: conn.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0]
+        for table in ("daily_status", "monthly_status", "events")
+    }
+
+
+def test_reingest_of_the_data_folder_adds_only_new_rows(db, data_dir):
+    step1_setup_db.run(incremental=True)
+    first = counts(db)
+    assert first["daily_status"] > 0 and first["monthly_status"] > 0
+
+    # Nothing changed: nothing is loaded
+    step1_setup_db.run(incremental=True)
+    assert counts(db) == first
+
+    # Touched only: the content hash matches, the file is skipped
+    touched = data_dir / "daily_20250101.csv"
+    os.utime(touched, (1, 1))
+    step1_setup_db.run(incremental=True)
+    assert counts(db) == first
+
+    # Re-sent with one extra row, next to the header-only daily_20241208.csv
+    resent = data_dir / "daily_20241209.csv"
+    with open(resent, "a") as fh:
+        fh.write("90869,LEGAL,NEW STATUS,2024-12-09 23:00:00\n")
+    (data_dir / "daily_20241208.csv").write_text("account,queue,status,changed_datetime\n")
+    step1_setup_db.run(incremental=True)
+    assert counts(db) == {
+        "daily_status": first["daily_status"] + 1,
+        "monthly_status": first["monthly_status"],
+        "events": first["events"] + 1,
+    }
+
+
+def test_incremental_load_matches_a_full_load(db):
+    step1_setup_db.run(incremental=False)
+    full = counts(db)
+    step1_setup_db.run(incremental=True)
+    assert counts(db) == full
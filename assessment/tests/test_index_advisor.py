@@ -0,0 +1,16 @@
+from steps import step1_setup_db
+from steps.index_advisor import TARGET_QUEUES_INDEX, candidate_indexes, workload
+from steps.state import to_epoch
+
+
+def test_workload_follows_the_pipeline_arguments():
+    queries = dict((name, params) for name, _, params in workload("2025-06-30", ["legal"]))
+    assert queries["step3 latest status"] == {"ts": to_epoch("2025-06-30"), "q0": "LEGAL"}
+
+
+def test_partial_index_uses_the_target_queue_codes(db):
+    step1_setup_db.run()
+    legal = db.execute("SELECT queue_id FROM queues WHERE name = 'LEGAL';").fetchone()[0]
+    indexes = candidate_indexes(db, ["LEGAL"])
+    assert indexes[TARGET_QUEUES_INDEX].endswith(f"WHERE queue_id IN ({legal})")
+    assert TARGET_QUEUES_INDEX not in candidate_indexes(db, ["NO SUCH QUEUE"])
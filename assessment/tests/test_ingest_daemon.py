@@ -0,0 +1,22 @@
+import asyncio
+import os
+
+from service.ingest_daemon import IngestDaemon
+
+
+def test_files_skipped_by_the_manifest_are_not_counted_as_ingested(db, data_dir):
+    daemon = IngestDaemon(data_dir=data_dir)
+    asyncio.run(daemon.run_once())
+    files = len(daemon.candidates())
+    assert daemon.metrics["files_total"] == files
+    assert daemon.metrics["files_skipped_total"] == 0
+
+    # Touched only: queued again, but the content hash matches
+    os.utime(data_dir / "daily_20250101.csv", (1, 1))
+    with open(data_dir / "daily_20241209.csv", "a") as fh:
+        fh.write("90869,LEGAL,NEW STATUS,2024-12-09 23:00:00\n")
+    asyncio.run(daemon.run_once())
+    assert daemon.metrics["files_total"] == files + 1
+    assert daemon.metrics["files_skipped_total"] == 1
+    assert daemon.metrics["events_total"] > 0
+    assert "assessment_ingest_files_skipped_total counter" in daemon.prometheus_text()
@@ -0,0 +1,17 @@
+import sqlite3
+
+from steps.events import create_events_table
+from steps.meta import data_version, get_meta
+
+
+def test_get_meta_without_the_table_returns_the_default():
+    conn = sqlite3.connect(":memory:")
+    assert get_meta(conn, "missing", "default") == "default"
+    assert data_version(conn) == 0
+    assert conn.execute("SELECT name FROM sqlite_master;").fetchall() == []
+
+
+def test_create_events_table_on_a_fresh_database():
+    conn = sqlite3.connect(":memory:")
+    create_events_table(conn)
+    assert data_version(conn) == 1
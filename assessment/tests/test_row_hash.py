@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from steps.step1_setup_db import (
+    ROW_KEY_COLUMNS,
+    create_indexes,
+    create_tables,
+    load_daily_status,
+    load_monthly_status,
+    row_hashes,
+)
+
+
+def count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0]
+
+
+def test_row_hashes_are_int64_for_an_empty_frame():
+    empty = pd.DataFrame(columns=ROW_KEY_COLUMNS["daily_status"])
+    assert row_hashes(empty, ROW_KEY_COLUMNS["daily_status"]).dtype == "int64"
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_daily_batch_with_empty_file_dedupes_on_reload(db, data_dir, streaming):
+    # daily_20241208.csv has only a header
+    files = [data_dir / f"daily_2024120{d}.csv" for d in (8, 9)] + [data_dir / "daily_20241210.csv"]
+    assert len(pd.read_csv(files[0])) == 0
+
+    create_tables(db)
+    create_indexes(db)
+    load_daily_status(db, incremental=True, files=files)
+    loaded = count(db, "daily_status")
+    assert loaded > 0
+    assert db.execute(
+        "SELECT COUNT(*) FROM daily_status WHERE typeof(row_hash) != 'integer';"
+    ).fetchone()[0] == 0
+
+    # Re-sent with one new row: only that row is inserted
+    with open(files[1], "a") as fh:
+        fh.write("90869,LEGAL,NEW STATUS,2024-12-09 23:00:00\n")
+    load_daily_status(db, incremental=True, streaming=streaming, files=[files[1]])
+    assert count(db, "daily_status") == loaded + 1
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_monthly_batch_with_empty_file_dedupes_on_reload(db, data_dir, streaming):
+    empty = data_dir / "monthly_202512.csv"
+    empty.write_text("account,queue,status,month,day\n")
+    files = [data_dir / "monthly_202411.csv", empty, data_dir / "monthly_202412.csv"]
+
+    create_tables(db)
+    create_indexes(db)
+    load_monthly_status(db, incremental=True, files=files)
+    loaded = count(db, "monthly_status")
+    assert loaded > 0
+
+    with open(files[0], "a") as fh:
+        fh.write("90869,LEGAL,NEW STATUS,11,30\n")
+    load_monthly_status(db, incremental=True, streaming=streaming, files=[files[0]])
+    assert count(db, "monthly_status") == loaded + 1
@@ -0,0 +1,30 @@
+import pytest
+
+from steps import step1_setup_db
+from steps.meta import data_version
+
+
+def rename_first_account(data_dir):
+    path = data_dir / "accounts.csv"
+    header, first, *rest = path.read_text().splitlines(keepends=True)
+    account_id = first.split(",")[0]
+    path.write_text("".join([header, f'{account_id},Renamed Account,"1 New Street, Cork"\n', *rest]))
+    return int(account_id)
+
+
+@pytest.mark.parametrize("staged", [False, True])
+def test_incremental_accounts_change_bumps_data_version(db, data_dir, staged):
+    step1_setup_db.run(incremental=True, staged=staged)
+    before = data_version(db)
+    assert before > 0
+
+    # Nothing new: the version stays, so caches stay valid
+    step1_setup_db.run(incremental=True, staged=staged)
+    assert data_version(db) == before
+
+    account = rename_first_account(data_dir)
+    step1_setup_db.run(incremental=True, staged=staged)
+    assert data_version(db) == before + 1
+    assert db.execute(
+        "SELECT name FROM accounts WHERE account_id = ?;", (account,)
+    ).fetchone() == ("Renamed Account",)